@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#
+# Measures the time to build a MasterInfo from a synthetic ROS master state.
+#
+# usage: master_info_benchmark.py [topic count] [node count]
+
+import sys
+import time
+import random
+
+import roslib; roslib.load_manifest('master_discovery_fkie')
+from master_discovery_fkie.master_info import MasterInfo
+
+
+def create_state(topic_count, node_count, subscribers=4, seed=0):
+  '''
+  Creates a synthetic state in the format of MasterInfo.listedState(). Each
+  topic has one publisher and some subscribers. Additionally one node
+  subscribes all topics like a bag recorder.
+  '''
+  rnd = random.Random(seed)
+  masteruri = 'http://bench:11311/'
+  nodes = ['/node_%d' % i for i in range(node_count)]
+  publishers = []
+  subscribers_list = []
+  topic_types = []
+  for i in range(topic_count):
+    topic = '/ns_%d/topic_%d' % (i % 50, i)
+    publishers.append((topic, [nodes[i % node_count]]))
+    subs = rnd.sample(nodes, min(subscribers, node_count)) + ['/record']
+    subscribers_list.append((topic, subs))
+    topic_types.append((topic, 'std_msgs/String'))
+  services = []
+  service_provider = []
+  for i, node in enumerate(nodes):
+    for name in ['get_loggers', 'set_logger_level']:
+      service = '%s/%s' % (node, name)
+      services.append((service, [node]))
+      service_provider.append((service, 'rosrpc://bench:%d' % (40000 + i), 'roscpp/GetLoggers', 'local'))
+  node_list = [(node, 'http://bench:%d/' % (30000 + i), 1000 + i, 'local') for i, node in enumerate(nodes + ['/record'])]
+  return (str(time.time()), masteruri, 'bench', publishers, subscribers_list, services, topic_types, node_list, service_provider)
+
+
+def measure(topic_count, node_count, repeat=3):
+  state = create_state(topic_count, node_count)
+  best_build = best_list = None
+  for _ in range(repeat):
+    start = time.time()
+    info = MasterInfo.from_list(state)
+    build = time.time() - start
+    start = time.time()
+    info.listedState()
+    listed = time.time() - start
+    best_build = build if best_build is None else min(best_build, build)
+    best_list = listed if best_list is None else min(best_list, listed)
+  print "%6d topics, %5d nodes: from_list() %.3f s, listedState() %.3f s" % (topic_count, node_count, best_build, best_list)
+
+
+if __name__ == '__main__':
+  topics = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+  nodes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+  for count in sorted(set([topics / 5, topics / 2, topics])):
+    measure(count, nodes)
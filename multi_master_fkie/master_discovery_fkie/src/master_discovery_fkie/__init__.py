@@ -74,7 +74,9 @@ def setProcessName(name):
 
 def main():
   '''
-  Creates and runs the ROS node using multicast messages for discovering
+  Creates and runs the ROS node using multicast messages for discovering. If 
+  C{~static_hosts} is set, the heartbeats are sent by unicast to the given 
+  hosts and the hosts learned from received heartbeats.
   '''
   import master_discovery
   setTerminalName(NODE_NAME)
@@ -83,7 +85,11 @@ def main():
   mcast_group = rospy.get_param('~mcast_group', MCAST_GROUP)
   mcast_port = rospy.get_param('~mcast_port', MCAST_PORT)
   rpc_port = rospy.get_param('~rpc_port', RPC_PORT)
-  discoverer = master_discovery.Discoverer(mcast_port, mcast_group, rpc_port)
+  # send the heartbeats by unicast to this hosts instead of using multicast
+  static_hosts = rospy.get_param('~static_hosts', [])
+  if isinstance(static_hosts, basestring):
+    static_hosts = [h.strip() for h in static_hosts.split(',') if h.strip()]
+  discoverer = master_discovery.Discoverer(mcast_port, mcast_group, rpc_port, static_hosts)
   discoverer.start()
   rospy.spin()
 
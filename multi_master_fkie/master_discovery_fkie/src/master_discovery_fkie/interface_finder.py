@@ -31,11 +31,12 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import time
-import xmlrpclib
 
 import roslib; roslib.load_manifest('master_discovery_fkie')
 import rospy
 
+import xmlrpc_pool
+
 
 def hostFromUri(uri):
   '''
@@ -70,7 +71,7 @@ def get_changes_topic(masteruri, wait=True):
   '''
   result = []
   while not result and not rospy.is_shutdown():
-    master = xmlrpclib.ServerProxy(masteruri)
+    master = xmlrpc_pool.serverProxy(masteruri)
     # get the system state to resolve the published nodes
     code, message, state = master.getSystemState(rospy.get_name())
     # read topic types
@@ -112,7 +113,7 @@ def get_stats_topic(masteruri, wait=True):
   '''
   result = []
   while not result and not rospy.is_shutdown():
-    master = xmlrpclib.ServerProxy(masteruri)
+    master = xmlrpc_pool.serverProxy(masteruri)
     # get the system state to resolve the published nodes
     code, message, state = master.getSystemState(rospy.get_name())
     # read topic types
@@ -155,7 +156,7 @@ def get_listmaster_service(masteruri, wait=True):
   '''
   result = []
   while not result and not rospy.is_shutdown():
-    master = xmlrpclib.ServerProxy(masteruri)
+    master = xmlrpc_pool.serverProxy(masteruri)
     code, msg, val = master.getSystemState(rospy.get_name())
     if code == 1:
       pubs, subs, srvs = val
@@ -31,11 +31,13 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import threading
-import xmlrpclib
 import copy
+from collections import deque
 import sys
 import socket
+import struct
 import time
+import zlib
 
 import roslib; roslib.load_manifest('master_discovery_fkie')
 import rospy
@@ -44,7 +46,8 @@ import roslib.network
 from master_discovery_fkie.msg import *
 from master_discovery_fkie.srv import *
 from master_monitor import MasterMonitor, MasterConnectionException
-from udp import McastSocket
+from udp import McastSocket, UcastSocket
+import xmlrpc_pool
 
 
 class DiscoveredMaster(object):
@@ -53,8 +56,13 @@ class DiscoveredMaster(object):
   received heartbeat messages of the remote node. On first contact a theaded 
   connection to remote discoverer will be established to get additional 
   information about the ROS master.
+  The receive times of the heartbeats are stored in a sliding window 
+  (C{collections.deque}), so adding and expiring of a heartbeat costs O(1).
+  Each heartbeat covers the send interval advertised by its rate, the sum of 
+  the covered time is used to calculate the link quality of senders with 
+  variable rate.
   '''
-  def __init__(self, monitoruri, heartbeat_rate=1., timestamp=0.0, callback_master_state=None):
+  def __init__(self, monitoruri, heartbeat_rate=1., timestamp=0.0, callback_master_state=None, masteruri_hash=None, state_digest=None):
     '''
     Initialize method for the DiscoveredMaster class.
     @param monitoruri: The URI of the remote RPC server, which moniter the ROS master
@@ -65,6 +73,10 @@ class DiscoveredMaster(object):
     @type timestamp:  C{float} (Default: c{0})
     @param callback_master_state: the callback method to publish the changes of the ROS masters
     @type callback_master_state: C{<method>(master_discovery_fkie/MasterState)}  (Default: C{None})
+    @param masteruri_hash: the CRC32 of the ROS master URI, received with a heartbeat of version 2
+    @type masteruri_hash:  C{int} (Default: C{None})
+    @param state_digest: the digest of the ROS master state, received with a heartbeat of version 2
+    @type state_digest:  C{(int, int, int, int)} (Default: C{None})
     '''
     self.masteruri = None
     self.mastername = None
@@ -72,35 +84,57 @@ class DiscoveredMaster(object):
     self.discoverername = None
     self.monitoruri = monitoruri
     self.heartbeat_rate = heartbeat_rate
-    self.heartbeats = list()
+    self.masteruri_hash = masteruri_hash
+    self.state_digest = state_digest
+    self.heartbeats = deque() # (receive time, advertised interval)
+    # the sum of the advertised intervals in the heartbeat window
+    self._covered = 0.
+    # the receive time of the last heartbeat, it is kept after the removal from 
+    # the window. The master is created on the receipt of the first heartbeat.
+    self._last_heartbeat = time.time()
     self.online = False
+    # the last calculated link quality, -1 if unknown
+    self.quality = -1.0
+    # guards the heartbeat window, which is changed by the receive and the statistic thread
+    self._lock = threading.Lock()
     self.callback_master_state = callback_master_state
     # create a thread to retrieve additional information about the remote ROS master
     self._retrieveThread = threading.Thread(target = self.__retrieveMasterinfo)
     self._retrieveThread.setDaemon(True)
     self._retrieveThread.start()
 
-  def addHeartbeat(self, timestamp, rate):
+  def addHeartbeat(self, timestamp, rate, state_digest=None):
     '''
     Adds a new heartbeat measurement. If it is a new timestamp a ROS message 
     about the change of this ROS master will be published into ROS network.
+    If the heartbeat contains a state digest (version 2), the message is only 
+    published if the digest is changed.
     @param timestamp: The new timestamp of the ROS master state
     @type timestamp:  C{float}
-    @param rate: The remote rate, which is used to send the heartbeat messages. 
+    @param rate: The remote rate, which is used to send the heartbeat messages until the next heartbeat. 
     @type rate:  C{float}
+    @param state_digest: the hash and the count of nodes, topics and services of the ROS master state
+    @type state_digest:  C{(int, int, int, int)} (Default: C{None})
     '''
-    self.heartbeats.append(time.time())
-    # reset the list, if the heartbeat is changed
-    if self.heartbeat_rate != rate:
+    self._lock.acquire(True)
+    try:
+      # the rate is the send rate until the next heartbeat
       self.heartbeat_rate = rate
-      self.heartbeats = list()
+      interval = 1.0 / rate if rate > 0 else 0.
+      self._last_heartbeat = time.time()
+      self.heartbeats.append((self._last_heartbeat, interval))
+      self._covered += interval
+    finally:
+      self._lock.release()
     # publish new master state, if the timestamp is changed 
     if (self.timestamp != timestamp or not self.online):
+      changed = (state_digest is None or self.state_digest != state_digest or not self.online)
       self.timestamp = timestamp
+      self.state_digest = state_digest
       if not (self.masteruri is None):
         #set the state to 'online'
         self.online = True
-        if not (self.callback_master_state is None):
+        if changed and not (self.callback_master_state is None):
           self.callback_master_state(MasterState(MasterState.STATE_CHANGED, 
                                                  ROSMaster(str(self.mastername), 
                                                            self.masteruri, 
@@ -117,16 +151,64 @@ class DiscoveredMaster(object):
     @return: the count of removed heartbeats
     @rtype: C{int}
     '''
-    do_remove = True
     removed = 0
-    while do_remove:
-      if len(self.heartbeats) > 0 and self.heartbeats[0] < timestamp:
-        del self.heartbeats[0]
+    self._lock.acquire(True)
+    try:
+      heartbeats = self.heartbeats
+      while heartbeats and heartbeats[0][0] < timestamp:
+        self._covered -= heartbeats.popleft()[1]
         removed = removed + 1
-      else:
-        do_remove = False
+      if not heartbeats:
+        # avoid the accumulation of rounding errors
+        self._covered = 0.
+    finally:
+      self._lock.release()
     return removed
 
+  def linkQuality(self, current_time, measurement_intervals, timeout_factor):
+    '''
+    Removes the expired heartbeats, sets the master offline if no heartbeats 
+    are received for a long time and calculates the quality of the link. The 
+    quality is the part of the measurement duration covered by the intervals 
+    advertised with the received heartbeats. The measurement duration and 
+    the timeout depend on the last advertised rate, so a sender with a low rate 
+    is not set offline between two heartbeats.
+    @param current_time: the time of the calculation
+    @type current_time:  C{float}
+    @param measurement_intervals: the count of intervals (1 sec) used for the quality calculation
+    @type measurement_intervals:  C{int}
+    @param timeout_factor: the master is set offline after the measurement duration multiplied by this factor
+    @type timeout_factor:  C{float}
+    @return: the link quality in percent or C{-1.0}, if the master is offline
+    @rtype: C{float}
+    '''
+    quality = -1.0
+    rate = self.heartbeat_rate
+    measurement_duration = measurement_intervals
+    if 0. < rate < 1.:
+      measurement_duration = measurement_intervals / rate
+    if rate > 0.:
+      # the measurement and the timeout cover at least the advertised interval
+      measurement_duration = max(measurement_duration, 1.0 / rate)
+    # remove all heartbeats, which are to old
+    self.removeHeartbeats(current_time - measurement_duration)
+    self._lock.acquire(True)
+    try:
+      covered = self._covered
+      last_ts = self._last_heartbeat
+    finally:
+      self._lock.release()
+    # sets the master offline if the last received heartbeat is to old. The 
+    # empty window is not enough, it is shorter than the timeout.
+    if self.online and current_time - last_ts > measurement_duration * timeout_factor:
+      self.setOffline()
+    # calculate the quality for only online masters
+    if self.online:
+      if measurement_duration > 0:
+        quality = min(covered / measurement_duration * 100.0, 100.0)
+    self.quality = quality
+    return quality
+
   def setOffline(self):
     '''
     Sets this master to offline and publish the new state to the ROS network.
@@ -152,7 +234,7 @@ class DiscoveredMaster(object):
       while self._retrieveThread.is_alive() and not rospy.is_shutdown() and (self.mastername is None):
         try:
 #          print "get Info about master", self.monitoruri
-          remote_monitor = xmlrpclib.ServerProxy(self.monitoruri)
+          remote_monitor = xmlrpc_pool.serverProxy(self.monitoruri)
           timestamp, masteruri, mastername, nodename, monitoruri = remote_monitor.masterContacts()
         except:
           import traceback
@@ -185,7 +267,7 @@ class Discoverer(threading.Thread):
   The class to publish the current state of the ROS master.
   '''
 
-  VERSION = 1
+  VERSION = 2
   '''@ivar: the version of the packet format described by L{HEARTBEAT_FMT}'''
   '''
   Version 1: 'cBBiiH'
@@ -195,33 +277,79 @@ class Discoverer(threading.Thread):
     int: secs of the ROS Master state
     int: nsecs of the ROS Master state
     unsigned short: the port number of the RPC Server of the remote ROS-Core monitor
+  Version 2: 'cBBiiHIIHHH'
+    the fields of version 1, followed by
+    unsigned int: CRC32 of the ROS Master URI
+    unsigned int: hash of the ROS Master state (see L{MasterInfo.fingerprint})
+    unsigned short: count of nodes
+    unsigned short: count of topics
+    unsigned short: count of services
   '''
-  HEARTBEAT_FMT = 'cBBiiH'
+  HEARTBEAT_FMT = 'cBBiiHIIHHH'
   ''' @ivar: packet format description, see: U{http://docs.python.org/library/struct.html} '''
+  HEARTBEAT_FMT_V1 = 'cBBiiH'
+  ''' @ivar: packet format description of the version 1, which is still accepted '''
+  SEND_VERSION = 1
+  ''' @ivar: the version of the sent heartbeat packets. Older master_discovery nodes accept only version 1, so the version 2 has to be enabled by C{~heartbeat_version} on all hosts.'''
   HEARTBEAT_HZ = 2           
-  ''' @ivar: the send rate of the heartbeat packets in hz '''
+  ''' @ivar: the send rate of the heartbeat packets in hz, if L{HEARTBEAT_ADAPTIVE} is disabled '''
+  HEARTBEAT_ADAPTIVE = True
+  ''' @ivar: adapt the heartbeat rate to the changes of the ROS master state and the count of known masters. Requires L{SEND_VERSION} 2.'''
+  HEARTBEAT_BURST_HZ = 10.
+  ''' @ivar: the heartbeat rate in hz after a change of the ROS master state (adaptive mode) '''
+  HEARTBEAT_BURST_DURATION = 1.
+  ''' @ivar: the duration in seconds of the burst after a change of the ROS master state (adaptive mode) '''
+  HEARTBEAT_IDLE_HZ = 0.5
+  ''' @ivar: the heartbeat rate in hz, if the ROS master state is stable (adaptive mode) '''
+  HEARTBEAT_HALF_LIFE = 5.
+  ''' @ivar: the time in seconds to halve the difference between the current and the idle rate after the burst (adaptive mode) '''
+  HEARTBEAT_MASTERS_SCALE = 10
+  ''' @ivar: if more masters are known, the heartbeat rate is reduced by the factor C{HEARTBEAT_MASTERS_SCALE / count of masters} (adaptive mode) '''
   MEASUREMENT_INTERVALS = 5  
   ''' @ivar: the count of intervals (1 sec) used for a quality calculation. If HEARTBEAT_HZ is smaller then 1, MEASUREMENT_INTERVALS will be divided by HEARTBEAT_HZ value '''
   TIMEOUT_FACTOR = 1.4       
   ''' @ivar: the timeout is defined by calculated measurement duration multiplied by TIMEOUT_FAKTOR. ''' 
   ROSMASTER_HZ = 2           
   ''' @ivar: the test rate of ROS master state in hz. '''
+  PEER_PROBE_INTERVAL = 2.0
+  ''' @ivar: the interval in seconds to send heartbeats to peers, from which no heartbeats are received (unicast mode only). '''
+  PEER_BOOST_FACTOR = 4.0
+  ''' @ivar: the heartbeats to peers with a bad link quality are sent up to this factor more often (unicast mode only). '''
     
-  def __init__(self, mcast_port, mcast_group, monitor_port):
+  def __init__(self, mcast_port, mcast_group, monitor_port, static_hosts=[]):
     '''
     Initialize method for the Discoverer class
-    @param mcast_port: The port used to publish and receive the multicast messages.
+    @param mcast_port: The port used to publish and receive the multicast messages. 
+                       In unicast mode the port to receive the heartbeats and the default port of the peers.
     @type mcast_port:  int
     @param mcast_group: The IPv4 or IPv6 multicast group used for discovering over nodes.
     @type mcast_group:  str
     @param monitor_port: The port of the RPC Server, used to get more information about the ROS master.
     @type monitor_port:  int
+    @param static_hosts: The list of peers given as C{host} or C{host:port}. If 
+                         the list is not empty, the heartbeats are sent by unicast 
+                         to this peers and to the peers learned from the received 
+                         heartbeats instead of the multicast group.
+    @type static_hosts:  C{[str, ...]}
     '''
     threading.Thread.__init__(self)
     self.do_finish = False
     self.__lock = threading.RLock()
     # the list with all ROS master neighbors
-    self.masters = dict() # (ip, DiscoveredMaster)
+    self.masters = dict() # ((ip, port), DiscoveredMaster)
+    # in unicast mode: the peers with the time of the next heartbeat ((ip, port), float),
+    # None in multicast mode
+    self.__peers = None
+    self.__static_peers = set()
+    if static_hosts:
+      self.__peers = dict()
+      for host in static_hosts:
+        try:
+          addr = UcastSocket.parsePeer(host, mcast_port)
+          self.__static_peers.add(addr)
+          self.__peers[addr] = 0.
+        except (socket.error, ValueError), e:
+          rospy.logwarn("invalid static host '%s' ignored: %s", str(host), e)
     
     if rospy.has_param('~rosmaster_hz'):
       Discoverer.ROSMASTER_HZ = rospy.get_param('~rosmaster_hz')
@@ -231,6 +359,21 @@ class Discoverer(threading.Thread):
       Discoverer.MEASUREMENT_INTERVALS = rospy.get_param('~measurement_intervals')
     if rospy.has_param('~timeout_factor'):
       Discoverer.TIMEOUT_FACTOR = rospy.get_param('~timeout_factor')
+    if rospy.has_param('~heartbeat_version'):
+      Discoverer.SEND_VERSION = rospy.get_param('~heartbeat_version')
+    if rospy.has_param('~heartbeat_adaptive'):
+      Discoverer.HEARTBEAT_ADAPTIVE = rospy.get_param('~heartbeat_adaptive')
+    if rospy.has_param('~heartbeat_burst_hz'):
+      Discoverer.HEARTBEAT_BURST_HZ = rospy.get_param('~heartbeat_burst_hz')
+    if rospy.has_param('~heartbeat_idle_hz'):
+      Discoverer.HEARTBEAT_IDLE_HZ = rospy.get_param('~heartbeat_idle_hz')
+    # the time of the last change of the local ROS master state, used for the 
+    # adaptive heartbeat rate. The discoverer starts with a burst.
+    self.__last_change = time.time()
+    self.__state_changed = threading.Event()
+    # the last master state and the digest sent with the heartbeat
+    self.__digest_state = None
+    self.__digest = (0, 0, 0, 0)
 
     self.current_check_hz = Discoverer.HEARTBEAT_HZ
     # initialize the ROS publishers
@@ -242,13 +385,20 @@ class Discoverer(threading.Thread):
     # test the reachability of the ROS master 
     local_addr = roslib.network.get_local_address()
     if (local_addr in ['localhost', '127.0.0.1']):
-      sys.exit("'%s' is not reachable for other systems. Change the ROS_MASTER_URI!", local_addr)
-      
-    # create the multicast socket and join the multicast group
-    self.msocket = msocket = McastSocket(mcast_port, mcast_group)
-#    msocket.settimeout(3.0)
-    if not msocket.hasEnabledMulticastIface():
-      sys.exit("No enabled multicast interfaces available!\nAdd multicast support e.g. sudo ifconfig eth0 multicast")
+      if self.__peers is None:
+        sys.exit("'%s' is not reachable for other systems. Change the ROS_MASTER_URI!" % local_addr)
+      # allowed in unicast mode to run several discoverer on the same host
+      rospy.logwarn("'%s' is only reachable by the peers on this host!", local_addr)
+
+    if self.__peers is None:
+      # create the multicast socket and join the multicast group
+      self.msocket = msocket = McastSocket(mcast_port, mcast_group)
+#      msocket.settimeout(3.0)
+      if not msocket.hasEnabledMulticastIface():
+        sys.exit("No enabled multicast interfaces available!\nAdd multicast support e.g. sudo ifconfig eth0 multicast")
+    else:
+      self.msocket = UcastSocket(mcast_port)
+      rospy.loginfo("unicast discovery on port %d, static peers: %s", mcast_port, str(list(self.__static_peers)))
     
     # create a thread to monitor the ROS master state
     self.master_monitor = MasterMonitor(monitor_port)
@@ -303,17 +453,153 @@ class Discoverer(threading.Thread):
     nodes associated with ROS master.
     '''
     while (not rospy.is_shutdown()) and not self.do_finish:
+      rate = self._heartbeatRate(time.time())
+      sleep_time = 1.0/rate
       if not self.master_monitor.getMasteruri() is None:
         t = 0
         if not self.master_monitor.master_state is None:
           t = self.master_monitor.master_state.timestamp
-        msg = struct.pack(Discoverer.HEARTBEAT_FMT,'R', Discoverer.VERSION, int(Discoverer.HEARTBEAT_HZ*10), int(t), int((t-(int(t))) * 1000000000), self.master_monitor.rpcport)
-        self.msocket.send2group(msg)
-      time.sleep(1.0/Discoverer.HEARTBEAT_HZ)
-    msg = struct.pack(Discoverer.HEARTBEAT_FMT,'R', Discoverer.VERSION, int(Discoverer.HEARTBEAT_HZ*10), -1, -1, self.master_monitor.rpcport)
-    self.msocket.send2group(msg)
+        secs, nsecs = int(t), int((t-(int(t))) * 1000000000)
+        if self.__peers is None:
+          self.msocket.send2group(self._createHeartbeat(secs, nsecs, rate))
+        else:
+          sleep_time = self._sendToPeers(secs, nsecs, rate)
+      # wake up on changes of the ROS master state to start the burst
+      self.__state_changed.wait(sleep_time)
+      if self.__state_changed.is_set():
+        self.__state_changed.clear()
+        self.__last_change = time.time()
+        self.__lock.acquire(True)
+        try:
+          if not self.__peers is None:
+            for addr in self.__peers.keys():
+              self.__peers[addr] = 0.
+        finally:
+          self.__lock.release()
+    rate = self._heartbeatRate(time.time())
+    if self.__peers is None:
+      self.msocket.send2group(self._createHeartbeat(-1, -1, rate))
+    else:
+      self._sendToPeers(-1, -1, rate, True)
     self.msocket.close()
 
+  def _heartbeatRate(self, current_time):
+    '''
+    Returns the heartbeat rate for the next interval. In adaptive mode the 
+    heartbeats are sent with L{HEARTBEAT_BURST_HZ} after a change of the 
+    ROS master state, after L{HEARTBEAT_BURST_DURATION} the rate decays to 
+    L{HEARTBEAT_IDLE_HZ}. In networks with more than L{HEARTBEAT_MASTERS_SCALE}
+    masters the rate is reduced. The rate is advertised in the heartbeat, so 
+    the receiver can calculate the link quality.
+    @param current_time: the current time
+    @type current_time:  C{float}
+    @return: the rate in hz, rounded to the resolution of the heartbeat (0.1 - 25.5 Hz)
+    @rtype: C{float}
+    '''
+    if not Discoverer.HEARTBEAT_ADAPTIVE or Discoverer.SEND_VERSION < 2:
+      # older discoverer reset the measurement on changed rate
+      rate = Discoverer.HEARTBEAT_HZ
+    else:
+      since = current_time - self.__last_change - Discoverer.HEARTBEAT_BURST_DURATION
+      burst = max(Discoverer.HEARTBEAT_BURST_HZ, Discoverer.HEARTBEAT_IDLE_HZ)
+      if since <= 0:
+        rate = burst
+      else:
+        rate = Discoverer.HEARTBEAT_IDLE_HZ + (burst - Discoverer.HEARTBEAT_IDLE_HZ) * 0.5 ** (since / Discoverer.HEARTBEAT_HALF_LIFE)
+      masters_count = len(self.masters)
+      if masters_count > Discoverer.HEARTBEAT_MASTERS_SCALE:
+        rate = rate * Discoverer.HEARTBEAT_MASTERS_SCALE / masters_count
+    return min(max(round(rate, 1), 0.1), 25.5)
+
+  def _sendToPeers(self, secs, nsecs, rate, all_peers=False):
+    '''
+    Sends the heartbeat message to all peers, which next send time is reached 
+    (unicast mode). The heartbeats to the probed peers advertise the lower 
+    probe rate, so the receiver doesn't set this master offline between the 
+    probes.
+    @param secs: secs of the ROS Master state or C{-1} on exit
+    @type secs:  C{int}
+    @param nsecs: nsecs of the ROS Master state or C{-1} on exit
+    @type nsecs:  C{int}
+    @param rate: the current heartbeat rate
+    @type rate:  C{float}
+    @param all_peers: send the message to all peers independent of the send time
+    @type all_peers:  C{bool}
+    @return: the time in seconds until the next heartbeat should be sent
+    @rtype: C{float}
+    '''
+    current_time = time.time()
+    self.__lock.acquire(True)
+    try:
+      due = [addr for (addr, ts) in self.__peers.iteritems() if all_peers or ts <= current_time]
+      rates = dict()
+      for addr in due:
+        interval = self._peerInterval(addr, rate)
+        self.__peers[addr] = current_time + interval
+        # round down to the resolution of the heartbeat
+        rates[addr] = min(rate, max(int(10.0 / interval + 1e-6) / 10.0, 0.1))
+      next_ts = min(self.__peers.itervalues()) if self.__peers else current_time + 1.0/rate
+    finally:
+      self.__lock.release()
+    msgs = dict()
+    for addr in due:
+      if not msgs.has_key(rates[addr]):
+        msgs[rates[addr]] = self._createHeartbeat(secs, nsecs, rates[addr])
+      try:
+        self.msocket.send2addr(msgs[rates[addr]], addr)
+      except socket.error, e:
+        rospy.logwarn("can not send heartbeat to %s: %s", str(addr), e)
+    return min(max(next_ts - current_time, 0.01), 1.0/rate)
+
+  def _peerInterval(self, addr, rate):
+    '''
+    Returns the send interval of the heartbeats for the given peer. Peers 
+    without received heartbeats are probed with L{PEER_PROBE_INTERVAL}. The 
+    heartbeats to peers with a lossy link are sent more often (up to 
+    L{PEER_BOOST_FACTOR}), so the remote link quality doesn't fall under the
+    offline limit. The link quality measured for the received heartbeats is 
+    used as estimation for both directions.
+    @param addr: the address of the peer
+    @type addr:  C{(str, int)}
+    @param rate: the current heartbeat rate
+    @type rate:  C{float}
+    @return: the interval in seconds
+    @rtype: C{float}
+    '''
+    interval = 1.0/rate
+    master = self.masters.get(addr, None)
+    if master is None:
+      return max(interval, Discoverer.PEER_PROBE_INTERVAL)
+    if 0. < master.quality < 100.:
+      interval = interval * max(master.quality / 100.0, 1.0 / Discoverer.PEER_BOOST_FACTOR)
+    return interval
+
+  def _createHeartbeat(self, secs, nsecs, rate):
+    '''
+    Creates a heartbeat message in the format of the L{SEND_VERSION}.
+    @param secs: secs of the ROS Master state or C{-1} on exit
+    @type secs:  C{int}
+    @param nsecs: nsecs of the ROS Master state or C{-1} on exit
+    @type nsecs:  C{int}
+    @param rate: the heartbeat rate until the next heartbeat
+    @type rate:  C{float}
+    @return: the packed heartbeat message
+    @rtype: C{str}
+    '''
+    if Discoverer.SEND_VERSION < 2:
+      return struct.pack(Discoverer.HEARTBEAT_FMT_V1, 'R', 1, int(round(rate*10)), secs, nsecs, self.master_monitor.rpcport)
+    masteruri = self.master_monitor.getMasteruri()
+    uri_hash = zlib.crc32(masteruri) & 0xffffffff if masteruri else 0
+    state = self.master_monitor.master_state
+    if not state is None and not (state is self.__digest_state):
+      # the digest is only calculated once for each new state
+      self.__digest = (state.fingerprint & 0xffffffff,
+                       min(len(state.nodes), 0xffff),
+                       min(len(state.topics), 0xffff),
+                       min(len(state.services), 0xffff))
+      self.__digest_state = state
+    return struct.pack(Discoverer.HEARTBEAT_FMT, 'R', Discoverer.VERSION, int(round(rate*10)), secs, nsecs, self.master_monitor.rpcport, uri_hash, *self.__digest)
+
   def checkROSMaster_loop(self):
     '''
     The method test periodically the state of the ROS master. The new state will
@@ -326,8 +612,8 @@ class Discoverer(threading.Thread):
         cputimes = os.times()
         cputime_init = cputimes[0] + cputimes[1]
         if self.master_monitor.checkState():
-          # publish the new state ?
-          pass
+          # send the heartbeats with higher rate
+          self.__state_changed.set()
         # adapt the check rate to the CPU usage time
         cputimes = os.times()
         cputime = cputimes[0] + cputimes[1] - cputime_init
@@ -358,42 +644,53 @@ class Discoverer(threading.Thread):
         import traceback
         rospy.logwarn("socket error: %s", traceback.format_exc())
       else:
+        # the masters are identified by the IP and the port of the sender
+        key = address[0:2]
         if len(msg) > 2:
           (r,) = struct.unpack('c', msg[0])
           (version,) = struct.unpack('B', msg[1])
-          if (version == Discoverer.VERSION):
+          if (version in (1, Discoverer.VERSION)):
             if (r == 'R'):
-              if len(msg) == struct.calcsize(Discoverer.HEARTBEAT_FMT):
-                (r, version, rate, secs, nsecs, monitor_port) = struct.unpack(Discoverer.HEARTBEAT_FMT, msg)
-                # remove master if sec and nsec are -1
-                if secs == -1:
-                  if self.masters.has_key(address[0]):
-                    master = self.masters[address[0]]
-                    if not master.mastername is None:
-                      self.publish_masterstate(MasterState(MasterState.STATE_REMOVED, 
-                                                     ROSMaster(str(master.mastername), 
-                                                               master.masteruri, 
-                                                               master.timestamp, 
-                                                               False, 
-                                                               master.discoverername, 
-                                                               master.monitoruri)))
-                    self.__lock.acquire(True)
-                    del self.masters[address[0]]
-                    self.__lock.release()
-                # update the timestamp of existing master
-                elif self.masters.has_key(address[0]):
-                  self.__lock.acquire(True)
-                  self.masters[address[0]].addHeartbeat(secs, float(rate)/10.0)
-                  self.__lock.release()
-                # or create a new master
-                else:
-  #                print "create new masterstate", ''.join(['http://', address[0],':',str(monitor_port)])
-                  self.__lock.acquire(True)
-                  self.masters[address[0]] = DiscoveredMaster(monitoruri=''.join(['http://', address[0],':',str(monitor_port)]), 
-                                                              heartbeat_rate=float(rate)/10.0,
-                                                              timestamp=float(secs)+float(nsecs)/1000000000,
-                                                              callback_master_state=self.publish_masterstate)
+              uri_hash = state_digest = None
+              if version == 1 and len(msg) == struct.calcsize(Discoverer.HEARTBEAT_FMT_V1):
+                (r, version, rate, secs, nsecs, monitor_port) = struct.unpack(Discoverer.HEARTBEAT_FMT_V1, msg)
+              elif version == 2 and len(msg) == struct.calcsize(Discoverer.HEARTBEAT_FMT):
+                (r, version, rate, secs, nsecs, monitor_port, uri_hash, state_hash, nodes, topics, services) = struct.unpack(Discoverer.HEARTBEAT_FMT, msg)
+                state_digest = (state_hash, nodes, topics, services)
+              else:
+                rospy.logwarn("wrong size %d of the heartbeat version %s received from %s", len(msg), str(version), str(address))
+                continue
+              # a new ROS master on a known host, remove the old one
+              known = self.masters.get(key, None)
+              if secs != -1 and not known is None and not uri_hash is None and known.masteruri_hash not in (None, uri_hash):
+                self.__removeMaster(key)
+              # remove master if sec and nsec are -1
+              if secs == -1:
+                self.__removeMaster(key)
+                self.__removePeer(key)
+              else:
+                self.__lock.acquire(True)
+                try:
+                  master = self.masters.get(key, None)
+                  # learn new peers in unicast mode and answer new masters immediately
+                  if not self.__peers is None and (master is None or not self.__peers.has_key(key)):
+                    self.__peers[key] = 0.
+                  # create a new master
+                  if master is None:
+#                    print "create new masterstate", ''.join(['http://', address[0],':',str(monitor_port)])
+                    self.masters[key] = DiscoveredMaster(monitoruri=''.join(['http://', address[0],':',str(monitor_port)]), 
+                                                                heartbeat_rate=float(rate)/10.0,
+                                                                timestamp=float(secs)+float(nsecs)/1000000000,
+                                                                callback_master_state=self.publish_masterstate,
+                                                                masteruri_hash=uri_hash,
+                                                                state_digest=state_digest)
+                finally:
                   self.__lock.release()
+                # update the timestamp of existing master outside of the lock
+                if not master is None:
+                  if master.masteruri_hash is None:
+                    master.masteruri_hash = uri_hash
+                  master.addHeartbeat(secs, float(rate)/10.0, state_digest)
             else:
               rospy.logwarn("wrong initial discovery message char %s received from %s ", str(r), str(address))
           elif (version > Discoverer.VERSION):
@@ -403,50 +700,69 @@ class Discoverer(threading.Thread):
           else:
             rospy.logwarn("heartbeat version %s expected, received: %s", str(Discoverer.VERSION), str(version))
 
+  def __removePeer(self, address):
+    '''
+    Removes the learned peer with given address in unicast mode. The static 
+    peers are kept.
+    @param address: the address of the peer
+    @type address:  C{(str, int)}
+    '''
+    self.__lock.acquire(True)
+    try:
+      if not self.__peers is None and not address in self.__static_peers:
+        self.__peers.pop(address, None)
+    finally:
+      self.__lock.release()
+
+  def __removeMaster(self, address):
+    '''
+    Removes the master with given address and publishes the removed state.
+    @param address: the address of the discovered master
+    @type address:  C{(str, int)}
+    '''
+    self.__lock.acquire(True)
+    try:
+      master = self.masters.pop(address, None)
+    finally:
+      self.__lock.release()
+    if not master is None and not master.mastername is None:
+      self.publish_masterstate(MasterState(MasterState.STATE_REMOVED, 
+                                     ROSMaster(str(master.mastername), 
+                                               master.masteruri, 
+                                               master.timestamp, 
+                                               False, 
+                                               master.discoverername, 
+                                               master.monitoruri)))
+
   def timed_stats_calculation(self):
     '''
-    This method will be called by a timer and has two jobs:
+    This method will be called by a timer and has three jobs:
      1. set the masters offline, if no heartbeat messages are received a long time
      2. calculate the quality of known links
+     3. remove the learned peers of the offline masters (unicast mode)
+    The global lock is only held to copy the list of the masters, so the 
+    receive loop is not blocked by the calculation and publishing.
     @see: L{float}
     '''
     result = LinkStatesStamped()
     current_time = time.time()
     result.header.stamp.secs = int(current_time)
     result.header.stamp.nsecs = int((current_time - result.header.stamp.secs) * 1000000000)
+    self.__lock.acquire(True)
     try:
-      self.__lock.acquire(True)
-  #    self.__lock.release()
-      for (k, v) in self.masters.iteritems():
-        quality = -1.0
-   #     self.__lock.acquire(True)
+      masters = self.masters.values()
+    finally:
+      self.__lock.release()
+    for v in masters:
+      try:
         if not (v.mastername is None):
-          rate = v.heartbeat_rate
-          measurement_duration = Discoverer.MEASUREMENT_INTERVALS
-          if rate < 1.:
-            measurement_duration = Discoverer.MEASUREMENT_INTERVALS / rate
-          # remove all heartbeats, which are to old
-          ts_oldest = current_time - measurement_duration
-          removed_ts = v.removeHeartbeats(ts_oldest)
-          # sets the master offline if the last received heartbeat is to old
-          if len(v.heartbeats) > 0:
-            last_ts = v.heartbeats[-1]
-            if current_time - last_ts > measurement_duration * Discoverer.TIMEOUT_FACTOR:
-              v.setOffline()
-          elif removed_ts > 0: # no heartbeats currently received, and last removed, so set master offline
-            v.setOffline()
-          # calculate the quality for inly online masters
+          quality = v.linkQuality(current_time, Discoverer.MEASUREMENT_INTERVALS, Discoverer.TIMEOUT_FACTOR)
           if v.online:
-            beats_count = len(v.heartbeats)
-            expected_count = rate * measurement_duration
-    #        print "beats_count:",beats_count, ", expected_count:",expected_count
-            if expected_count > 0:
-              quality = float(beats_count) / float(expected_count) * 100.0
-              if quality > 100.0:
-                quality = 100.0
             result.links.append(LinkState(v.mastername, quality))
-    finally:
-      self.__lock.release()
+      except:
+        import traceback
+        traceback.print_exc()
+    self._expirePeers()
     #publish the results
     self.publish_stats(result)
     try:
@@ -456,6 +772,23 @@ class Discoverer(threading.Thread):
     except:
       pass
 
+  def _expirePeers(self):
+    '''
+    Removes the learned peers, which masters are removed or offline (unicast 
+    mode). The static peers are kept, so they are probed until they answer. A 
+    learned peer is added again on the next received heartbeat.
+    '''
+    self.__lock.acquire(True)
+    try:
+      if not self.__peers is None:
+        for addr in self.__peers.keys():
+          if not addr in self.__static_peers:
+            master = self.masters.get(addr, None)
+            if master is None or (not master.online and not master.mastername is None):
+              del self.__peers[addr]
+    finally:
+      self.__lock.release()
+
   def publish_masterstate(self, master_state):
     '''
     Publishes the given state to the ROS network. This method is thread safe.
@@ -474,18 +807,16 @@ class Discoverer(threading.Thread):
 
   def publish_stats(self, stats):
     '''
-    Publishes the link quality states to the ROS network.This method is thread safe.
+    Publishes the link quality states to the ROS network. The publisher is 
+    only used by the statistic timer, so no lock is needed.
     @param stats: the link quality states to publish
     @type stats:  L{master_discovery_fkie.LinkStatesStamped}
     '''
-    if self.__lock.acquire(True):
-      try:
-        self.pubstats.publish(stats)
-      except:
-        import traceback
-        traceback.print_exc()
-      finally:
-        self.__lock.release()
+    try:
+      self.pubstats.publish(stats)
+    except:
+      import traceback
+      traceback.print_exc()
 
   def rosservice_list_masters(self, req):
     '''
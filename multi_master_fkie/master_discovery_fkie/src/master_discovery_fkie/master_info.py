@@ -30,7 +30,9 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import struct
 import time
+import zlib
 
 import roslib; roslib.load_manifest('master_discovery_fkie')
 import rospy
@@ -40,7 +42,12 @@ class NodeInfo(object):
   '''
   The NodeInfo class stores informations about a ROS node.
   '''
-  def __init__(self, name, masteruri):
+  __slots__ = ('__name', '__masteruri', '__uri', '__pid', '__local',
+               '__publishedTopics', '__publishedTopicsIdx',
+               '__subscribedTopics', '__subscribedTopicsIdx',
+               '__services', '__servicesIdx', '__fingerprint', '__parent')
+
+  def __init__(self, name, masteruri, parent=None):
     '''
     Creates a new NodeInfo for a node with given name.
     @param name: the name of the node
@@ -49,16 +56,23 @@ class NodeInfo(object):
     This masteruri will be used to determine, whether the ROS master and the 
     node are running on the same machine.
     @type masteruri: C{str}
+    @param parent: the L{MasterInfo} to inform about changes of this node
+    @type parent: L{MasterInfo} or C{None}
     '''
     self.__name = name
     self.__masteruri = masteruri
     self.__uri = None
-    self.pid = None
-    '''@ivar: the process id of the node. Invalid id has a C{None} value'''
+    self.__pid = None
     self.__local = False
+    self.__fingerprint = None
+    self.__parent = parent
+    # the lists keep the order, the sets are used for fast membership tests
     self.__publishedTopics = []
+    self.__publishedTopicsIdx = set()
     self.__subscribedTopics = []
+    self.__subscribedTopicsIdx = set()
     self.__services = []
+    self.__servicesIdx = set()
 
   @property
   def name(self):
@@ -82,6 +96,7 @@ class NodeInfo(object):
     Sets the URI of the RPC API of the node.
     '''
     self.__uri = uri
+    self._changed()
     from urlparse import urlparse
     om = urlparse(self.__masteruri)
     on = urlparse(uri if not uri is None else '')
@@ -91,6 +106,23 @@ class NodeInfo(object):
     except:
       pass
 
+  @property
+  def pid(self):
+    '''
+    Returns the process id of the node. Invalid id has a C{None} value.
+    @rtype: C{int} or C{None}
+    '''
+    return self.__pid
+
+  @pid.setter
+  def pid(self, pid):
+    '''
+    Sets the process id of the node.
+    '''
+    if self.__pid != pid:
+      self.__pid = pid
+      self._changed()
+
   @property
   def masteruri(self):
     '''
@@ -122,14 +154,16 @@ class NodeInfo(object):
     @param name: the name of the topic
     @type name: C{str} 
     '''
-    try:
-      self.__publishedTopics.index(name)
-    except ValueError:
+    if not name in self.__publishedTopicsIdx:
+      self.__publishedTopicsIdx.add(name)
       self.__publishedTopics.append(name)
+      self._changed()
 
   @publishedTopics.deleter
   def publishedTopics(self):
-    del self.__publishedTopics
+    self.__publishedTopics = []
+    self.__publishedTopicsIdx = set()
+    self._changed()
 
   @property
   def subscribedTopics(self):
@@ -146,14 +180,16 @@ class NodeInfo(object):
     @param name: the name of the topic
     @type name: C{str} 
     '''
-    try:
-      self.__subscribedTopics.index(name)
-    except ValueError:
+    if not name in self.__subscribedTopicsIdx:
+      self.__subscribedTopicsIdx.add(name)
       self.__subscribedTopics.append(name)
+      self._changed()
 
   @subscribedTopics.deleter
   def subscribedTopics(self):
-    del self.__subscribedTopics
+    self.__subscribedTopics = []
+    self.__subscribedTopicsIdx = set()
+    self._changed()
 
   @property
   def services(self):
@@ -170,31 +206,61 @@ class NodeInfo(object):
     @param name: the name of the topic
     @type name: C{str} 
     '''
-    try:
-      self.__services.index(name)
-    except ValueError:
+    if not name in self.__servicesIdx:
+      self.__servicesIdx.add(name)
       self.__services.append(name)
+      self._changed()
 
   @services.deleter
   def services(self):
-    del self.__services
+    self.__services = []
+    self.__servicesIdx = set()
+    self._changed()
+
+  @property
+  def fingerprint(self):
+    '''
+    Returns a hash over the URI, process id and the relations of this node. The
+    value is cached until the node is changed.
+    @rtype: C{int}
+    '''
+    if self.__fingerprint is None:
+      self.__fingerprint = hash((self.__name, self.__uri, self.__pid,
+                                 frozenset(self.__publishedTopicsIdx),
+                                 frozenset(self.__subscribedTopicsIdx),
+                                 frozenset(self.__servicesIdx)))
+    return self.__fingerprint
+
+  def _changed(self):
+    self.__fingerprint = None
+    if not self.__parent is None:
+      self.__parent._invalidateFingerprint('nodes')
 
 
 class TopicInfo(object):
   '''
   The TopicInfo class stores informations about a ROS topic.
   '''
-  def __init__(self, name):
+  __slots__ = ('__name', '__type', '__publisherNodes', '__publisherNodesIdx',
+               '__subscriberNodes', '__subscriberNodesIdx', '__fingerprint', '__parent')
+
+  def __init__(self, name, parent=None):
     '''
     Creates a new TopicInfo for a topic with given name.
     @param name: the name of the topic
     @type name: C{str} 
+    @param parent: the L{MasterInfo} to inform about changes of this topic
+    @type parent: L{MasterInfo} or C{None}
     '''
     self.__name = name
-    self.type = None
-    '''@ivar: the type of the topic. (Default: None)'''
+    self.__type = None
+    self.__fingerprint = None
+    self.__parent = parent
+    # the lists keep the order, the sets are used for fast membership tests
     self.__publisherNodes = []
+    self.__publisherNodesIdx = set()
     self.__subscriberNodes = []
+    self.__subscriberNodesIdx = set()
 
   @property
   def name(self):
@@ -204,6 +270,23 @@ class TopicInfo(object):
     '''
     return self.__name
 
+  @property
+  def type(self):
+    '''
+    Returns the type of the topic. (Default: None)
+    @rtype: C{str} or C{None}
+    '''
+    return self.__type
+
+  @type.setter
+  def type(self, type):
+    '''
+    Sets the type of the topic.
+    '''
+    if self.__type != type:
+      self.__type = type
+      self._changed()
+
   @property
   def publisherNodes(self):
     '''
@@ -217,14 +300,16 @@ class TopicInfo(object):
     '''
     Append a new publishing node to this topic.
     '''
-    try:
-      self.__publisherNodes.index(name)
-    except ValueError:
+    if not name in self.__publisherNodesIdx:
+      self.__publisherNodesIdx.add(name)
       self.__publisherNodes.append(name)
+      self._changed()
 
   @publisherNodes.deleter
   def publisherNodes(self):
-    del self.__publisherNodes
+    self.__publisherNodes = []
+    self.__publisherNodesIdx = set()
+    self._changed()
 
   @property
   def subscriberNodes(self):
@@ -239,14 +324,34 @@ class TopicInfo(object):
     '''
     Append a new subscribing node to this topic.
     '''
-    try:
-      self.__subscriberNodes.index(name)
-    except ValueError:
+    if not name in self.__subscriberNodesIdx:
+      self.__subscriberNodesIdx.add(name)
       self.__subscriberNodes.append(name)
+      self._changed()
 
   @subscriberNodes.deleter
   def subscriberNodes(self):
-    del self.__subscriberNodes
+    self.__subscriberNodes = []
+    self.__subscriberNodesIdx = set()
+    self._changed()
+
+  @property
+  def fingerprint(self):
+    '''
+    Returns a hash over the type, the publishers and subscribers of this topic.
+    The value is cached until the topic is changed.
+    @rtype: C{int}
+    '''
+    if self.__fingerprint is None:
+      self.__fingerprint = hash((self.__name, self.__type,
+                                 frozenset(self.__publisherNodesIdx),
+                                 frozenset(self.__subscriberNodesIdx)))
+    return self.__fingerprint
+
+  def _changed(self):
+    self.__fingerprint = None
+    if not self.__parent is None:
+      self.__parent._invalidateFingerprint('topics')
 
 
 
@@ -254,7 +359,11 @@ class ServiceInfo(object):
   '''
   The ServiceInfo class stores informations about a ROS service.
   '''
-  def __init__(self, name, masteruri):
+  __slots__ = ('__name', '__masteruri', '__uri', '__local', '__type',
+               '__service_class', 'args', '__serviceProvider', '__serviceProviderIdx',
+               '__fingerprint', '__parent')
+
+  def __init__(self, name, masteruri, parent=None):
     '''
     Creates a new instance of the ServiceInfo. 
     @param name: the name of the service
@@ -263,16 +372,21 @@ class ServiceInfo(object):
     This masteruri will be used to determine, whether the ROS master and the 
     service are running on the same machine.
     @type masteruri: C{str}
+    @param parent: the L{MasterInfo} to inform about changes of this service
+    @type parent: L{MasterInfo} or C{None}
     '''
     self.__name = name
     self.__masteruri = masteruri
     self.__uri = None
     self.__local = False
-    self.type = None
-    '''@ivar: the type of the service. (Default: None)'''
+    self.__type = None
+    self.__fingerprint = None
+    self.__parent = parent
     self.__service_class = None
     self.args = None
+    # the list keeps the order, the set is used for fast membership tests
     self.__serviceProvider = []
+    self.__serviceProviderIdx = set()
 
   @property
   def name(self):
@@ -299,6 +413,7 @@ class ServiceInfo(object):
     @type uri: C{str}
     '''
     self.__uri = uri
+    self._changed()
     from urlparse import urlparse
     om = urlparse(self.__masteruri)
     os = urlparse(uri) if not uri is None else None
@@ -308,6 +423,23 @@ class ServiceInfo(object):
     except:
       pass
     
+  @property
+  def type(self):
+    '''
+    Returns the type of the service. (Default: None)
+    @rtype: C{str} or C{None}
+    '''
+    return self.__type
+
+  @type.setter
+  def type(self, type):
+    '''
+    Sets the type of the service.
+    '''
+    if self.__type != type:
+      self.__type = type
+      self._changed()
+
   @property
   def isLocal(self):
     '''
@@ -332,14 +464,33 @@ class ServiceInfo(object):
     @param name: name of the new service provider
     @type name: C{str}
     '''
-    try:
-      self.__serviceProvider.index(name)
-    except ValueError:
+    if not name in self.__serviceProviderIdx:
+      self.__serviceProviderIdx.add(name)
       self.__serviceProvider.append(name)
+      self._changed()
 
   @serviceProvider.deleter
   def serviceProvider(self):
-    del self.__serviceProvider
+    self.__serviceProvider = []
+    self.__serviceProviderIdx = set()
+    self._changed()
+
+  @property
+  def fingerprint(self):
+    '''
+    Returns a hash over the URI, type and the providers of this service. The
+    value is cached until the service is changed.
+    @rtype: C{int}
+    '''
+    if self.__fingerprint is None:
+      self.__fingerprint = hash((self.__name, self.__uri, self.__type,
+                                 frozenset(self.__serviceProviderIdx)))
+    return self.__fingerprint
+
+  def _changed(self):
+    self.__fingerprint = None
+    if not self.__parent is None:
+      self.__parent._invalidateFingerprint('services')
 
 
   def get_service_class(self, allow_get_type=False):
@@ -429,6 +580,12 @@ class MasterInfo(object):
     self.__nodelist = {}
     self.__topiclist = {}
     self.__servicelist = {}
+    # the cached fingerprints of the nodes, topics and services and the root
+    # fingerprint over all of them. None means invalid.
+    self.__digests = {'nodes': None, 'topics': None, 'services': None}
+    self.__fingerprint = None
+    # the cached result of listedState()
+    self.__listed = None
     self.__timestamp = 0
     self.check_ts = 0
     '''@ivar: the last time, when the state of the ROS master retrieved'''
@@ -526,6 +683,7 @@ class MasterInfo(object):
     '''
     self.__timestamp = ts
     self.check_ts = ts
+    self.__listed = None
 
   @property
   def nodes(self):
@@ -546,7 +704,8 @@ class MasterInfo(object):
     if (name is None) or not name:
       return None
     if not (name in self.__nodelist):
-      self.__nodelist[name] = NodeInfo(name, self.__masteruri)
+      self.__nodelist[name] = NodeInfo(name, self.__masteruri, self)
+      self._invalidateFingerprint('nodes')
 
   @property
   def node_names(self):
@@ -587,7 +746,8 @@ class MasterInfo(object):
     if (name is None) or not name:
       return None
     if not (name in self.__topiclist):
-      self.__topiclist[name] = TopicInfo(name)
+      self.__topiclist[name] = TopicInfo(name, self)
+      self._invalidateFingerprint('topics')
 
   @property
   def topic_names(self):
@@ -616,7 +776,8 @@ class MasterInfo(object):
     if (name is None) or not name:
       return None
     if not (name in self.__servicelist):
-      self.__servicelist[name] = ServiceInfo(name, self.__masteruri)
+      self.__servicelist[name] = ServiceInfo(name, self.__masteruri, self)
+      self._invalidateFingerprint('services')
 
   @property
   def service_names(self):
@@ -685,10 +846,78 @@ class MasterInfo(object):
       return None
     return self.__servicelist.get(name, None)
   
+  @property
+  def fingerprint(self):
+    '''
+    Returns a hash over the fingerprints of all nodes, topics and services. The
+    value is cached until a node, topic or service is changed.
+    @rtype: C{int}
+    '''
+    if self.__fingerprint is None:
+      self.__fingerprint = hash((self.__masteruri,
+                                 self.__digest('nodes', self.__nodelist),
+                                 self.__digest('topics', self.__topiclist),
+                                 self.__digest('services', self.__servicelist)))
+    return self.__fingerprint
+
+  def __digest(self, kind, items):
+    '''
+    Returns the cached hash over the fingerprints of the given items.
+    '''
+    result = self.__digests[kind]
+    if result is None:
+      result = hash(frozenset(item.fingerprint for item in items.itervalues()))
+      self.__digests[kind] = result
+    return result
+
+  def _invalidateFingerprint(self, kind):
+    '''
+    Invalidates the cached fingerprints and the cached result of
+    L{listedState()}. Will be called by L{NodeInfo},
+    L{TopicInfo} and L{ServiceInfo} on changes.
+    @param kind: one of C{nodes}, C{topics} or C{services}
+    @type kind: C{str}
+    '''
+    self.__digests[kind] = None
+    self.__fingerprint = None
+    self.__listed = None
+
+  def diff(self, other):
+    '''
+    Returns the names of the nodes, topics and services changed in this state
+    compared to the other state. The timestamp will not be compared. Only the
+    entries of kinds with different fingerprints are compared.
+    @param other: the older L{MasterInfo} instance or C{None}
+    @type other: L{MasterInfo}
+    @return: C{(nodes, topics, services)}, each as C{(added, removed, changed)}
+    lists of names.
+    @rtype: C{(([str], [str], [str]), ([str], [str], [str]), ([str], [str], [str]))}
+    '''
+    result = []
+    for kind, items in [('nodes', self.__nodelist), ('topics', self.__topiclist), ('services', self.__servicelist)]:
+      if other is None:
+        result.append((items.keys(), [], []))
+        continue
+      other_items = getattr(other, kind)
+      if self.__digest(kind, items) == other.__digest(kind, other_items):
+        result.append(([], [], []))
+        continue
+      added = []
+      changed = []
+      for name, item in items.iteritems():
+        other_item = other_items.get(name, None)
+        if other_item is None:
+          added.append(name)
+        elif item.fingerprint != other_item.fingerprint:
+          changed.append(name)
+      removed = [name for name in other_items.iterkeys() if not name in items]
+      result.append((added, removed, changed))
+    return tuple(result)
+
   def __eq__(self, other):
     '''
     Compares the master state with other master state. The timestamp will not be 
-    compared.
+    compared. Only the cached fingerprints are compared, see L{fingerprint}.
     @param other: the another L{MasterInfo} instance.
     @type other: L{MasterInfo}
     @return: True, if the states are equal.
@@ -696,41 +925,19 @@ class MasterInfo(object):
     '''
     if (other is None):
       return False
+    if (other is self):
+      return True
     if (self.masteruri != other.masteruri):
       return False
-    if (set(self.node_uris) ^ set(other.node_uris)):
-      return False
-    if (set(self.node_names) ^ set(other.node_names)):
-      return False
-    if (set(self.topic_names) ^ set(other.topic_names)):
-      return False
-    if (set(self.service_names) ^ set(other.service_names)):
-      return False
-    if (set(self.service_uris) ^ set(other.service_uris)):
-      return False
-    # test for changes of each node parameter
-    for name in self.node_names:
-      n1 = self.getNode(name)
-      n2 = other.getNode(name)
-      if not n1 is None and not n2 is None:
-        if n1.pid != n2.pid:
-          return False
-        if n1.uri != n2.uri:
-          return False
-        if set(n1.publishedTopics) ^ set(n2.publishedTopics):
-          return False
-        if set(n1.subscribedTopics) ^ set(n2.subscribedTopics):
-          return False
-        if set(n1.services) ^ set(n2.services):
-          return False
-    return True
-  
+    return self.fingerprint == other.fingerprint
+
   def __ne__(self, other):
     return not self.__eq__(other)
   
   def listedState(self):
     '''
-    Returns a extended roscore state. 
+    Returns a extended roscore state. The result is cached until this state is
+    changed, so it must not be modified.
     @return: complete roscore state as
              
              C{(stamp, masteruri, name, publishers, subscribers, services, topicTypes, nodes, serviceProvider)}
@@ -769,6 +976,8 @@ class MasterInfo(object):
                [ [str,str,int,str] ], 
                [ [str,str,str,str] ])}
     '''
+    if not self.__listed is None:
+      return self.__listed
     stamp = str(self.timestamp)
     publishers = []
     subscribers = []
@@ -785,12 +994,209 @@ class MasterInfo(object):
         subscribers.append((name, sn))
       topicTypes.append((name, topic.type))
     for name, service in self.services.items():
-      services.append((name, service.serviceProvider))
+      services.append((name, list(service.serviceProvider)))
       serviceProvider.append((name, service.uri, service.type if not service.type is None else '', 'local' if service.isLocal else 'remote'))
     for name, node in self.nodes.items():
       nodes.append((name, node.uri, node.pid, 'local' if node.isLocal else 'remote'))
 
-    return (stamp, self.masteruri, self.mastername, publishers, subscribers, services, topicTypes, nodes, serviceProvider)
-  
+    self.__listed = (stamp, self.masteruri, self.mastername, publishers, subscribers, services, topicTypes, nodes, serviceProvider)
+    return self.__listed
+
+  PACKED_MAGIC = 'MIP\x01'
+  '''@ivar: the header of the packed state format, see L{packedState()}'''
+
+  def packedState(self):
+    '''
+    Returns the state of L{listedState()} in a compact binary format. All
+    strings are stored once in a string table and referenced by their index.
+    The result is compressed by zlib.
+    @see: L{unpackState()} and L{from_packed()}
+    @return: the packed state
+    @rtype: C{str}
+    '''
+    return MasterInfo.packState(self.listedState())
+
+  @staticmethod
+  def packState(listed):
+    '''
+    Packs a state in the format of L{listedState()} into the binary format.
+    @see: L{packedState()}
+    @param listed: the state returned by L{listedState()}
+    @type listed: C{tuple}
+    @return: the packed state
+    @rtype: C{str}
+    '''
+    strings = []
+    index = {}
+    def idx(value):
+      # 0 is reserved for None
+      if value is None:
+        return 0
+      if isinstance(value, unicode):
+        value = value.encode('utf-8')
+      else:
+        value = str(value)
+      try:
+        return index[value]
+      except KeyError:
+        strings.append(value)
+        index[value] = len(strings)
+        return index[value]
+    ints = [idx(listed[0]), idx(listed[1]), idx(listed[2])]
+    # publishers, subscribers, services
+    for pos in (3, 4, 5):
+      ints.append(len(listed[pos]))
+      for name, nodes in listed[pos]:
+        ints.append(idx(name))
+        ints.append(len(nodes))
+        ints.extend(idx(n) for n in nodes)
+    # topic types
+    ints.append(len(listed[6]))
+    for name, type in listed[6]:
+      ints.extend((idx(name), idx(type)))
+    # nodes, the pid is stored increased by one, 0 is None
+    ints.append(len(listed[7]))
+    for name, uri, pid, local in listed[7]:
+      ints.extend((idx(name), idx(uri), 0 if pid is None else int(pid) + 1, idx(local)))
+    # service provider
+    ints.append(len(listed[8]))
+    for name, uri, type, local in listed[8]:
+      ints.extend((idx(name), idx(uri), idx(type), idx(local)))
+    table = '\0'.join(strings)
+    data = ''.join([MasterInfo.PACKED_MAGIC,
+                    struct.pack('!III', len(strings), len(table), len(ints)),
+                    table,
+                    struct.pack('!%dI' % len(ints), *ints)])
+    return zlib.compress(data)
+
+  @staticmethod
+  def unpackState(packed):
+    '''
+    Unpacks the state created by L{packedState()}.
+    @param packed: the packed state
+    @type packed: C{str}
+    @return: the state in the format of L{listedState()}
+    @rtype: C{tuple}
+    @raise ValueError: if the data is not a valid packed state
+    '''
+    data = zlib.decompress(packed)
+    if not data.startswith(MasterInfo.PACKED_MAGIC):
+      raise ValueError("unknown format of the packed master state")
+    pos = len(MasterInfo.PACKED_MAGIC)
+    (count_strings, len_table, count_ints) = struct.unpack('!III', data[pos:pos+12])
+    pos += 12
+    strings = [None]
+    if count_strings:
+      strings.extend(data[pos:pos+len_table].split('\0'))
+    pos += len_table
+    ints = struct.unpack('!%dI' % count_ints, data[pos:pos+4*count_ints])
+    it = iter(ints)
+    read = it.next
+    result = [strings[read()], strings[read()], strings[read()]]
+    for _ in (3, 4, 5):
+      rows = []
+      for _ in xrange(read()):
+        name = strings[read()]
+        rows.append((name, [strings[read()] for _ in xrange(read())]))
+      result.append(rows)
+    result.append([(strings[read()], strings[read()]) for _ in xrange(read())])
+    nodes = []
+    for _ in xrange(read()):
+      name, uri, pid, local = read(), read(), read(), read()
+      nodes.append((strings[name], strings[uri], None if pid == 0 else pid - 1, strings[local]))
+    result.append(nodes)
+    result.append([(strings[read()], strings[read()], strings[read()], strings[read()]) for _ in xrange(read())])
+    return tuple(result)
+
+  @staticmethod
+  def from_packed(packed):
+    '''
+    Creates a new instance of the MasterInfo from the packed state.
+    @see: L{packedState()}
+    @param packed: the packed state
+    @type packed: C{str}
+    @return: the new instance of the MasterInfo
+    @rtype: MasterInfo
+    '''
+    return MasterInfo.from_list(MasterInfo.unpackState(packed))
+
+  @staticmethod
+  def listedDelta(old, new):
+    '''
+    Compares two states returned by L{listedState()} and returns the changes
+    needed to get the new state from the old one.
+    @param old: the old state returned by L{listedState()}
+    @type old: C{tuple}
+    @param new: the new state returned by L{listedState()}
+    @type new: C{tuple}
+    @return: the changes as
+
+             C{(stamp, masteruri, name, publishers, subscribers, services, topicTypes, nodes, serviceProvider)}
+
+             where each of C{publishers, subscribers, services, topicTypes, nodes, serviceProvider}
+             is a tuple C{(updated, removed)}. C{updated} contains the new or changed
+             entries in the format of L{listedState()}, C{removed} contains the names
+             of the removed entries.
+    @rtype: C{(str, str, str, ([..], [str]), ([..], [str]), ([..], [str]), ([..], [str]), ([..], [str]), ([..], [str]))}
+    '''
+    result = [new[0], new[1], new[2]]
+    for idx in range(3, 9):
+      old_rows = dict((row[0], row) for row in old[idx])
+      new_rows = dict((row[0], row) for row in new[idx])
+      updated = [row for name, row in new_rows.iteritems() if old_rows.get(name) != row]
+      removed = [name for name in old_rows.iterkeys() if not name in new_rows]
+      result.append((updated, removed))
+    return tuple(result)
+
+  @staticmethod
+  def joinListedDelta(deltas):
+    '''
+    Joins the consecutive changes created by L{listedDelta()} to one change.
+    @param deltas: the list with changes, the oldest first
+    @type deltas: C{[tuple, ...]}
+    @return: the joined changes in the format of L{listedDelta()}
+    @rtype: C{tuple}
+    '''
+    if not deltas:
+      return None
+    last = deltas[-1]
+    result = [last[0], last[1], last[2]]
+    for idx in range(3, 9):
+      updated = dict()
+      removed = set()
+      for delta in deltas:
+        (upd, rem) = delta[idx]
+        for row in upd:
+          updated[row[0]] = row
+          removed.discard(row[0])
+        for name in rem:
+          updated.pop(name, None)
+          removed.add(name)
+      result.append((updated.values(), list(removed)))
+    return tuple(result)
+
+  @staticmethod
+  def applyListedDelta(listed, delta):
+    '''
+    Applies the changes created by L{listedDelta()} to a state returned by
+    L{listedState()}.
+    @param listed: the state returned by L{listedState()}
+    @type listed: C{tuple}
+    @param delta: the changes created by L{listedDelta()}
+    @type delta: C{tuple}
+    @return: the new state in the format of L{listedState()}
+    @rtype: C{tuple}
+    '''
+    result = [delta[0], delta[1], delta[2]]
+    for idx in range(3, 9):
+      (updated, removed) = delta[idx]
+      rows = dict((row[0], row) for row in listed[idx])
+      for name in removed:
+        rows.pop(name, None)
+      for row in updated:
+        rows[row[0]] = row
+      result.append(rows.values())
+    return tuple(result)
+
   def __str__(self):
     return str(self.listedState())
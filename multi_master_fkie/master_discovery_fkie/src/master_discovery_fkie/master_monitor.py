@@ -31,10 +31,14 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import cStringIO
+from collections import deque
+import hashlib
 import threading
 import xmlrpclib
 import socket
 import time
+import uuid
+import SocketServer
 from SimpleXMLRPCServer import SimpleXMLRPCServer
 from SimpleXMLRPCServer import SimpleXMLRPCRequestHandler
 
@@ -42,6 +46,8 @@ import roslib; roslib.load_manifest('master_discovery_fkie')
 import rospy
 
 from master_info import MasterInfo, NodeInfo, TopicInfo, ServiceInfo
+from worker_pool import WorkerPool
+import xmlrpc_pool
 import interface_finder
 
 class MasterConnectionException(Exception):
@@ -53,9 +59,124 @@ class MasterConnectionException(Exception):
 def _succeed(args):
     code, msg, val = args
     if code != 1:
-        raise rosnode.ROSNodeException("remote call failed: %s"%msg)
+        raise MasterConnectionException("remote call failed: %s"%msg)
     return val
 
+class _RequestHandler(SimpleXMLRPCRequestHandler):
+  '''
+  The request handler with support of persistent HTTP/1.1 connections. Idle
+  connections will be closed after the C{connection_timeout} of the server.
+  If the server has a C{request_gate}, the count of concurrently processed 
+  requests is limited by it. Idle connections do not hold the gate.
+  '''
+  protocol_version = 'HTTP/1.1'
+
+  def setup(self):
+    self.timeout = self.server.connection_timeout
+    SimpleXMLRPCRequestHandler.setup(self)
+
+  def do_POST(self):
+    gate = self.server.request_gate
+    if gate is None:
+      return SimpleXMLRPCRequestHandler.do_POST(self)
+    gate.acquire()
+    try:
+      SimpleXMLRPCRequestHandler.do_POST(self)
+    finally:
+      gate.release()
+
+  def log_message(self, format, *args):
+    if self.server.logRequests:
+      SimpleXMLRPCRequestHandler.log_message(self, format, *args)
+
+
+class CachingXMLRPCServer(SimpleXMLRPCServer):
+  '''
+  The XML-RPC server stores the marshalled responses of the registered cached
+  methods until L{invalidate_cache()} is called.
+  '''
+  MAX_CACHED_RESPONSES = 32
+
+  def __init__(self, addr, cached_methods=[], requestHandler=_RequestHandler, logRequests=True, allow_none=False):
+    '''
+    @param addr: the address to bind the server
+    @type addr: C{(str, int)}
+    @param cached_methods: the names of the RPC methods with cached responses
+    @type cached_methods: C{[str, ...]}
+    '''
+    SimpleXMLRPCServer.__init__(self, addr, requestHandler=requestHandler, logRequests=logRequests, allow_none=allow_none)
+    self.connection_timeout = None
+    self.request_gate = None
+    self._cached_methods = set(cached_methods)
+    self._cache = dict()
+    self._cache_generation = 0
+    self._cache_lock = threading.Lock()
+
+  def invalidate_cache(self):
+    '''
+    Removes all cached responses. Responses created while this call will not be
+    stored.
+    '''
+    self._cache_lock.acquire()
+    try:
+      self._cache_generation += 1
+      self._cache.clear()
+    finally:
+      self._cache_lock.release()
+
+  def _marshaled_dispatch(self, data, dispatch_method=None, path=None):
+    method = None
+    if self._cached_methods:
+      try:
+        params, method = xmlrpclib.loads(data)
+      except:
+        pass
+    if not method in self._cached_methods:
+      return SimpleXMLRPCServer._marshaled_dispatch(self, data, dispatch_method, path)
+    # the request data is used as key to cache also the calls with parameter
+    self._cache_lock.acquire()
+    try:
+      generation = self._cache_generation
+      response = self._cache.get(data, None)
+    finally:
+      self._cache_lock.release()
+    if response is None:
+      response = SimpleXMLRPCServer._marshaled_dispatch(self, data, dispatch_method, path)
+      if not '<fault>' in response[:100]:
+        self._cache_lock.acquire()
+        try:
+          if generation == self._cache_generation and len(self._cache) < CachingXMLRPCServer.MAX_CACHED_RESPONSES:
+            self._cache[data] = response
+        finally:
+          self._cache_lock.release()
+    return response
+
+
+class ThreadingXMLRPCServer(SocketServer.ThreadingMixIn, CachingXMLRPCServer):
+  '''
+  The XML-RPC server handles each connection in its own thread. The count of
+  the concurrently processed requests is limited, further requests wait until
+  a request is finished. The persistent connections of idle clients are not
+  limited, they are closed after C{connection_timeout}.
+  '''
+  daemon_threads = True
+
+  def __init__(self, addr, max_threads=10, connection_timeout=30.0, cached_methods=[], logRequests=True, allow_none=False):
+    '''
+    @param addr: the address to bind the server
+    @type addr: C{(str, int)}
+    @param max_threads: the maximal count of concurrently processed requests
+    @type max_threads: C{int}
+    @param connection_timeout: the timeout in seconds for idle connections
+    @type connection_timeout: C{float}
+    @param cached_methods: the names of the RPC methods with cached responses
+    @type cached_methods: C{[str, ...]}
+    '''
+    CachingXMLRPCServer.__init__(self, addr, cached_methods, logRequests=logRequests, allow_none=allow_none)
+    self.connection_timeout = connection_timeout
+    self.request_gate = threading.BoundedSemaphore(max_threads)
+
+
 class MasterMonitor(object):
   '''
   This class provides methods to get the state from the ROS master using his 
@@ -65,9 +186,28 @@ class MasterMonitor(object):
   RPC Methods:
   @see: L{getListedMasterInfo()} or L{getMasterContacts()} as RPC: C{masterInfo()} and 
   C{masterContacts()}
-  @group RPC-methods: getListedMasterInfo, getMasterContacts
+  @see: L{getListedMasterInfoDelta()} as RPC: C{masterInfoDelta()}
+  @see: L{getPackedMasterInfo()} as RPC: C{masterInfoPacked()}
+  @group RPC-methods: getListedMasterInfo, getListedMasterInfoDelta, getPackedMasterInfo, getMasterContacts
   '''
 
+  CHANGELOG_SIZE = 50
+  '''@ivar: the count of the last state changes stored to answer the C{masterInfoDelta()} requests.'''
+  MAX_WORKERS = 10
+  '''@ivar: the maximal count of threads used to request the nodes and services concurrently.'''
+  NODE_TIMEOUT = 1.0
+  '''@ivar: the timeout in seconds for requests to the nodes and services.'''
+  RPC_MAX_THREADS = 10
+  '''@ivar: the maximal count of concurrently processed requests of the XML-RPC
+  server, idle persistent connections are not counted. If C{0}, the requests are handled one after another in one thread. In this
+  case the connections are closed after each request.'''
+  RPC_CONNECTION_TIMEOUT = 30.0
+  '''@ivar: the timeout in seconds to close idle connections to the XML-RPC server.'''
+  FULL_REFRESH_INTERVAL = 5.0
+  '''@ivar: the interval in seconds to request the URIs of all nodes and services,
+  even if the system state of the ROS master is not changed. Restarted nodes
+  with unchanged topics and services are detected by this refresh.'''
+
   def __init__(self, rpcport=11611):
     '''
     Initialize method. Creates an XML-RPC server on given port and starts this
@@ -85,17 +225,63 @@ class MasterMonitor(object):
 
     self.master_state = None
     '''@ivar: the current state of the ROS master'''
+    self.state_version = 0
+    '''@ivar: the version of the current state, will be increased on each change of the state'''
+    self.state_epoch = uuid.uuid4().hex
+    '''@ivar: identifies this instance of the monitor, the versions of different instances are not comparable'''
+    if rospy.has_param('~changelog_size'):
+      MasterMonitor.CHANGELOG_SIZE = rospy.get_param('~changelog_size')
+    # the list with the last changes as tuples of (version, changes), the oldest first
+    self.__changelog = deque(maxlen=MasterMonitor.CHANGELOG_SIZE)
+    if rospy.has_param('~max_workers'):
+      MasterMonitor.MAX_WORKERS = rospy.get_param('~max_workers')
+    if rospy.has_param('~node_timeout'):
+      MasterMonitor.NODE_TIMEOUT = rospy.get_param('~node_timeout')
+    self._pool = WorkerPool(MasterMonitor.MAX_WORKERS, 'MasterMonitor')
+    # the shared pool with the persistent connections to the ROS master and nodes
+    if rospy.has_param('~rpc_client_max_per_host'):
+      xmlrpc_pool.sharedPool().max_per_host = rospy.get_param('~rpc_client_max_per_host')
+    if rospy.has_param('~rpc_client_idle_timeout'):
+      xmlrpc_pool.sharedPool().idle_timeout = rospy.get_param('~rpc_client_idle_timeout')
+    # the process ids of the local nodes, the key is a tuple of (node name, node URI)
+    self.__pid_cache = dict()
+    # the types of the local services, the key is a tuple of (service name, service URI)
+    self.__service_type_cache = dict()
+    if rospy.has_param('~full_refresh_interval'):
+      MasterMonitor.FULL_REFRESH_INTERVAL = rospy.get_param('~full_refresh_interval')
+    # the hash of the last system state and topic types retrieved from the ROS master
+    self.__state_fingerprint = None
+    self.__last_full_refresh = 0
+    # the URIs of the nodes and services of the last retrieved state
+    self.__node_uris = dict()
+    self.__service_uris = dict()
     self.rpcport = rpcport
     '''@ivar: the port number of the RPC server'''
+    if rospy.has_param('~rpc_max_threads'):
+      MasterMonitor.RPC_MAX_THREADS = rospy.get_param('~rpc_max_threads')
+    if rospy.has_param('~rpc_connection_timeout'):
+      MasterMonitor.RPC_CONNECTION_TIMEOUT = rospy.get_param('~rpc_connection_timeout')
     
     # Create an XML-RPC server
     ready = False
     while not ready and (not rospy.is_shutdown()):
       try:
-        self.rpcServer = SimpleXMLRPCServer(('', rpcport), logRequests=False, allow_none=True)
+        cached_methods = ['masterInfo', 'masterInfoPacked', 'masterInfoDelta', 'masterContacts']
+        if MasterMonitor.RPC_MAX_THREADS > 0:
+          self.rpcServer = ThreadingXMLRPCServer(('', rpcport), 
+                                                 max_threads=MasterMonitor.RPC_MAX_THREADS,
+                                                 connection_timeout=MasterMonitor.RPC_CONNECTION_TIMEOUT,
+                                                 cached_methods=cached_methods,
+                                                 logRequests=False, allow_none=True)
+        else:
+          self.rpcServer = CachingXMLRPCServer(('', rpcport), cached_methods,
+                                               requestHandler=SimpleXMLRPCRequestHandler,
+                                               logRequests=False, allow_none=True)
         rospy.loginfo("Start RPC-XML Server at %s", self.rpcServer.server_address)
         self.rpcServer.register_introspection_functions()
         self.rpcServer.register_function(self.getListedMasterInfo, 'masterInfo')
+        self.rpcServer.register_function(self.getListedMasterInfoDelta, 'masterInfoDelta')
+        self.rpcServer.register_function(self.getPackedMasterInfo, 'masterInfoPacked')
         self.rpcServer.register_function(self.getMasterContacts, 'masterContacts')
         self._rpcThread = threading.Thread(target = self.rpcServer.serve_forever)
         self._rpcThread.setDaemon(True)
@@ -134,81 +320,126 @@ class MasterMonitor(object):
 
   def getNodePid(self, nodes):
     '''
-    Gets process id of the node.
+    Gets process ids of the nodes. The process ids will be requested concurrently
+    and only for nodes with unknown name or changed URI. If a node is not reachable,
+    his URI will be requested again from the ROS master.
+    @param nodes: the dictionary with names and URIs of the nodes
+    @type nodes: C{dict(str:str)}
+    '''
+    pid_cache = dict()
+    requests = []
+    for (nodename, uri) in nodes.items():
+      if not uri is None:
+        pid = self.__pid_cache.get((nodename, uri), None)
+        if pid is None:
+          requests.append((nodename, uri))
+        else:
+          pid_cache[(nodename, uri)] = pid
+    # the requests are processed in waves of MAX_WORKERS
+    timeout = MasterMonitor.NODE_TIMEOUT * (2 + len(requests) / MasterMonitor.MAX_WORKERS)
+    pids = self._pool.map(self._requestNodePid, requests, timeout)
+    failed = []
+    for (nodename, uri), pid in zip(requests, pids):
+      if pid is None:
+        failed.append(nodename)
+      else:
+        pid_cache[(nodename, uri)] = pid
+    self.__pid_cache = pid_cache
+    self._lock.acquire(True)
+    try:
+      for (nodename, uri), pid in pid_cache.items():
+        self.new_master_state.getNode(nodename).pid = pid
+      if failed:
+        # request the URI of not reachable nodes again
+        master = xmlrpc_pool.serverProxy(self.__masteruri)
+        param_server_multi = xmlrpclib.MultiCall(master)
+        for nodename in failed:
+          param_server_multi.lookupNode(rospy.get_name(), nodename)
+        for (code, message, uri), nodename in zip(param_server_multi(), failed):
+          self.new_master_state.getNode(nodename).uri = uri if code != -1 else None
+    except:
+      import traceback
+      print traceback.format_exc()
+    finally:
+      self._lock.release()
+
+  def _requestNodePid(self, nodename, uri):
+    '''
+    Requests the process id of the node using his XML-RPC interface.
     @param nodename: the name of the node
     @type nodename: C{str}
     @param uri: the uri of the node
     @type uri: C{str}
+    @return: the process id or C{None} on error
+    @rtype: C{int} or C{None}
     '''
-    for (nodename, uri) in nodes.items():
+    try:
+      node = xmlrpc_pool.serverProxy(uri, MasterMonitor.NODE_TIMEOUT)
+      return _succeed(node.getPid(rospy.get_name()))
+    except (Exception, socket.error):
+      return None
+
+  def getServiceInfo(self, services):
+    '''
+    Gets service types through the RPC interface of the services. The services
+    will be probed concurrently and only services with unknown name or changed
+    URI are probed.
+    @param services: the dictionary with names and URIs of the services
+    @type services: C{dict(str:str)}
+    '''
+    type_cache = dict()
+    requests = []
+    for (service, uri) in services.items():
       if not uri is None:
-        pid = None
-        try:
-          node = xmlrpclib.ServerProxy(uri)
-          pid = _succeed(node.getPid(rospy.get_name()))
-        except (Exception, socket.error):
-    #      import traceback
-    #      print traceback.format_exc()
-          self._lock.acquire(True)
-          master = xmlrpclib.ServerProxy(self.__masteruri)
-    #      print "request again nodeuri for", nodename
-          code, message, self.new_master_state.getNode(nodename).uri = master.lookupNode(rospy.get_name(), nodename)
-          self._lock.release()
-          if (code == -1):
-            self._lock.acquire(True)
-            self.new_master_state.getNode(nodename).uri = None
-            self._lock.release()
+        type = self.__service_type_cache.get((service, uri), None)
+        if type is None:
+          requests.append((service, uri))
         else:
-          self._lock.acquire(True)
-          self.new_master_state.getNode(nodename).pid = pid
-          self._lock.release()
+          type_cache[(service, uri)] = type
+    # the requests are processed in waves of MAX_WORKERS
+    timeout = MasterMonitor.NODE_TIMEOUT * (2 + len(requests) / MasterMonitor.MAX_WORKERS)
+    types = self._pool.map(self._requestServiceType, requests, timeout)
+    for key, type in zip(requests, types):
+      if not type is None:
+        type_cache[key] = type
+    self.__service_type_cache = type_cache
+    self._lock.acquire(True)
+    try:
+      for (service, uri), type in type_cache.items():
+        self.new_master_state.getService(service).type = type
+    except:
+      import traceback
+      print traceback.format_exc()
+    finally:
+      self._lock.release()
 
-  def getServiceInfo(self, services):
+  def _requestServiceType(self, service, uri):
     '''
-    Gets service info through the RPC interface of the service.
+    Probes the service to get his type from the connection header.
     @param service: the name of the service
     @type service: C{str}
     @param uri: the uri of the service
     @type uri: C{str}
+    @return: the type of the service or C{None} on error
+    @rtype: C{str} or C{None}
     '''
-    for (service, uri) in services.items():
-      if not uri is None:
-        type = dest_addr = dest_port = None
-        try:
-          dest_addr, dest_port = rospy.parse_rosrpc_uri(uri)
-        except:
-    #      print "ERROR while get service info"
-          continue
-#          return
-    #      raise ROSServiceException("service [%s] has an invalid RPC URI [%s]"%(service, uri))
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        try:
-          # connect to service and probe it to get the headers
-          s.settimeout(0.5)
-          s.connect((dest_addr, dest_port))
-          header = { 'probe':'1', 'md5sum':'*',
-                    'callerid':rospy.get_name(), 'service':service}
-          roslib.network.write_ros_handshake_header(s, header)
-          type = roslib.network.read_ros_handshake_header(s, cStringIO.StringIO(), 2048)
-        except socket.error:
-          pass
-    #      raise ROSServiceIOException("Unable to communicate with service [%s], address [%s]"%(service, uri))
-        except:
-          pass
-        finally:
-          if s is not None:
-            s.close()
-
-    self._lock.acquire(True)
     try:
-      self.new_master_state.getService(service).type = type['type']
+      dest_addr, dest_port = rospy.parse_rosrpc_uri(uri)
+    except:
+      return None
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+      # connect to service and probe it to get the headers
+      s.settimeout(MasterMonitor.NODE_TIMEOUT)
+      s.connect((dest_addr, dest_port))
+      header = { 'probe':'1', 'md5sum':'*',
+                'callerid':rospy.get_name(), 'service':service}
+      roslib.network.write_ros_handshake_header(s, header)
+      return roslib.network.read_ros_handshake_header(s, cStringIO.StringIO(), 2048).get('type', None)
     except:
-      pass
-#      print "ignored:"
-#      import traceback
-#      traceback.print_exc()
-#      print "type field in service header not available, type:", type 
-    self._lock.release()
+      return None
+    finally:
+      s.close()
 
   def getListedMasterInfo(self):
     '''
@@ -252,25 +483,84 @@ class MasterMonitor(object):
                [ [str,str,str,str] ])}
     '''
     self._lock.acquire(True)
-    result = (str(time.time()), self.getMasteruri(), str(self.getMastername()), [], [], [], [], [], [] )
-    if not (self.master_state is None):
-      try:
-        result = self.master_state.listedState()
-      except:
-        import traceback
-        print traceback.format_exc()
-    self._lock.release()
-    return result
+    try:
+      if not (self.master_state is None):
+        # the listed state is cached by the MasterInfo until a new state is adopted
+        return self.master_state.listedState()
+    except:
+      import traceback
+      print traceback.format_exc()
+    finally:
+      self._lock.release()
+    return (str(time.time()), self.getMasteruri(), str(self.getMastername()), [], [], [], [], [], [] )
+
+  def getPackedMasterInfo(self):
+    '''
+    Returns the roscore state of L{getListedMasterInfo()} in a compact binary
+    format.
+    @see: L{master_discovery_fkie.master_info.MasterInfo.packedState()}
+    @return: the packed roscore state, use
+    L{master_discovery_fkie.master_info.MasterInfo.unpackState()} to unpack it.
+    @rtype: C{xmlrpclib.Binary}
+    '''
+    return xmlrpclib.Binary(MasterInfo.packState(self.getListedMasterInfo()))
+
+  def getListedMasterInfoDelta(self, epoch, since_version):
+    '''
+    Returns the changes of the roscore state since the given version. If the
+    changes are not available, e.g. the given version is to old or was created
+    by another instance of the master_discovery node, the complete state will 
+    be returned.
+    @param epoch: the epoch of the state known by the caller, returned by the 
+    previous call. Use an empty string to get the complete state.
+    @type epoch: C{str}
+    @param since_version: the version of the state known by the caller. Use
+    C{-1} to get the complete state.
+    @type since_version: C{int}
+    @return: the state changes as C{(epoch, version, complete, state)}
+
+               - C{epoch} identifies the instance of this master_discovery node, 
+                 the versions are only valid within the same epoch
+
+               - C{version} is the version of the current state
+
+               - C{complete} is C{True}, if the C{state} contains the complete
+                 roscore state in the format of L{getListedMasterInfo()}.
+                 Otherwise C{state} contains only the changes in the format of
+                 L{master_discovery_fkie.master_info.MasterInfo.listedDelta()}
+
+    @rtype: C{(str, int, boolean, tuple)}
+    '''
+    self._lock.acquire(True)
+    try:
+      version = self.state_version
+      since_version = int(since_version)
+      if not self.master_state is None and epoch == self.state_epoch:
+        if since_version == version:
+          empty = ([], [])
+          return (self.state_epoch, version, False, (str(self.master_state.timestamp), self.getMasteruri(), str(self.getMastername()), empty, empty, empty, empty, empty, empty))
+        if self.__changelog and 0 <= since_version < version and self.__changelog[0][0] <= since_version + 1:
+          deltas = [delta for (v, delta) in self.__changelog if v > since_version]
+          return (self.state_epoch, version, False, MasterInfo.joinListedDelta(deltas))
+      return (self.state_epoch, version, True, self.getListedMasterInfo())
+    finally:
+      self._lock.release()
 
   def getState(self):
     '''
-    Gets state from the ROS master through his RPC interface.
+    Gets state from the ROS master through his RPC interface. If the system
+    state and topic types of the ROS master are not changed since the last call,
+    the current state will be returned without any further requests. Otherwise
+    only the URIs of new nodes and services will be requested, except every
+    L{FULL_REFRESH_INTERVAL} seconds.
     @rtype: L{MasterInfo}
     @raise MasterConnectionException: if not complete information was get from the ROS master.
     '''
     now = time.time()
 
     threads = []
+    fingerprint = None
+    full_refresh = False
     try:
 #      import os
 #      cputimes = os.times()
@@ -278,11 +568,18 @@ class MasterMonitor(object):
       self._lock.acquire(True)
       self.new_master_state = master_state = MasterInfo(self.getMasteruri(), self.getMastername())
 #      print "get state from ros master", self.__masteruri
-      master = xmlrpclib.ServerProxy(self.__masteruri)
+      master = xmlrpc_pool.serverProxy(self.__masteruri)
       # get system state
       code, message, state = master.getSystemState(rospy.get_name())
       # get topic types
       code, message, topicTypes = master.getTopicTypes(rospy.get_name())
+      # skip the further requests, if the state of the ROS master is not changed
+      fingerprint = hashlib.md5(repr((state, topicTypes))).digest()
+      full_refresh = (now - self.__last_full_refresh) >= MasterMonitor.FULL_REFRESH_INTERVAL
+      if not full_refresh and not self.master_state is None and fingerprint == self.__state_fingerprint:
+        self.new_master_state = self.master_state
+        self.master_state.check_ts = now
+        return self.master_state
       #convert topicType list to the dict
       topicTypesDict = {}
       for topic, type in topicTypes:
@@ -317,25 +614,34 @@ class MasterMonitor(object):
       param_server_multi = xmlrpclib.MultiCall(master)
       for t, l in state[2]:
         master_state.services = t
+        service = master_state.getService(t)
         for n in l:
           master_state.nodes = n
           master_state.getNode(n).services = t
-          service = master_state.getService(t)
           service.serviceProvider = n
-          tmp_slist.append(service)
-          param_server_multi.lookupService(rospy.get_name(), t)
+        if l:
+          # request only the URIs of new services
+          uri = None if full_refresh else self.__service_uris.get(t, None)
+          if uri is None:
+            tmp_slist.append(service)
+            param_server_multi.lookupService(rospy.get_name(), t)
+          else:
+            service.uri = uri
+            if service.isLocal:
+              services[service.name] = uri
 #          code, message, service.uri = master.lookupService(rospy.get_name(), t)
 #          if (code == -1):
 #            service.uri = None
 #          elif service.isLocal:
 #            services[service.name] = service.uri
       try:
-        r = param_server_multi()
-        for (code, msg, uri), service in zip(r, tmp_slist):
-          if code == 1:
-            service.uri = uri
-            if service.isLocal:
-              services[service.name] = uri
+        if tmp_slist:
+          r = param_server_multi()
+          for (code, msg, uri), service in zip(r, tmp_slist):
+            if code == 1:
+              service.uri = uri
+              if service.isLocal:
+                services[service.name] = uri
       except:
         import traceback
         traceback.print_exc()
@@ -371,14 +677,22 @@ class MasterMonitor(object):
         param_server_multi = xmlrpclib.MultiCall(master)
         tmp_nlist = []
         for name, node in master_state.nodes.items():
-          tmp_nlist.append(node)
-          param_server_multi.lookupNode(rospy.get_name(), name)
-        r = param_server_multi()
-        for (code, msg, uri), node in zip(r, tmp_nlist):
-          if code == 1:
+          # request only the URIs of new nodes
+          uri = None if full_refresh else self.__node_uris.get(name, None)
+          if uri is None:
+            tmp_nlist.append(node)
+            param_server_multi.lookupNode(rospy.get_name(), name)
+          else:
             node.uri = uri
             if node.isLocal:
               nodes[node.name] = uri
+        if tmp_nlist:
+          r = param_server_multi()
+          for (code, msg, uri), node in zip(r, tmp_nlist):
+            if code == 1:
+              node.uri = uri
+              if node.isLocal:
+                nodes[node.name] = uri
       except:
         import traceback
         traceback.print_exc()
@@ -415,6 +729,11 @@ class MasterMonitor(object):
 #        print "release"
       del th
 #    print "state update of ros master", self.__masteruri, " finished"
+    self.__state_fingerprint = fingerprint
+    if full_refresh:
+      self.__last_full_refresh = now
+    self.__node_uris = dict((name, node.uri) for name, node in master_state.nodes.items() if not node.uri is None)
+    self.__service_uris = dict((name, service.uri) for name, service in master_state.services.items() if not service.uri is None)
     return master_state
   
   def getMasteruri(self):
@@ -425,7 +744,7 @@ class MasterMonitor(object):
     @rtype: C{str} or C{None}
     '''
     if self.__masteruri_rpc is None:
-      master = xmlrpclib.ServerProxy(self.__masteruri)
+      master = xmlrpc_pool.serverProxy(self.__masteruri)
       code, message, self.__masteruri_rpc = master.getUri(rospy.get_name())
     return self.__masteruri_rpc
 
@@ -461,12 +780,39 @@ class MasterMonitor(object):
     @rtype: C{boolean}
     '''
     result = False
-    if self.getState() != self.master_state:
-      self.master_state = self.new_master_state
+    state = self.getState()
+    if state is self.master_state:
+      # the state of the ROS master is not changed
+      return False
+    if state != self.master_state:
+      self._lock.acquire(True)
+      try:
+        self.__addChangelog(self.master_state, self.new_master_state)
+        self.master_state = self.new_master_state
+        self._invalidateResponses()
+      finally:
+        self._lock.release()
       result = True
     self.master_state.check_ts = self.new_master_state.timestamp
     return result
 
+  def __addChangelog(self, old_state, new_state):
+    '''
+    Increases the state version and stores the changes between the given states
+    in the changelog. If no old state is available, the changelog will be cleared.
+    '''
+    self.state_version += 1
+    if old_state is None:
+      self.__changelog.clear()
+    else:
+      try:
+        delta = MasterInfo.listedDelta(old_state.listedState(), new_state.listedState())
+        self.__changelog.append((self.state_version, delta))
+      except:
+        import traceback
+        print traceback.format_exc()
+        self.__changelog.clear()
+
   def reset(self):
     '''
     Sets the master state to None. 
@@ -474,3 +820,11 @@ class MasterMonitor(object):
     if not self.master_state is None:
       del self.master_state
       self.master_state = None
+      self._invalidateResponses()
+
+  def _invalidateResponses(self):
+    '''
+    Removes the cached responses of the XML-RPC server.
+    '''
+    if hasattr(self, 'rpcServer'):
+      self.rpcServer.invalidate_cache()
@@ -180,3 +180,56 @@ class McastSocket(socket.socket):
     namestr = names.tostring()
     return [(namestr[i:i+var1].split('\0', 1)[0], socket.inet_ntoa(namestr[i+20:i+24])) \
             for i in xrange(0, outbytes, var2)]
+
+
+class UcastSocket(socket.socket):
+  '''
+  The UcastSocket class enables the send and receive UDP messages to a list of
+  peers without the use of multicast. It can be used in the networks without 
+  or with unreliable multicast support.
+  '''
+
+  def __init__(self, port, reuse=False):
+    '''
+    Creates an IPv4 socket and bind it to a given port.
+    @param port: the port to bind the socket
+    @type port: int
+    @param reuse: allows the reusing of the port
+    @type reuse: boolean (Default: False)
+    '''
+    socket.socket.__init__(self, socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    if(reuse):
+      self.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self.bind(('', port))
+
+  def send2addr(self, msg, addr):
+    '''
+    Sends the given message to the given address. Some errors on send 
+    will be ignored (C{ENETRESET}, C{ENETDOWN}, C{ENETUNREACH}, C{EHOSTUNREACH})
+    @param msg: message to send
+    @type msg: C{str}
+    @param addr: the address of the peer
+    @type addr: C{(str, int)}
+    '''
+    try:
+      self.sendto(msg, addr)
+    except socket.error, (errn, msg):
+      if not errn in [100, 101, 102, 113]:
+        raise
+
+  @staticmethod
+  def parsePeer(peer, default_port):
+    '''
+    Resolves a peer given as C{host} or C{host:port} to an address tuple.
+    @param peer: the host name or IP with an optional port
+    @type peer: C{str}
+    @param default_port: the port used, if no port is given
+    @type default_port: C{int}
+    @return: the address of the peer
+    @rtype: C{(str, int)}
+    @raise socket.error: if the host name can not be resolved
+    '''
+    host, sep, port = str(peer).rpartition(':')
+    if not sep:
+      host, port = port, default_port
+    return (socket.gethostbyname(host), int(port))
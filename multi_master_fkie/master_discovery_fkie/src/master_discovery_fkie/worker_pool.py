@@ -0,0 +1,138 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import threading
+import time
+import Queue
+
+
+class WorkerPool(object):
+  '''
+  A pool with a bounded count of worker threads to run the tasks concurrently.
+  The worker threads will be created on demand and run as daemons.
+  '''
+
+  def __init__(self, max_workers=8, name='WorkerPool'):
+    '''
+    Initialize method for the WorkerPool class.
+    @param max_workers: the maximal count of worker threads
+    @type max_workers: C{int}
+    @param name: the prefix for the names of the worker threads
+    @type name: C{str}
+    '''
+    self.max_workers = max(1, max_workers)
+    self.name = name
+    self._tasks = Queue.Queue()
+    self._lock = threading.Lock()
+    self._workers = []
+    self._idle = 0
+
+  def submit(self, func, *args):
+    '''
+    Puts a new task into the queue. The result of the task will be ignored.
+    @param func: the method to call
+    @param args: the arguments of the method
+    '''
+    self._lock.acquire()
+    try:
+      if self._idle == 0 and len(self._workers) < self.max_workers:
+        worker = threading.Thread(target=self._run, name='%s-%d' % (self.name, len(self._workers)))
+        worker.setDaemon(True)
+        self._workers.append(worker)
+        worker.start()
+      else:
+        self._idle = max(0, self._idle - 1)
+    finally:
+      self._lock.release()
+    self._tasks.put((func, args))
+
+  def map(self, func, args_list, timeout=None):
+    '''
+    Calls the given method for each argument tuple of the list concurrently and
+    waits until all calls are finished or the timeout is expired.
+    @param func: the method to call
+    @param args_list: the list with argument tuples
+    @type args_list: C{[tuple, ...]}
+    @param timeout: the maximal time in seconds to wait for the results. C{None}
+    waits until all calls are finished.
+    @type timeout: C{float} or C{None}
+    @return: the list with results in the order of the arguments. The result of
+    a failed or not finished call is C{None}.
+    @rtype: C{[object, ...]}
+    '''
+    results = [None] * len(args_list)
+    if not args_list:
+      return results
+    cv = threading.Condition()
+    pending = [len(args_list)]
+
+    def call(idx, args):
+      try:
+        results[idx] = func(*args)
+      except Exception:
+        pass
+      finally:
+        cv.acquire()
+        pending[0] -= 1
+        cv.notify()
+        cv.release()
+
+    for idx, args in enumerate(args_list):
+      self.submit(call, idx, args)
+    deadline = None if timeout is None else time.time() + timeout
+    cv.acquire()
+    try:
+      while pending[0] > 0:
+        if deadline is None:
+          cv.wait()
+        else:
+          remaining = deadline - time.time()
+          if remaining <= 0:
+            break
+          cv.wait(remaining)
+      # copy to ignore results of the calls finished after the timeout
+      return list(results)
+    finally:
+      cv.release()
+
+  def _run(self):
+    while True:
+      func, args = self._tasks.get()
+      try:
+        func(*args)
+      except Exception:
+        import traceback
+        print traceback.format_exc()
+      self._lock.acquire()
+      self._idle += 1
+      self._lock.release()
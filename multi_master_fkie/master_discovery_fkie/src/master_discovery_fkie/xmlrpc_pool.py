@@ -0,0 +1,231 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import socket
+import threading
+import time
+import urllib
+import xmlrpclib
+
+
+class _KeepAliveTransport(xmlrpclib.Transport):
+  '''
+  The XML-RPC transport keeps the HTTP/1.1 connection to the host open between
+  the requests. The timeout for socket operations can be changed before each 
+  request.
+  '''
+  def __init__(self, timeout=None, use_datetime=0):
+    xmlrpclib.Transport.__init__(self, use_datetime)
+    self.timeout = timeout
+    self.last_used = time.time()
+
+  def make_connection(self, host):
+    conn = xmlrpclib.Transport.make_connection(self, host)
+    # the connection is reused, so the timeout of the previous request has to
+    # be replaced, also by None to block
+    conn.timeout = self.timeout
+    if not conn.sock is None:
+      conn.sock.settimeout(self.timeout)
+    return conn
+
+
+class _PooledTransport(xmlrpclib.Transport):
+  '''
+  The XML-RPC transport of the proxies created by L{XmlRpcPool}. Each request 
+  borrows a connection from the pool.
+  '''
+  def __init__(self, pool, timeout=None, use_datetime=0):
+    xmlrpclib.Transport.__init__(self, use_datetime)
+    self._pool = pool
+    self._timeout = timeout
+
+  def request(self, host, handler, request_body, verbose=0):
+    transport = self._pool.acquire(host, self._timeout)
+    try:
+      result = transport.request(host, handler, request_body, verbose)
+    except xmlrpclib.Fault:
+      # the response was read completely, the connection can be reused
+      self._pool.release(host, transport)
+      raise
+    except:
+      self._pool.release(host, transport, False)
+      raise
+    self._pool.release(host, transport)
+    return result
+
+
+class XmlRpcPool(object):
+  '''
+  A thread safe pool of persistent XML-RPC connections. The count of the 
+  concurrent connections to each host is limited, further requests wait for
+  a free connection. Idle connections are reused until L{IDLE_TIMEOUT}.
+  '''
+
+  MAX_PER_HOST = 4
+  '''@ivar: the maximal count of concurrent connections to a host'''
+  IDLE_TIMEOUT = 20.0
+  '''@ivar: the idle connections older than this time in seconds will be closed. Should be smaller than the timeout of the servers.'''
+
+  def __init__(self, max_per_host=MAX_PER_HOST, timeout=None, idle_timeout=IDLE_TIMEOUT):
+    '''
+    Initialize method for the XmlRpcPool class.
+    @param max_per_host: the maximal count of concurrent connections to a host
+    @type max_per_host: C{int}
+    @param timeout: the default timeout in seconds for socket operations, C{None} to block
+    @type timeout: C{float}
+    @param idle_timeout: the time in seconds to keep an idle connection open
+    @type idle_timeout: C{float}
+    '''
+    self.max_per_host = max(1, max_per_host)
+    self.timeout = timeout
+    self.idle_timeout = idle_timeout
+    self._cv = threading.Condition()
+    self._idle = dict() # host: [_KeepAliveTransport, ...]
+    self._busy = dict() # host: count of borrowed connections
+
+  def serverProxy(self, uri, timeout=None, allow_none=False):
+    '''
+    Creates a proxy for the given URI, which uses the connections of this pool.
+    Only C{http} URIs are pooled, other will get a not pooled proxy.
+    @param uri: the URI of the XML-RPC server
+    @type uri: C{str}
+    @param timeout: the timeout in seconds for socket operations, C{None} uses the default of the pool
+    @type timeout: C{float}
+    @rtype: C{xmlrpclib.ServerProxy}
+    '''
+    scheme, _ = urllib.splittype(uri)
+    if scheme != 'http':
+      return xmlrpclib.ServerProxy(uri, allow_none=allow_none)
+    if timeout is None:
+      timeout = self.timeout
+    return xmlrpclib.ServerProxy(uri, transport=_PooledTransport(self, timeout), allow_none=allow_none)
+
+  def acquire(self, host, timeout=None):
+    '''
+    Borrows a connection to the given host. If L{max_per_host} connections are
+    already borrowed, waits for a free one.
+    @param host: the host with port
+    @type host: C{str}
+    @param timeout: the timeout for socket operations and for waiting of a free connection
+    @type timeout: C{float}
+    @rtype: L{_KeepAliveTransport}
+    @raise socket.timeout: if no connection gets free during the timeout
+    '''
+    deadline = None if timeout is None else time.time() + timeout
+    transport = None
+    self._cv.acquire()
+    try:
+      while self._busy.get(host, 0) >= self.max_per_host:
+        if deadline is None:
+          self._cv.wait()
+        else:
+          remaining = deadline - time.time()
+          if remaining <= 0:
+            raise socket.timeout("no free connection to %s" % host)
+          self._cv.wait(remaining)
+      self._busy[host] = self._busy.get(host, 0) + 1
+      idle = self._idle.get(host, [])
+      while idle and transport is None:
+        transport = idle.pop()
+        if time.time() - transport.last_used > self.idle_timeout:
+          transport.close()
+          transport = None
+    finally:
+      self._cv.release()
+    if transport is None:
+      transport = _KeepAliveTransport()
+    transport.timeout = timeout
+    return transport
+
+  def release(self, host, transport, reuse=True):
+    '''
+    Gives a borrowed connection back to the pool.
+    @param host: the host with port
+    @type host: C{str}
+    @param transport: the borrowed connection
+    @type transport: L{_KeepAliveTransport}
+    @param reuse: C{False} closes the connection, e.g. after an error
+    @type reuse: C{bool}
+    '''
+    transport.last_used = time.time()
+    self._cv.acquire()
+    try:
+      self._busy[host] = max(0, self._busy.get(host, 0) - 1)
+      if not self._busy[host]:
+        del self._busy[host]
+      if reuse:
+        self._idle.setdefault(host, []).append(transport)
+      else:
+        transport.close()
+      self._cv.notify()
+    finally:
+      self._cv.release()
+
+  def clear(self):
+    '''
+    Closes all idle connections.
+    '''
+    self._cv.acquire()
+    try:
+      for transports in self._idle.itervalues():
+        for transport in transports:
+          transport.close()
+      self._idle.clear()
+    finally:
+      self._cv.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def sharedPool():
+  '''
+  Returns the L{XmlRpcPool} shared by all modules of the process.
+  @rtype: L{XmlRpcPool}
+  '''
+  global _pool
+  _pool_lock.acquire()
+  try:
+    if _pool is None:
+      _pool = XmlRpcPool()
+    return _pool
+  finally:
+    _pool_lock.release()
+
+def serverProxy(uri, timeout=None, allow_none=False):
+  '''
+  Creates a proxy for the given URI using the shared connection pool.
+  @see: L{XmlRpcPool.serverProxy()}
+  @rtype: C{xmlrpclib.ServerProxy}
+  '''
+  return sharedPool().serverProxy(uri, timeout, allow_none)
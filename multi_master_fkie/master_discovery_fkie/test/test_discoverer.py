@@ -0,0 +1,296 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+PKG = 'master_discovery_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+from collections import deque
+import socket
+import struct
+import threading
+import time
+import unittest
+from SimpleXMLRPCServer import SimpleXMLRPCServer
+
+import rospy
+import roslib.network
+
+import master_discovery_fkie.master_discovery as master_discovery
+from master_discovery_fkie.master_discovery import Discoverer, DiscoveredMaster
+from master_discovery_fkie.udp import UcastSocket
+
+
+class Stubs(object):
+  '''
+  Replaces the attributes of modules and classes and restores them.
+  '''
+  def __init__(self):
+    self._saved = []
+
+  def set(self, obj, name, value):
+    self._saved.append((obj, name, getattr(obj, name)))
+    setattr(obj, name, value)
+
+  def restore(self):
+    for (obj, name, value) in reversed(self._saved):
+      setattr(obj, name, value)
+    self._saved = []
+
+
+class PublisherMock(object):
+  '''
+  Replaces the ROS publishers of the discoverer.
+  '''
+  def __init__(self, topic, msg_class):
+    self.published = []
+
+  def publish(self, msg):
+    self.published.append(msg)
+
+
+class MasterMonitorMock(object):
+  '''
+  Provides the parts of the L{MasterMonitor} used by the discoverer without a
+  ROS master and the RPC server.
+  '''
+  def __init__(self, rpcport):
+    self.rpcport = rpcport
+    self.master_state = None
+
+  def getMasteruri(self):
+    return 'http://localhost:11311/'
+
+  def checkState(self):
+    return False
+
+  def shutdown(self):
+    pass
+
+
+class SocketMock(object):
+  '''
+  Stores the sent heartbeats and returns the heartbeats added by L{receive()}.
+  '''
+  parsePeer = staticmethod(UcastSocket.parsePeer)
+
+  def __init__(self, port, group=None):
+    self.sent = dict()
+    self.received = deque()
+
+  def hasEnabledMulticastIface(self):
+    return True
+
+  def send2addr(self, msg, addr):
+    self.sent[addr] = msg
+
+  def send2group(self, msg):
+    self.sent['group'] = msg
+
+  def receive(self, msg, addr):
+    self.received.append((msg, addr))
+
+  def recvfrom(self, size):
+    try:
+      return self.received.popleft()
+    except IndexError:
+      time.sleep(0.01)
+      raise socket.timeout()
+
+
+class RemoteMonitor(object):
+  '''
+  The RPC server of a remote master_discovery node, which provides the 
+  contacts of the remote ROS master.
+  '''
+  def __init__(self, mastername):
+    self.mastername = mastername
+    self.server = SimpleXMLRPCServer(('127.0.0.1', 0), logRequests=False)
+    self.server.register_function(self._masterContacts, 'masterContacts')
+    self.port = self.server.server_address[1]
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def _masterContacts(self):
+    # a timestamp of 0 means the state of the remote ROS master is not yet available
+    timestamp = '0' if self.mastername is None else '1.0'
+    return (timestamp, 'http://remote:11311/', str(self.mastername), '/master_discovery', 'http://127.0.0.1:%d' % self.port)
+
+  def shutdown(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+
+def parseHeartbeatV1(msg):
+  '''
+  Parses the heartbeat like a master_discovery node, which knows only the version 1.
+  @return: the unpacked fields or C{None}, if the heartbeat is rejected
+  '''
+  (version,) = struct.unpack('B', msg[1])
+  if version != 1 or len(msg) != struct.calcsize(Discoverer.HEARTBEAT_FMT_V1):
+    return None
+  return struct.unpack(Discoverer.HEARTBEAT_FMT_V1, msg)
+
+
+class TestDiscoverer(unittest.TestCase):
+  '''
+  Tests the heartbeat messages and the peers of the discoverer.
+  '''
+
+  def setUp(self):
+    self.stubs = Stubs()
+    self.stubs.set(rospy, 'has_param', lambda name: False)
+    self.stubs.set(rospy, 'Publisher', PublisherMock)
+    self.stubs.set(rospy, 'Service', lambda name, service_class, handler: None)
+    self.stubs.set(rospy, 'on_shutdown', lambda handler: None)
+    self.stubs.set(roslib.network, 'get_local_address', lambda: '10.0.0.100')
+    self.stubs.set(master_discovery, 'MasterMonitor', MasterMonitorMock)
+    self.stubs.set(master_discovery, 'McastSocket', SocketMock)
+    self.stubs.set(master_discovery, 'UcastSocket', SocketMock)
+    self.send_version = Discoverer.SEND_VERSION
+    self.discoverers = []
+    self.monitor = RemoteMonitor('remote')
+
+  def tearDown(self):
+    for discoverer in self.discoverers:
+      discoverer.finish()
+    self.monitor.shutdown()
+    self.stubs.restore()
+    Discoverer.SEND_VERSION = self.send_version
+
+  def createDiscoverer(self, static_hosts=[]):
+    '''
+    Creates a discoverer with the replaced sockets, master monitor and ROS 
+    publishers. The heartbeats are only sent on request, because the thread 
+    of the discoverer is not started.
+    '''
+    discoverer = Discoverer(11511, '226.0.0.0', 11611, static_hosts)
+    self.discoverers.append(discoverer)
+    return discoverer
+
+  def receiveHeartbeat(self, discoverer, addr, monitor, rate=2.):
+    '''
+    Passes a heartbeat of version 1 from the given address to the receive 
+    loop and waits for the master created by this heartbeat.
+    @return: the discovered master
+    '''
+    discoverer.msocket.receive(struct.pack(Discoverer.HEARTBEAT_FMT_V1, 'R', 1, int(rate * 10), 10, 20, monitor.port), addr)
+    deadline = time.time() + 5.
+    while time.time() < deadline:
+      master = discoverer.masters.get(addr, None)
+      if not master is None and (monitor.mastername is None or master.online):
+        return master
+      time.sleep(0.01)
+    self.fail("no master discovered for %s" % str(addr))
+
+  def peers(self, discoverer):
+    '''
+    @return: the addresses of all peers, which get the heartbeats
+    '''
+    discoverer.msocket.sent.clear()
+    discoverer._sendToPeers(10, 20, 2., True)
+    return sorted(discoverer.msocket.sent.keys())
+
+  def test_default_version_readable_by_v1(self):
+    self.assertEqual(1, Discoverer.SEND_VERSION)
+    msg = self.createDiscoverer()._createHeartbeat(10, 20, 2.)
+    self.assertEqual(('R', 1, 20, 10, 20, 11611), parseHeartbeatV1(msg))
+
+  def test_v2_with_v1_parser(self):
+    Discoverer.SEND_VERSION = 2
+    msg = self.createDiscoverer()._createHeartbeat(10, 20, 2.)
+    self.assertEqual(struct.calcsize(Discoverer.HEARTBEAT_FMT), len(msg))
+    # a node with version 1 rejects the heartbeat, so version 2 must be enabled explicitly
+    self.assertEqual(None, parseHeartbeatV1(msg))
+    # the fields of version 1 are kept at the same positions
+    (r, version, rate, secs, nsecs, port) = struct.unpack(Discoverer.HEARTBEAT_FMT_V1, msg[:struct.calcsize(Discoverer.HEARTBEAT_FMT_V1)])
+    self.assertEqual(('R', 2, 20, 10, 20, 11611), (r, version, rate, secs, nsecs, port))
+
+  def test_static_localhost(self):
+    discoverer = self.createDiscoverer(['localhost', '127.0.0.1:11522'])
+    self.assertEqual([('127.0.0.1', 11511), ('127.0.0.1', 11522)], self.peers(discoverer))
+    # the static peers are kept, also if no or offline masters are known
+    self.receiveHeartbeat(discoverer, ('127.0.0.1', 11522), self.monitor).setOffline()
+    discoverer._expirePeers()
+    self.assertEqual([('127.0.0.1', 11511), ('127.0.0.1', 11522)], self.peers(discoverer))
+
+  def test_expire_learned_peers(self):
+    discoverer = self.createDiscoverer(['localhost'])
+    online = ('127.0.0.1', 11601)
+    offline = ('127.0.0.1', 11602)
+    removed = ('127.0.0.1', 11603)
+    unresolved = ('127.0.0.1', 11604)
+    for addr in (online, offline, removed):
+      self.receiveHeartbeat(discoverer, addr, self.monitor)
+    # the master info of this master is not yet retrieved
+    pending_monitor = RemoteMonitor(None)
+    self.addCleanup(pending_monitor.shutdown)
+    self.receiveHeartbeat(discoverer, unresolved, pending_monitor)
+    self.assertEqual(sorted([('127.0.0.1', 11511), online, offline, removed, unresolved]), self.peers(discoverer))
+    discoverer.masters[offline].setOffline()
+    del discoverer.masters[removed]
+    discoverer._expirePeers()
+    self.assertEqual(sorted([('127.0.0.1', 11511), online, unresolved]), self.peers(discoverer))
+    # finish the retrieval of the master info before the monitor is shut down
+    pending_monitor.mastername = 'pending'
+    self.receiveHeartbeat(discoverer, unresolved, pending_monitor)
+
+  def test_probe_rate(self):
+    discoverer = self.createDiscoverer(['localhost'])
+    learned = ('127.0.0.1', 11601)
+    self.receiveHeartbeat(discoverer, learned, self.monitor)
+    discoverer.msocket.sent.clear()
+    discoverer._sendToPeers(10, 20, 5., True)
+    # the probed peer gets the heartbeats with the probe rate
+    sent = discoverer.msocket.sent
+    probe_rate = int(10. / Discoverer.PEER_PROBE_INTERVAL)
+    self.assertEqual(('R', 1, probe_rate, 10, 20, 11611), parseHeartbeatV1(sent[('127.0.0.1', 11511)]))
+    self.assertEqual(('R', 1, 50, 10, 20, 11611), parseHeartbeatV1(sent[learned]))
+
+  def test_idle_sender_timeout(self):
+    # without a monitor URI no master info is requested
+    master = DiscoveredMaster(None)
+    master.mastername = 'idle'
+    master.online = True
+    master.addHeartbeat(1., 0.2)
+    current_time = time.time()
+    # the timeout covers the advertised interval also with a short measurement
+    master.linkQuality(current_time + 6., 0.5, 1.4)
+    self.assertTrue(master.online)
+    master.linkQuality(current_time + 8., 0.5, 1.4)
+    self.assertFalse(master.online)
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_discoverer', TestDiscoverer)
@@ -0,0 +1,99 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+PKG = 'master_discovery_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import struct
+import unittest
+import zlib
+
+from master_discovery_fkie.master_info import MasterInfo
+
+
+def createState():
+  '''
+  @return: a state in the format of L{MasterInfo.listedState()} with local and 
+  remote nodes and services
+  '''
+  return ('1357.5', 'http://local:11311/', 'local',
+          [('/chatter', ['/talker', '/other']), ('/empty', [])],
+          [('/chatter', ['/listener'])],
+          [('/talker/get_loggers', ['/talker'])],
+          [('/chatter', 'std_msgs/String'), ('/empty', 'std_msgs/Empty')],
+          [('/talker', 'http://local:1/', 4711, 'local'), ('/listener', 'http://local:2/', 0, 'local'),
+           ('/other', 'http://remote:1/', None, 'remote')],
+          [('/talker/get_loggers', 'rosrpc://local:3', 'roscpp/GetLoggers', 'local'),
+           ('/other/srv', 'rosrpc://remote:2', None, 'remote')])
+
+
+class TestMasterInfo(unittest.TestCase):
+  '''
+  Tests the packed format of the master state.
+  '''
+
+  def test_round_trip(self):
+    listed = createState()
+    self.assertEqual(listed, MasterInfo.unpackState(MasterInfo.packState(listed)))
+
+  def test_round_trip_master_info(self):
+    info = MasterInfo.from_list(createState())
+    listed = info.listedState()
+    unpacked = MasterInfo.unpackState(info.packedState())
+    self.assertEqual(listed[:3], unpacked[:3])
+    for idx in range(3, 9):
+      self.assertEqual(sorted(tuple(row) for row in listed[idx]), sorted(unpacked[idx]))
+
+  def test_unicode(self):
+    listed = list(createState())
+    listed[2] = u'r\xf6bot'
+    self.assertEqual('r\xc3\xb6bot', MasterInfo.unpackState(MasterInfo.packState(listed))[2])
+
+  def test_empty_state(self):
+    listed = ('0', 'http://local:11311/', None, [], [], [], [], [], [])
+    self.assertEqual(listed, MasterInfo.unpackState(MasterInfo.packState(listed)))
+
+  def test_magic_and_version(self):
+    packed = MasterInfo.packState(createState())
+    data = zlib.decompress(packed)
+    self.assertTrue(data.startswith(MasterInfo.PACKED_MAGIC))
+    # an unknown version of the format is rejected
+    version = struct.unpack('B', MasterInfo.PACKED_MAGIC[-1])[0] + 1
+    other_version = zlib.compress(MasterInfo.PACKED_MAGIC[:-1] + struct.pack('B', version) + data[len(MasterInfo.PACKED_MAGIC):])
+    self.assertRaises(ValueError, MasterInfo.unpackState, other_version)
+    self.assertRaises(ValueError, MasterInfo.unpackState, zlib.compress('no packed state'))
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_master_info', TestMasterInfo)
@@ -0,0 +1,180 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+PKG = 'master_discovery_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import os
+import threading
+import unittest
+import xmlrpclib
+from SimpleXMLRPCServer import SimpleXMLRPCServer
+
+import rospy
+
+from master_discovery_fkie.master_info import MasterInfo
+from master_discovery_fkie.master_monitor import MasterMonitor
+
+
+class Stubs(object):
+  '''
+  Replaces the attributes of modules and classes and restores them.
+  '''
+  def __init__(self):
+    self._saved = []
+
+  def set(self, obj, name, value):
+    self._saved.append((obj, name, getattr(obj, name)))
+    setattr(obj, name, value)
+
+  def restore(self):
+    for (obj, name, value) in reversed(self._saved):
+      setattr(obj, name, value)
+    self._saved = []
+
+
+class RosMaster(object):
+  '''
+  The ROS master with the API used by the L{MasterMonitor}. The nodes are 
+  running on another host, so their PIDs are not requested.
+  '''
+  def __init__(self):
+    self.publishers = dict()
+    self.server = SimpleXMLRPCServer(('127.0.0.1', 0), logRequests=False)
+    self.server.register_multicall_functions()
+    for name in ['getUri', 'getSystemState', 'getTopicTypes', 'lookupNode', 'lookupService']:
+      self.server.register_function(getattr(self, name), name)
+    self.uri = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+    # a short poll interval to shut down the server fast
+    self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def shutdown(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+  def getUri(self, caller_id):
+    return (1, '', self.uri)
+
+  def getSystemState(self, caller_id):
+    return (1, '', [[[topic, nodes] for topic, nodes in self.publishers.items()], [], []])
+
+  def getTopicTypes(self, caller_id):
+    return (1, '', [[topic, 'std_msgs/String'] for topic in self.publishers.keys()])
+
+  def lookupNode(self, caller_id, node):
+    return (1, '', 'http://remote%s:1/' % node.replace('/', '-'))
+
+  def lookupService(self, caller_id, service):
+    return (-1, 'unknown service', '')
+
+
+def normalized(listed):
+  '''
+  @return: the rows of the state as sorted tuples, the lists are converted by 
+  the XML-RPC transfer
+  '''
+  return [sorted(tuple(tuple(value) if isinstance(value, list) else value for value in row) for row in listed[idx]) for idx in range(3, 9)]
+
+
+class TestMasterMonitor(unittest.TestCase):
+  '''
+  Tests the changes of the ROS master state returned by C{masterInfoDelta()}.
+  '''
+
+  def setUp(self):
+    self.master = RosMaster()
+    self.masteruri = os.environ.get('ROS_MASTER_URI', None)
+    os.environ['ROS_MASTER_URI'] = self.master.uri
+    self.params = {'~changelog_size': 3}
+    self.stubs = Stubs()
+    self.stubs.set(rospy, 'has_param', lambda name: name in self.params)
+    self.stubs.set(rospy, 'get_param', lambda name, default=None: self.params.get(name, default))
+    self.changelog_size = MasterMonitor.CHANGELOG_SIZE
+    self.monitor = MasterMonitor(0)
+    self.proxy = xmlrpclib.ServerProxy('http://127.0.0.1:%d' % self.monitor.rpcServer.server_address[1], allow_none=True)
+
+  def tearDown(self):
+    self.monitor.shutdown()
+    self.monitor.rpcServer.server_close()
+    MasterMonitor.CHANGELOG_SIZE = self.changelog_size
+    self.stubs.restore()
+    if self.masteruri is None:
+      del os.environ['ROS_MASTER_URI']
+    else:
+      os.environ['ROS_MASTER_URI'] = self.masteruri
+    self.master.shutdown()
+
+  def _publish(self, topic, *nodes):
+    '''
+    Changes the publishers of the ROS master and updates the state of the monitor.
+    '''
+    self.master.publishers[topic] = list(nodes)
+    self.assertTrue(self.monitor.checkState())
+
+  def test_complete_state(self):
+    self._publish('/chatter', '/talker')
+    (epoch, version, complete, state) = self.proxy.masterInfoDelta('', -1)
+    self.assertEqual((self.monitor.state_epoch, 1, True), (epoch, version, complete))
+    self.assertEqual(normalized(self.proxy.masterInfo()), normalized(state))
+    # the versions of another epoch, e.g. of a restarted node, are not comparable
+    self.assertTrue(self.proxy.masterInfoDelta('other', 1)[2])
+
+  def test_changes_since_version(self):
+    self._publish('/chatter', '/talker')
+    (epoch, version, complete, first) = self.proxy.masterInfoDelta('', -1)
+    self._publish('/news', '/talker')
+    self._publish('/chatter', '/talker', '/other')
+    (epoch, version, complete, delta) = self.proxy.masterInfoDelta(epoch, version)
+    self.assertEqual((3, False), (version, complete))
+    self.assertEqual(normalized(self.proxy.masterInfo()), normalized(MasterInfo.applyListedDelta(first, delta)))
+    # no changes since the current version
+    (epoch, version, complete, delta) = self.proxy.masterInfoDelta(epoch, version)
+    self.assertEqual((3, False), (version, complete))
+    self.assertEqual([([], [])] * 6, [tuple(changes) for changes in delta[3:]])
+
+  def test_version_not_in_changelog(self):
+    self._publish('/chatter', '/talker')
+    epoch = self.proxy.masterInfoDelta('', -1)[0]
+    for i in range(4):
+      self._publish('/topic%d' % i, '/talker')
+    # the changelog contains only the last three changes
+    (epoch, version, complete, state) = self.proxy.masterInfoDelta(epoch, 1)
+    self.assertEqual((5, True), (version, complete))
+    self.assertFalse(self.proxy.masterInfoDelta(epoch, 2)[2])
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_master_monitor', TestMasterMonitor)
@@ -0,0 +1,114 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+PKG = 'master_discovery_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import httplib
+import threading
+import time
+import unittest
+import xmlrpclib
+
+from master_discovery_fkie.master_monitor import ThreadingXMLRPCServer
+
+
+class TestRpcServer(unittest.TestCase):
+  '''
+  Tests the limits of the threading XML-RPC server of the master_discovery node.
+  '''
+
+  def setUp(self):
+    self.server = ThreadingXMLRPCServer(('127.0.0.1', 0), max_threads=2, connection_timeout=30.0, logRequests=False)
+    self.server.register_function(self._echo, 'echo')
+    self.server.register_function(self._slow, 'slow')
+    self.running = 0
+    self.max_running = 0
+    self._lock = threading.Lock()
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.setDaemon(True)
+    self.thread.start()
+    self.connections = []
+
+  def tearDown(self):
+    for c in self.connections:
+      c.close()
+    self.server.shutdown()
+    self.server.server_close()
+
+  def _echo(self, value):
+    return value
+
+  def _slow(self, value):
+    self._lock.acquire()
+    self.running += 1
+    self.max_running = max(self.max_running, self.running)
+    self._lock.release()
+    time.sleep(0.3)
+    self._lock.acquire()
+    self.running -= 1
+    self._lock.release()
+    return value
+
+  def _call(self, connection, method, *params):
+    connection.request('POST', '/RPC2', xmlrpclib.dumps(params, method), {'Content-Type': 'text/xml'})
+    response = connection.getresponse()
+    return xmlrpclib.loads(response.read())[0][0]
+
+  def _connect(self):
+    connection = httplib.HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=5.0)
+    self.connections.append(connection)
+    return connection
+
+  def test_idle_keep_alive_clients(self):
+    # idle persistent connections of more clients than max_threads must not block new clients
+    for i in range(4):
+      self.assertEqual(i, self._call(self._connect(), 'echo', i))
+    start = time.time()
+    self.assertEqual('new', self._call(self._connect(), 'echo', 'new'))
+    self.assertTrue(time.time() - start < 1.0)
+    # the idle connections are still usable
+    self.assertEqual('again', self._call(self.connections[0], 'echo', 'again'))
+
+  def test_concurrent_requests_limited(self):
+    threads = [threading.Thread(target=self._call, args=(self._connect(), 'slow', i)) for i in range(5)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join(5.0)
+    self.assertEqual(2, self.max_running)
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_rpc_server', TestRpcServer)
@@ -0,0 +1,142 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import re
+
+import roslib; roslib.load_manifest('master_sync_fkie')
+import rospy
+
+
+class FilterInterface(object):
+  '''
+  The filter of the synchronized topics and services. The rules are read from
+  the parameter C{~sync_topics}, C{~ignore_topics}, C{~sync_services} and 
+  C{~ignore_services}. The rules of a host can be extended by the parameter 
+  C{~hosts}, a dictionary with host names as keys and dictionaries with the 
+  same lists as values, e.g.::
+
+    hosts:
+      robot1:
+        ignore_topics: ['/camera/*', '/velodyne_points']
+
+  A rule starting with C{^} is a regular expression matched at the beginning 
+  of the name, all other rules are glob patterns matching the whole name, 
+  where C{*} matches any characters including C{/} and C{?} matches one 
+  character. If a C{sync} list is not empty, only the matching names are 
+  synchronized. A name matching the C{ignore} list is never synchronized.
+  All rules of a list are compiled into one regular expression.
+  '''
+
+  IGNORE_TOPICS = ['/rosout', 'rosout_agg']
+  '''@ivar: the topics, which are never synchronized.'''
+
+  def __init__(self, mastername=None):
+    '''
+    Reads the rules from the ROS parameter server.
+    @param mastername: the name of the remote ROS master to read the host 
+    specific rules for.
+    @type mastername:  C{str}
+    '''
+    host_rules = dict()
+    hosts = rospy.get_param('~hosts', {})
+    if mastername and isinstance(hosts, dict) and isinstance(hosts.get(mastername, None), dict):
+      host_rules = hosts[mastername]
+    def rules(name, default=[]):
+      result = list(default)
+      result[len(result):] = self._toList(rospy.get_param('~%s' % name, []))
+      result[len(result):] = self._toList(host_rules.get(name, []))
+      return result
+    self.__sync_topics = self._compile(rules('sync_topics'))
+    self.__ignore_topics = self._compile(rules('ignore_topics', FilterInterface.IGNORE_TOPICS))
+    self.__sync_services = self._compile(rules('sync_services'))
+    self.__ignore_services = self._compile(rules('ignore_services'))
+
+  def syncTopic(self, topic):
+    '''
+    @param topic: the name of the topic
+    @type topic:  C{str}
+    @return: C{True}, if the topic should be synchronized
+    @rtype: C{bool}
+    '''
+    return self._accept(topic, self.__sync_topics, self.__ignore_topics)
+
+  def syncService(self, service):
+    '''
+    @param service: the name of the service
+    @type service:  C{str}
+    @return: C{True}, if the service should be synchronized
+    @rtype: C{bool}
+    '''
+    return self._accept(service, self.__sync_services, self.__ignore_services)
+
+  @staticmethod
+  def _accept(name, sync_re, ignore_re):
+    if not sync_re is None and sync_re.match(name) is None:
+      return False
+    return ignore_re is None or ignore_re.match(name) is None
+
+  @staticmethod
+  def _toList(value):
+    # the rules can also be given as comma separated string
+    if isinstance(value, basestring):
+      return [v.strip() for v in value.split(',') if v.strip()]
+    if isinstance(value, (list, tuple)):
+      return list(value)
+    return []
+
+  @staticmethod
+  def _compile(rules):
+    '''
+    Compiles the list with glob patterns and regular expressions into one 
+    regular expression. Invalid regular expressions are skipped.
+    @param rules: the list with rules
+    @type rules:  C{[str, ...]}
+    @return: the compiled expression or C{None}, if the list is empty
+    @rtype: C{re.RegexObject}
+    '''
+    patterns = []
+    for rule in rules:
+      if not rule:
+        continue
+      rule = str(rule)
+      if rule.startswith('^'):
+        try:
+          re.compile(rule)
+        except re.error, e:
+          rospy.logwarn("invalid filter rule '%s' ignored: %s", rule, e)
+          continue
+        patterns.append('(?:%s)' % rule[1:])
+      else:
+        patterns.append(r'%s\Z' % ''.join(['.*' if c == '*' else '.' if c == '?' else re.escape(c) for c in rule]))
+    if not patterns:
+      return None
+    return re.compile('|'.join(patterns))
@@ -33,15 +33,16 @@
 import threading
 import sys
 import time
-import xmlrpclib
 
 import roslib; roslib.load_manifest('master_sync_fkie')
 import rospy
 
 from sync_thread import SyncThread
+from sync_scheduler import SyncScheduler
 from master_discovery_fkie.msg import *
 from master_discovery_fkie.srv import *
 import master_discovery_fkie.interface_finder as interface_finder
+import master_discovery_fkie.xmlrpc_pool as xmlrpc_pool
 
 
 class Main(object):
@@ -53,8 +54,16 @@ class Main(object):
     Creates a new instance. Find the topic of the master_discovery node using 
     L{master_discovery_fkie.interface_finder.get_changes_topic()}. Also the 
     parameter C{~ignore_hosts} will be analyzed to exclude hosts from sync.
+    The parameter C{~sync_workers} and C{~registration_rate} configure the
+    L{SyncScheduler} shared by all synchronized masters.
     '''
     self.masters = {}
+    if rospy.has_param('~sync_workers'):
+      SyncScheduler.MAX_WORKERS = max(1, rospy.get_param('~sync_workers'))
+    if rospy.has_param('~registration_rate'):
+      SyncScheduler.REGISTRATION_RATE = rospy.get_param('~registration_rate')
+    self.scheduler = SyncScheduler(SyncScheduler.MAX_WORKERS, SyncScheduler.REGISTRATION_RATE)
+    '''@ivar: the L{SyncScheduler} to execute the synchronization of all remote masters.'''
     # the connection to the local service master 
     self.materuri = self.getMasteruri()
     '''@ivar: the ROS master URI of the C{local} ROS master. '''
@@ -99,7 +108,7 @@ class Main(object):
     '''
     if not hasattr(self, 'materuri') or self.materuri is None:
       masteruri = self._masteruri_from_ros()
-      master = xmlrpclib.ServerProxy(masteruri)
+      master = xmlrpc_pool.serverProxy(masteruri)
       code, message, self.materuri = master.getUri(rospy.get_name())
     return self.materuri
 
@@ -177,7 +186,7 @@ class Main(object):
           self.masters[mastername].update(mastername, masteruri, discoverer_name, monitoruri, timestamp)
         else:
 #          print "add a sync thread to:", mastername, ros_master.uri
-          self.masters[mastername] = SyncThread(mastername, masteruri, discoverer_name, monitoruri, 0.0)
+          self.masters[mastername] = SyncThread(mastername, masteruri, discoverer_name, monitoruri, 0.0, self.scheduler)
     except:
       import traceback
       rospy.logwarn("ERROR while update master[%s]: %s", str(mastername), traceback.format_exc())
@@ -215,4 +224,6 @@ class Main(object):
     if hasattr(self, "sub_changes"):
       for key, item in self.sub_changes.items():
         item.unregister()
-    self.__lock.release()
\ No newline at end of file
+    self.__lock.release()
+    # wait for the unregistration of the synchronized topics and services
+    self.scheduler.shutdown(5.0)
\ No newline at end of file
@@ -0,0 +1,258 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import heapq
+import itertools
+import threading
+import time
+
+import roslib; roslib.load_manifest('master_sync_fkie')
+import rospy
+
+
+class RateLimiter(object):
+  '''
+  A thread safe token bucket to limit the rate of the operations, e.g. the 
+  registrations on the local ROS master.
+  '''
+
+  def __init__(self, rate, burst=None):
+    '''
+    @param rate: the count of operations per second, C{0} disables the limit
+    @type rate:  C{float}
+    @param burst: the count of operations allowed at once, C{None} uses the rate
+    @type burst:  C{float}
+    '''
+    self.rate = float(rate)
+    self.burst = float(burst if not burst is None else max(rate, 1))
+    self._tokens = self.burst
+    self._stamp = time.time()
+    self._lock = threading.Lock()
+
+  def acquire(self, count=1):
+    '''
+    Blocks until the given count of operations is allowed. Bigger counts than
+    the burst size are allowed after the bucket is full.
+    @param count: the count of operations
+    @type count:  C{int}
+    '''
+    if self.rate <= 0:
+      return
+    count = min(float(count), self.burst)
+    while True:
+      self._lock.acquire()
+      try:
+        now = time.time()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self._tokens >= count:
+          self._tokens -= count
+          return
+        wait = (count - self._tokens) / self.rate
+      finally:
+        self._lock.release()
+      time.sleep(wait)
+
+
+class SyncScheduler(object):
+  '''
+  Executes the synchronization jobs of all remote masters by a bounded count 
+  of worker threads. Each job is identified by a key (e.g. the L{SyncThread} 
+  of a master). Repeated requests for the same key are coalesced, the last 
+  requested job wins. A key is never executed concurrently, a request for a 
+  running key will be executed after the current run. The ready jobs are 
+  executed by priority (lower first) and then in the order of the requests.
+  '''
+
+  MAX_WORKERS = 4
+  '''@ivar: the count of the worker threads'''
+  RETRY_DELAY = 3.0
+  '''@ivar: the delay in seconds to repeat a failed job'''
+  REGISTRATION_RATE = 500
+  '''@ivar: the maximal count of registrations per second on the local ROS master for all remote masters, C{0} disables the limit'''
+
+  def __init__(self, max_workers=MAX_WORKERS, registration_rate=REGISTRATION_RATE):
+    '''
+    @param max_workers: the count of the worker threads
+    @type max_workers:  C{int}
+    @param registration_rate: the maximal count of registrations per second
+    @type registration_rate:  C{float}
+    '''
+    self.limiter = RateLimiter(registration_rate)
+    '''@ivar: the L{RateLimiter} shared by all jobs to limit the registrations on the local ROS master'''
+    self._cv = threading.Condition()
+    self._seq = itertools.count()
+    self._ready = [] # heap of (priority, seq, key)
+    self._delayed = [] # heap of (due time, seq, key)
+    self._pending = dict() # key: (seq, job, priority, due time)
+    self._running = set()
+    self._rerun = dict() # key: (job, priority, due time) requested while running
+    self._finished = False
+    self._workers = []
+    for i in range(max(1, max_workers)):
+      worker = threading.Thread(target=self._run, name='SyncScheduler-%d' % i)
+      worker.setDaemon(True)
+      self._workers.append(worker)
+      worker.start()
+
+  def schedule(self, key, job, priority=1, delay=0.):
+    '''
+    Requests the execution of the job. A pending job with the same key is 
+    replaced by the new one and keeps its position, if it is due not later 
+    than the new request. So the requests within the delay are coalesced to 
+    one execution. The earlier due time and the higher priority of both 
+    requests are used.
+    @param key: the key to coalesce the requests
+    @param job: the method to call. A returned C{False} repeats the job after L{RETRY_DELAY}.
+    @type job:  C{<method>() -> bool}
+    @param priority: the priority of the job, lower values are executed first
+    @type priority:  C{int}
+    @param delay: the delay in seconds before the job gets ready
+    @type delay:  C{float}
+    '''
+    due = time.time() + max(delay, 0.)
+    self._cv.acquire()
+    try:
+      if key in self._running:
+        if key in self._rerun:
+          (_, old_priority, old_due) = self._rerun[key]
+          priority = min(priority, old_priority)
+          due = min(due, old_due)
+        self._rerun[key] = (job, priority, due)
+        return
+      if key in self._pending:
+        (seq, _, old_priority, old_due) = self._pending[key]
+        if old_due <= due and priority >= old_priority:
+          # keep the position in the queue, only replace the job
+          self._pending[key] = (seq, job, old_priority, old_due)
+          return
+        # a queued request is never postponed by a new one
+        priority = min(priority, old_priority)
+        due = min(due, old_due)
+      self.__push(key, job, priority, due)
+      self._cv.notify()
+    finally:
+      self._cv.release()
+
+  def pending(self):
+    '''
+    @return: the count of the pending and running jobs
+    @rtype: C{int}
+    '''
+    self._cv.acquire()
+    try:
+      return len(self._pending) + len(self._running)
+    finally:
+      self._cv.release()
+
+  def shutdown(self, timeout=None):
+    '''
+    Waits until all ready jobs are executed and stops the workers. The 
+    delayed jobs are discarded.
+    @param timeout: the maximal time in seconds to wait for the jobs
+    @type timeout:  C{float}
+    '''
+    deadline = None if timeout is None else time.time() + timeout
+    self._cv.acquire()
+    try:
+      for (due, seq, key) in self._delayed:
+        if key in self._pending and self._pending[key][0] == seq:
+          del self._pending[key]
+      self._delayed = []
+      while (self._ready or self._running) and (deadline is None or time.time() < deadline):
+        self._cv.wait(0.1)
+      self._finished = True
+      self._cv.notifyAll()
+    finally:
+      self._cv.release()
+    for worker in self._workers:
+      if not worker is threading.currentThread():
+        worker.join(1.0)
+
+  def __push(self, key, job, priority, due):
+    # must be called with acquired lock, previous queue entries of the key become invalid
+    seq = self._seq.next()
+    self._pending[key] = (seq, job, priority, due)
+    if due > time.time():
+      heapq.heappush(self._delayed, (due, seq, key))
+    else:
+      heapq.heappush(self._ready, (priority, seq, key))
+
+  def __nextJob(self):
+    # waits for the next ready job, returns (key, job) or None if finished
+    self._cv.acquire()
+    try:
+      while not self._finished:
+        now = time.time()
+        # move the due jobs into the ready queue
+        while self._delayed and self._delayed[0][0] <= now:
+          (due, seq, key) = heapq.heappop(self._delayed)
+          if key in self._pending and self._pending[key][0] == seq:
+            heapq.heappush(self._ready, (self._pending[key][2], seq, key))
+        while self._ready:
+          (priority, seq, key) = heapq.heappop(self._ready)
+          # skip the replaced entries
+          if key in self._pending and self._pending[key][0] == seq:
+            job = self._pending.pop(key)[1]
+            self._running.add(key)
+            return (key, job)
+        if self._delayed:
+          self._cv.wait(max(self._delayed[0][0] - now, 0.01))
+        else:
+          self._cv.wait()
+      return None
+    finally:
+      self._cv.release()
+
+  def _run(self):
+    while True:
+      item = self.__nextJob()
+      if item is None:
+        return
+      (key, job) = item
+      try:
+        result = job()
+      except:
+        import traceback
+        rospy.logwarn("SyncScheduler ERROR: %s", traceback.format_exc())
+        result = False
+      self._cv.acquire()
+      try:
+        self._running.discard(key)
+        if key in self._rerun:
+          (job, priority, due) = self._rerun.pop(key)
+          self.__push(key, job, priority, due)
+        elif result is False:
+          self.__push(key, job, 1, time.time() + SyncScheduler.RETRY_DELAY)
+        self._cv.notifyAll()
+      finally:
+        self._cv.release()
@@ -31,7 +31,9 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
+import re
 import threading
+import time
 import xmlrpclib
 
 import roslib; roslib.load_manifest('master_sync_fkie')
@@ -39,6 +41,10 @@ import roslib.message
 import rospy
 import rosgraph.masterapi
 
+import master_discovery_fkie.master_info as master_info
+import master_discovery_fkie.xmlrpc_pool as xmlrpc_pool
+from filter_interface import FilterInterface
+
 
 class MasterInfo(object):
   '''
@@ -64,14 +70,127 @@ class MasterInfo(object):
 
 
 
-class SyncThread(threading.Thread):
+class RemoteState(object):
+  '''
+  The replica of the state of a remote ROS master, which is updated by the 
+  complete state or by the changes returned by C{masterInfoDelta()} of the 
+  remote master_discovery node. The nodes are indexed to find the topics and 
+  services affected by a changed node.
   '''
-  A thread to synchronize the local ROS master with a remote master. While the 
+  def __init__(self):
+    self.publishers = dict()
+    '''@ivar: the published topics C{(topic name: [node names])}'''
+    self.subscribers = dict()
+    '''@ivar: the subscribed topics C{(topic name: [node names])}'''
+    self.services = dict()
+    '''@ivar: the services C{(service name: [node names])}'''
+    self.topic_types = dict()
+    '''@ivar: the types of the topics C{(topic name: type)}'''
+    self.node_uris = dict()
+    '''@ivar: the URIs of the local nodes of the remote ROS master C{(node name: URI)}'''
+    self.service_uris = dict()
+    '''@ivar: the URIs of the local services of the remote ROS master C{(service name: URI)}'''
+    # the names of the topics and services of a node, the key is the node name
+    self.__node_publishers = dict()
+    self.__node_subscribers = dict()
+    self.__node_services = dict()
+
+  def setState(self, listed):
+    '''
+    Replaces the current state by the given complete state.
+    @param listed: the state in the format of L{master_discovery_fkie.master_info.MasterInfo.listedState()}
+    @type listed:  C{tuple}
+    @return: the names of the changed published topics, subscribed topics and services
+    @rtype: C{(set(str), set(str), set(str))}
+    '''
+    current = (self.publishers, self.subscribers, self.services, self.topic_types, self.node_uris, self.service_uris)
+    delta = [listed[0], listed[1], listed[2]]
+    for idx in range(3, 9):
+      names = set(row[0] for row in listed[idx])
+      delta.append((listed[idx], [name for name in current[idx - 3].keys() if not name in names]))
+    return self.applyDelta(delta)
+
+  def applyDelta(self, delta):
+    '''
+    Applies the changes to the current state.
+    @param delta: the changes in the format of L{master_discovery_fkie.master_info.MasterInfo.listedDelta()}
+    @type delta:  C{tuple}
+    @return: the names of the changed published topics, subscribed topics and services
+    @rtype: C{(set(str), set(str), set(str))}
+    '''
+    pub_topics = set()
+    sub_topics = set()
+    services = set()
+    for (idx, table, index, changed) in [(3, self.publishers, self.__node_publishers, pub_topics),
+                                         (4, self.subscribers, self.__node_subscribers, sub_topics),
+                                         (5, self.services, self.__node_services, services)]:
+      (updated, removed) = delta[idx]
+      for name in removed:
+        self.__setNodes(table, index, name, [])
+        changed.add(name)
+      for (name, nodes) in updated:
+        self.__setNodes(table, index, name, nodes)
+        changed.add(name)
+    (updated, removed) = delta[6]
+    for name in removed:
+      self.topic_types.pop(name, None)
+    for (name, type) in updated:
+      self.topic_types[name] = type
+    for name in set(removed) | set(row[0] for row in updated):
+      pub_topics.add(name)
+      sub_topics.add(name)
+    (updated, removed) = delta[7]
+    for (name, uri) in [(name, None) for name in removed] + [(row[0], row[1] if row[3] == 'local' else None) for row in updated]:
+      if self.node_uris.get(name, None) != uri:
+        if uri is None:
+          del self.node_uris[name]
+        else:
+          self.node_uris[name] = uri
+        pub_topics.update(self.__node_publishers.get(name, []))
+        sub_topics.update(self.__node_subscribers.get(name, []))
+        services.update(self.__node_services.get(name, []))
+    (updated, removed) = delta[8]
+    for (name, uri) in [(name, None) for name in removed] + [(row[0], row[1] if row[3] == 'local' else None) for row in updated]:
+      if self.service_uris.get(name, None) != uri:
+        if uri is None:
+          del self.service_uris[name]
+        else:
+          self.service_uris[name] = uri
+        services.add(name)
+    return (pub_topics, sub_topics, services)
+
+  def __setNodes(self, table, index, name, nodes):
+    for node in table.pop(name, []):
+      names = index.get(node, None)
+      if not names is None:
+        names.discard(name)
+        if not names:
+          del index[node]
+    if nodes:
+      table[name] = list(nodes)
+      for node in nodes:
+        index.setdefault(node, set()).add(name)
+
+
+
+class SyncThread(object):
+  '''
+  The synchronization of the local ROS master with a remote master. While the 
   synchronization only the topic of the remote ROS master will be registered by
   the local ROS master. The remote ROS master will be keep unchanged.
+  The synchronization passes of all remote masters are executed by a shared
+  L{master_sync_fkie.sync_scheduler.SyncScheduler}, repeated update requests 
+  are coalesced to one pass.
   '''
+
+  MULTICALL_SIZE = 100
+  '''@ivar: the maximal count of registrations sent to the local ROS master in one C{xmlrpclib.MultiCall} request.'''
+  SYNC_DEBOUNCE = 0.2
+  '''@ivar: the time in seconds to collect the update requests before a synchronization pass is started.'''
+  MIN_SYNC_INTERVAL = 1.0
+  '''@ivar: the minimal time in seconds between the starts of two synchronization passes of the same master.'''
   
-  def __init__(self, name, uri, discoverer_name, monitoruri, timestamp):
+  def __init__(self, name, uri, discoverer_name, monitoruri, timestamp, scheduler):
     '''
     Initialization method for the SyncThread. 
     @param name: the name of the ROS master synchronized with.
@@ -84,30 +203,57 @@ class SyncThread(threading.Thread):
     @type monitoruri:  C{str}
     @param timestamp: The timestamp of the current state of the ROS master info.
     @type timestamp:  C{float64}
+    @param scheduler: the scheduler to execute the synchronization passes
+    @type scheduler:  L{master_sync_fkie.sync_scheduler.SyncScheduler}
     '''
-    # init thread
-    threading.Thread.__init__(self)
     self.masterInfo = MasterInfo(name, uri, discoverer_name, monitoruri, timestamp)
+    self.__scheduler = scheduler
     # synchronization variables 
-    self.__cv = threading.Condition()
+    self.__lock = threading.RLock()
     self.__stop = False
-    # a dictionary with published topics, the key is a tuple of (topic name, node name, node URL), value is a boolean
+    # the time of the last started synchronization pass
+    self.__last_pass = 0.0
+    # the registered published topics, the key is the topic name, the value a set of (topic name, node name, node URL)
     self.__publishers = {}
-    # a dictionary with subscribed topics, the key is a tuple of (topic name, node name, node URL), value is a boolean
+    # the registered subscribed topics, the key is the topic name, the value a set of (topic name, node name, node URL)
     self.__subscribers = {}
-    # a dictionary with services, the key is a tuple of (service name, service URL, node name, node URL), value is a boolean
+    # the registered services, the key is the service name, the value a set of (service name, service URL, node name, node URL)
     self.__services = {}
+    # the replica of the remote master state, updated by the changes since the synchronized version
+    self.__remote = RemoteState()
+    # the epoch and the version of the synchronized remote state, the versions are only valid within the epoch
+    self.__state_epoch = ''
+    self.__state_version = -1
+    # the changes of the master state are requested, if the remote master_discovery supports it
+    self.__use_delta = True
+    # the packed format of the master state is used, if the remote master_discovery supports it
+    self.__use_packed = True
+    # the compiled prefixes of the ignored nodes, compared on each pass
+    self.__ignore_re = None
+    # the URI of the local ROS master to register the remote topics and services
+    self.__local_masteruri = rosgraph.masterapi.Master(rospy.get_name()).master_uri
     
+    # the compiled rules of the synchronized topics and services
+    self.__filter = FilterInterface(name)
     self.ignore = ['/rosout', rospy.get_name(), self.masterInfo.discoverer_name, '/default_cfg', '/node_manager']
     if rospy.has_param('~ignore_nodes'):
       self.ignore[len(self.ignore):] = rospy.get_param('~ignore_nodes')
-    self.start()
+    if rospy.has_param('~multicall_size'):
+      SyncThread.MULTICALL_SIZE = max(1, rospy.get_param('~multicall_size'))
+    if rospy.has_param('~sync_debounce'):
+      SyncThread.SYNC_DEBOUNCE = rospy.get_param('~sync_debounce')
+    if rospy.has_param('~min_sync_interval'):
+      SyncThread.MIN_SYNC_INTERVAL = rospy.get_param('~min_sync_interval')
+    # the first synchronization of a new master is preferred
+    self.__scheduler.schedule(self, self._sync, priority=0)
 
 
   def update(self, name, uri, discoverer_name, monitoruri, timestamp):
     '''
     Sets a request to synchronize the local ROS master with this ROS master. 
-    @note: If currently a synchronization is running this request will be ignored!
+    @note: The requests are delayed by L{SYNC_DEBOUNCE} and coalesced to one 
+    synchronization pass with the newest state. If currently a synchronization 
+    is running, a further pass follows after L{MIN_SYNC_INTERVAL}.
     @param name: the name of the ROS master synchronized with.
     @type name:  C{str}
     @param uri: the URI of the ROS master synchronized with
@@ -121,180 +267,361 @@ class SyncThread(threading.Thread):
     '''
     master_info = MasterInfo(name, uri, discoverer_name, monitoruri, timestamp)
     rospy.logdebug("SyncThread[%s]: update request", self.masterInfo.name)
-    if self.__cv.acquire(blocking=False):
-      rospy.logdebug("SyncThread[%s]: update notify", self.masterInfo.name)
-      if (self.masterInfo.timestamp != master_info.timestamp):
+    self.__lock.acquire(True)
+    try:
+      if not self.__stop and (self.masterInfo.timestamp != master_info.timestamp):
+        rospy.logdebug("SyncThread[%s]: update notify", self.masterInfo.name)
         master_info.lastsync = self.masterInfo.lastsync
         self.masterInfo = master_info
         self.masterInfo.syncts = 0.0
-        self.__cv.notify()
-      self.__cv.release()
+        delay = max(SyncThread.SYNC_DEBOUNCE, self.__last_pass + SyncThread.MIN_SYNC_INTERVAL - time.time())
+        self.__scheduler.schedule(self, self._sync, priority=(0 if master_info.lastsync == 0.0 else 1), delay=delay)
+    finally:
+      self.__lock.release()
     rospy.logdebug("SyncThread[%s]: update exit", self.masterInfo.name)
 
   def stop(self):
     '''
-    Stops running thread.
+    Stops the synchronization and unregisters all synchronized topics and 
+    services from the local ROS master. A pending synchronization is discarded.
     '''
     rospy.logdebug("SyncThread[%s]: stop request", self.masterInfo.name)
-    if self.__cv.acquire(blocking=False):
-      self.__stop = True
-      self.__cv.notify()
-      self.__cv.release()
+    self.__lock.acquire(True)
+    try:
+      if not self.__stop:
+        self.__stop = True
+        self.__scheduler.schedule(self, self._finish, priority=0)
+    finally:
+      self.__lock.release()
     rospy.logdebug("SyncThread[%s]: stop exit", self.masterInfo.name)
 
-  def run(self):
-    '''
-    The synchronization procedure waits for notifications of the L{update()} method.
-    If the remote ROS master is changed, the changes will be performed on the 
-    local ROS master.
-    '''
-    while not self.__stop and not rospy.is_shutdown():
-      self.__cv.acquire()
-      ''' wait for new sync update '''
-      rospy.logdebug("SyncThread[%s]: run waiting", self.masterInfo.name)
-      if not (self.masterInfo.syncts == 0.0):
-        self.__cv.wait()
-      rospy.logdebug("SyncThread[%s]: run notify received", self.masterInfo.name)
-      if (not self.__stop):
-        rospy.logdebug("SyncThread[%s]: run sync", self.masterInfo.name)
-        ''' try to sync ''' 
-        try:
-          # initialize the lists to update topics
-          for key in self.__publishers.keys():
-            self.__publishers[key] = False
-          for key in self.__subscribers.keys():
-            self.__subscribers[key] = False
-          for key in self.__services.keys():
-            self.__services[key] = False
-            
-          #coonect to master_monitor rpc-xml server
-          remote_monitor = xmlrpclib.ServerProxy(self.masterInfo.monitoruri)
-          remote_state = remote_monitor.masterInfo()
-          stamp = float(remote_state[0])
-          remote_masteruri = remote_state[1]
-          remote_mastername = remote_state[2]
-          publishers = remote_state[3]
-          subscribers = remote_state[4]
-          services = remote_state[5]
-          topicTypes = remote_state[6]
-          nodeProviders = remote_state[7]
-          serviceProviders = remote_state[8]
-          # sync the publishers
-          for (topic, nodes) in publishers:
-            if not (topic in ['/rosout', 'rosout_agg']):
-              for node in nodes:
-                topictype = self._getTopicType(topic, topicTypes)
-                nodeuri = self._getNodeUri(node, nodeProviders)
-                if topictype and nodeuri and (not self._doIgnore(node)):
-                  # register the nodes only once
-                  if not ((topic, node, nodeuri) in self.__publishers):
-                    self.__registerPublisher(topic, topictype, node, nodeuri)
-                  self.__publishers[(topic, node, nodeuri)] = True
-          # unregister not updated topics
-          for key in self.__publishers.keys():
-            if (not self.__publishers[key]):
-              self.__unregisterPublisher(key[0], key[1], key[2])
-              del self.__publishers[key]
-  
-          # sync the subscribers
-          for (topic, nodes) in subscribers:
-            if not (topic in ['/rosout', 'rosout_agg']):
-              for node in nodes:
-                topictype = self._getTopicType(topic, topicTypes)
-                nodeuri = self._getNodeUri(node, nodeProviders)
-                if topictype and nodeuri and (not self._doIgnore(node)):
-                  # register the node as subscriber in local ROS master
-                  if not ((topic, node, nodeuri) in self.__subscribers):
-                    self.__registerSubscriber(topic, topictype, node, nodeuri)
-                  self.__subscribers[(topic, node, nodeuri)] = True
-          # unregister not updated topics
-          for key in self.__subscribers.keys():
-            if (not self.__subscribers[key]):
-              self.__unregisterSubscriber(key[0], key[1], key[2])
-              del self.__subscribers[key]
-          
-          # sync the services
-          for (service, nodes) in services:
-            for node in nodes:
-              serviceuri = self._getServiceUri(service, serviceProviders)
-              nodeuri = self._getNodeUri(node, nodeProviders)
-              if serviceuri and (not self._doIgnore(node)):
-                # register the node as publisher in local ROS master
-                if not ((service, serviceuri, node, nodeuri) in self.__services):
-                  self.__registerService(service, serviceuri, node, nodeuri)
-                self.__services[(service, serviceuri, node, nodeuri)] = True
-          # unregister not updated topics
-          for key in self.__services.keys():
-            if (not self.__services[key]):
-              self.__unregisterService(key[0], key[1], key[2])
-              del self.__services[key]
-
-          # set the last synchronization time
-          self.masterInfo.lastsync = stamp
-          self.masterInfo.syncts = stamp
-        except:
-          self.masterInfo.syncts = 0.0
-          import traceback
-          rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
-          rospy.sleep(3)
-      self.__cv.release()
-
-    #end routine if the master was removed
-    for topic, node, uri in self.__publishers:
-      self.__unregisterPublisher(topic, node, uri)
-    for topic, node, uri in self.__subscribers:
-      self.__unregisterSubscriber(topic, node, uri)
-    for service, serviceuri, node, uri in self.__services:
-      self.__unregisterService(service, serviceuri, node)
+  def _sync(self):
+    '''
+    Performs one synchronization pass. The changes of the remote ROS master 
+    since the last pass are requested and the differences between the desired 
+    and the current registrations of the affected topics and services will be 
+    performed on the local ROS master.
+    @return: C{False} if the synchronization failed and should be repeated
+    @rtype: C{bool}
+    '''
+    if self.__stop or rospy.is_shutdown():
+      return True
+    rospy.logdebug("SyncThread[%s]: run sync", self.masterInfo.name)
+    self.__lock.acquire(True)
+    try:
+      masterInfo = self.masterInfo
+      self.__last_pass = time.time()
+    finally:
+      self.__lock.release()
+    ''' try to sync ''' 
+    try:
+      #coonect to master_monitor rpc-xml server
+      remote_monitor = xmlrpc_pool.serverProxy(masterInfo.monitoruri)
+      (epoch, version, complete, remote_state) = self._requestRemoteChanges(remote_monitor)
+      stamp = float(remote_state[0])
+      ignore_re = self._compileIgnore(self.ignore)
+      if complete or getattr(ignore_re, 'pattern', None) != getattr(self.__ignore_re, 'pattern', None):
+        # compare all topics and services with the current registrations
+        self.__ignore_re = ignore_re
+        if not complete:
+          (pub_topics, sub_topics, services) = self.__remote.applyDelta(remote_state)
+        else:
+          (pub_topics, sub_topics, services) = self.__remote.setState(remote_state)
+        pub_topics.update(self.__publishers.keys())
+        pub_topics.update(self.__remote.publishers.keys())
+        sub_topics.update(self.__subscribers.keys())
+        sub_topics.update(self.__remote.subscribers.keys())
+        services.update(self.__services.keys())
+        services.update(self.__remote.services.keys())
+      else:
+        (pub_topics, sub_topics, services) = self.__remote.applyDelta(remote_state)
+      # the registrations and unregistrations of this pass as tuples of 
+      # (method, caller id, args, (dictionary, key) to remove on failure or None)
+      calls = []
+      # sync the publishers
+      for topic in pub_topics:
+        self.__reconcile(topic, self.__desiredTopic(topic, self.__remote.publishers), self.__publishers, calls, 'registerPublisher', 'unregisterPublisher', 'published topic')
+      # sync the subscribers
+      for topic in sub_topics:
+        self.__reconcile(topic, self.__desiredTopic(topic, self.__remote.subscribers), self.__subscribers, calls, 'registerSubscriber', 'unregisterSubscriber', 'subscriber topic')
+      # sync the services
+      for service in services:
+        self.__reconcile(service, self.__desiredService(service), self.__services, calls, 'registerService', 'unregisterService', 'service')
+
+      # perform all changes on the local ROS master
+      results = self._executeCalls(calls)
+      failed = False
+      new_subscribed = []
+      for (method, node, args, rollback), succeed in zip(calls, results):
+        if not succeed and not rollback is None:
+          # failed registrations will be repeated on the next pass
+          (registered, key) = rollback
+          keys = registered.get(key[0], None)
+          if not keys is None:
+            keys.discard(key)
+            if not keys:
+              del registered[key[0]]
+          # the skipped invalid calls would fail again, so they are not repeated
+          failed = failed or not succeed is None
+        elif succeed and method == 'registerSubscriber':
+          new_subscribed.append(args[0])
+      if new_subscribed:
+        self.__updateSubscribers(new_subscribed)
+
+      # set the last synchronization time
+      masterInfo.lastsync = stamp
+      masterInfo.syncts = stamp
+      if failed:
+        # compare all registrations on the next pass to repeat the failed
+        self.__state_epoch = ''
+        self.__state_version = -1
+        masterInfo.syncts = 0.0
+        return False
+      self.__state_epoch = epoch
+      self.__state_version = version
+      return True
+    except:
+      # the remote state is possibly inconsistent, request the complete state
+      self.__state_epoch = ''
+      self.__state_version = -1
+      masterInfo.syncts = 0.0
+      import traceback
+      rospy.logwarn("SyncThread[%s] ERROR: %s", masterInfo.name, traceback.format_exc())
+      return False
+
+  def __desiredTopic(self, topic, registrations):
+    '''
+    @return: the registrations of the remote nodes for the given topic, which 
+    should be available on the local ROS master.
+    @rtype: C{set((topic name, node name, node URI), ...)}
+    '''
+    result = set()
+    if self.__filter.syncTopic(topic):
+      topictype = self.__remote.topic_types.get(topic, None)
+      if topictype:
+        for node in registrations.get(topic, []):
+          nodeuri = self.__remote.node_uris.get(node, None)
+          if nodeuri and (not self._doIgnore(node)):
+            result.add((topic, node, nodeuri))
+    return result
+
+  def __desiredService(self, service):
+    '''
+    @return: the registrations of the remote nodes for the given service, 
+    which should be available on the local ROS master.
+    @rtype: C{set((service name, service URI, node name, node URI), ...)}
+    '''
+    result = set()
+    if self.__filter.syncService(service):
+      serviceuri = self.__remote.service_uris.get(service, None)
+      if serviceuri:
+        for node in self.__remote.services.get(service, []):
+          nodeuri = self.__remote.node_uris.get(node, None)
+          if nodeuri and (not self._doIgnore(node)):
+            result.add((service, serviceuri, node, nodeuri))
+    return result
+
+  def __reconcile(self, name, desired, registered, calls, register, unregister, kind):
+    '''
+    Compares the desired registrations of a topic or service with the current
+    registrations and adds the needed calls of the ROS master API.
+    @param name: the name of the topic or service
+    @type name:  C{str}
+    @param desired: the desired registrations
+    @type desired:  C{set(tuple)}
+    @param registered: the current registrations as dictionary C{(name: set(tuple))}, will be updated
+    @type registered:  C{dict}
+    @param calls: the list to append the calls
+    @type calls:  C{[(method, caller id, args, rollback), ...]}
+    '''
+    current = registered.get(name, set())
+    for key in desired - current:
+      if len(key) == 3:
+        (topic, node, nodeuri) = key
+        rospy.loginfo("SendThread[%s] register %s: %s [%s(%s)]", self.masterInfo.name, kind, topic, node, nodeuri)
+        calls.append((register, node, (topic, self.__remote.topic_types[topic], nodeuri), (registered, key)))
+      else:
+        (service, serviceuri, node, nodeuri) = key
+        rospy.loginfo("SendThread[%s] register %s: %s [%s, %s(%s)]", self.masterInfo.name, kind, service, serviceuri, node, nodeuri)
+        calls.append((register, node, (service, serviceuri, nodeuri), (registered, key)))
+    for key in current - desired:
+      rospy.loginfo("SendThread[%s] unregister %s: %s [%s]", self.masterInfo.name, kind, key[0], key[1] if len(key) == 4 else key[2])
+      if len(key) == 3:
+        calls.append((unregister, key[1], (key[0], key[2]), None))
+      else:
+        calls.append((unregister, key[2], (key[0], key[1]), None))
+    if desired:
+      registered[name] = desired
+    else:
+      registered.pop(name, None)
+
+  def _finish(self):
+    '''
+    Unregisters all synchronized topics and services from the local ROS master.
+    Called after the remote master was removed.
+    '''
+    calls = []
+    for keys in self.__publishers.itervalues():
+      for topic, node, uri in keys:
+        calls.append(('unregisterPublisher', node, (topic, uri), None))
+    for keys in self.__subscribers.itervalues():
+      for topic, node, uri in keys:
+        calls.append(('unregisterSubscriber', node, (topic, uri), None))
+    for keys in self.__services.itervalues():
+      for service, serviceuri, node, uri in keys:
+        calls.append(('unregisterService', node, (service, serviceuri), None))
+    self._executeCalls(calls)
+    self.__publishers.clear()
+    self.__subscribers.clear()
+    self.__services.clear()
+    return True
+
+  def _requestRemoteChanges(self, remote_monitor):
+    '''
+    Requests the changes of the remote ROS master since the last synchronized 
+    version. If the epoch of the remote state is changed, e.g. after a restart
+    of the remote master_discovery node, the complete state is requested. If 
+    the remote master_discovery node does not support C{masterInfoDelta()}, 
+    the complete state is requested.
+    @param remote_monitor: the proxy of the remote master_discovery RPC server
+    @type remote_monitor: C{xmlrpclib.ServerProxy}
+    @return: C{(epoch, version, complete, state)}, see 
+    L{master_discovery_fkie.master_monitor.MasterMonitor.getListedMasterInfoDelta()}
+    @rtype: C{(str, int, bool, tuple)}
+    '''
+    if self.__use_delta:
+      try:
+        (epoch, version, complete, state) = remote_monitor.masterInfoDelta(self.__state_epoch, self.__state_version)
+        if not complete and epoch != self.__state_epoch:
+          # the changes are not based on the synchronized state
+          (epoch, version, complete, state) = remote_monitor.masterInfoDelta('', -1)
+        return (epoch, version, complete, state)
+      except xmlrpclib.Fault:
+        rospy.loginfo("SyncThread[%s]: master state changes not supported, use the complete state", self.masterInfo.name)
+        self.__use_delta = False
+    return ('', -1, True, self._requestRemoteState(remote_monitor))
+
+  def _requestRemoteState(self, remote_monitor):
+    '''
+    Requests the state of the remote ROS master. The packed format is used, if
+    it is supported by the remote master_discovery node.
+    @param remote_monitor: the proxy of the remote master_discovery RPC server
+    @type remote_monitor: C{xmlrpclib.ServerProxy}
+    @return: the state in the format of L{master_discovery_fkie.master_info.MasterInfo.listedState()}
+    @rtype: C{tuple}
+    '''
+    if self.__use_packed:
+      try:
+        return master_info.MasterInfo.unpackState(remote_monitor.masterInfoPacked().data)
+      except xmlrpclib.Fault:
+        rospy.loginfo("SyncThread[%s]: packed master state not supported, use masterInfo()", self.masterInfo.name)
+        self.__use_packed = False
+    return remote_monitor.masterInfo()
+
+  @staticmethod
+  def _compileIgnore(ignore):
+    '''
+    Compiles the list with prefixes of the ignored nodes into one regular 
+    expression.
+    @param ignore: the list with prefixes of the node names
+    @type ignore:  C{[str, ...]}
+    @return: the compiled expression or C{None}, if the list is empty
+    @rtype: C{re.RegexObject}
+    '''
+    prefixes = [re.escape(n) for n in ignore if n]
+    if not prefixes:
+      return None
+    return re.compile('|'.join(prefixes))
 
   def _doIgnore(self, node):
-    for n in self.ignore:
-      if node.startswith(n):
-        return True
-    return False
+    return not self.__ignore_re is None and not self.__ignore_re.match(node) is None
     
-  def _getTopicType(self, topic, topicTypes):
-    for (topicname, type) in topicTypes:
-      if (topicname == topic):
-        return type
-    return None
-
-  def _getNodeUri(self, node, nodes):
-    for (nodename, uri, pid, local) in nodes:
-      if (nodename == node) and local == 'local':
-        return uri
-    return None
-
-  def _getServiceUri(self, service, nodes):
-    for (servicename, uri, type, local) in nodes:
-      if (servicename == service) and local == 'local':
-        return uri
-    return None
-
-  def __registerPublisher(self, topic, type, node, nodeuri):
-    try:
-      rospy.loginfo("SendThread[%s] register published topic: %s [%s(%s)]", self.masterInfo.name, topic, node, nodeuri)
-      lm = rosgraph.masterapi.Master(node)
-      lm.registerPublisher(topic, type, nodeuri)
-    except Exception:
-      import traceback
-      rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
+  def __callLocalMaster(self, method, node, *args):
+    '''
+    Calls the method of the local ROS master API with the node as caller ID. 
+    The persistent connections of the shared XML-RPC pool are used.
+    @param method: the name of the ROS master API method
+    @type method:  C{str}
+    @param node: the name of the node used as caller ID
+    @type node:  C{str}
+    @return: the value of the response
+    @raise Exception: if the ROS master reports an error
+    '''
+    code, msg, val = getattr(xmlrpc_pool.serverProxy(self.__local_masteruri), method)(node, *args)
+    if code != 1:
+      raise Exception("%s failed: %s" % (method, msg))
+    return val
+
+  def _executeCalls(self, calls):
+    '''
+    Executes the calls of the local ROS master API using C{xmlrpclib.MultiCall}
+    requests with up to L{MULTICALL_SIZE} calls. A failed call does not affect
+    the other calls: calls with invalid arguments are not sent and if a 
+    request fails, the calls of this request are repeated one by one.
+    @param calls: the list with calls as tuples of (method, caller id, args, ...)
+    @type calls:  C{[(str, str, tuple, ...), ...]}
+    @return: the list with the results of the calls, C{True} if the call was 
+    successful, C{None} if the call was skipped because of invalid arguments
+    @rtype: C{[bool, ...]}
+    '''
+    results = [False] * len(calls)
+    valid = []
+    for i, call in enumerate(calls):
+      # None can not be marshalled and would break the whole request
+      if call[1] is None or None in call[2]:
+        rospy.logwarn("SyncThread[%s] ERROR: %s%s skipped: invalid arguments", self.masterInfo.name, call[0], str(call[2]))
+        results[i] = None
+      else:
+        valid.append(i)
+    for i in range(0, len(valid), SyncThread.MULTICALL_SIZE):
+      chunk = valid[i:i+SyncThread.MULTICALL_SIZE]
+      # limit the rate of the registrations of all synchronized masters
+      self.__scheduler.limiter.acquire(len(chunk))
+      multi = xmlrpclib.MultiCall(xmlrpc_pool.serverProxy(self.__local_masteruri))
+      for j in chunk:
+        getattr(multi, calls[j][0])(calls[j][1], *calls[j][2])
+      try:
+        response = multi()
+      except:
+        import traceback
+        rospy.logwarn("SyncThread[%s] ERROR: %s, execute the calls one by one", self.masterInfo.name, traceback.format_exc())
+        for j in chunk:
+          results[j] = self._executeCall(calls[j])
+        continue
+      for k, j in enumerate(chunk):
+        try:
+          code, msg, _ = response[k]
+          if code != 1:
+            rospy.logwarn("SyncThread[%s] ERROR: %s%s failed: %s", self.masterInfo.name, calls[j][0], str(calls[j][2]), msg)
+          results[j] = (code == 1)
+        except xmlrpclib.Fault, e:
+          rospy.logwarn("SyncThread[%s] ERROR: %s%s failed: %s", self.masterInfo.name, calls[j][0], str(calls[j][2]), e)
+    return results
 
-  def __unregisterPublisher(self, topic, node, nodeuri):
+  def _executeCall(self, call):
+    '''
+    Executes a single call of the local ROS master API.
+    @param call: the call as tuple of (method, caller id, args, ...)
+    @type call:  C{(str, str, tuple, ...)}
+    @return: C{True} if the call was successful
+    @rtype: C{bool}
+    '''
     try:
-      rospy.loginfo("SendThread[%s] unregister published topic: %s [%s]", self.masterInfo.name, topic, nodeuri)
-      lm = rosgraph.masterapi.Master(node)
-      lm.unregisterPublisher(topic, nodeuri)
-    except Exception:
+      self.__callLocalMaster(call[0], call[1], *call[2])
+      return True
+    except:
       import traceback
-      rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
-
+      rospy.logwarn("SyncThread[%s] ERROR: %s%s failed: %s", self.masterInfo.name, call[0], str(call[2]), traceback.format_exc())
+      return False
 
-  def __registerSubscriber(self, topic, type, node, nodeuri):
+  def __updateSubscribers(self, topics):
+    '''
+    Triggers the publisherUpdate() of the local publishers for the new 
+    registered subscribers.
+    @param topics: the topics of the new registered subscribers
+    @type topics:  C{[str, ...]}
+    '''
     try:
-      rospy.loginfo("SendThread[%s] register subscriber topic: %s [%s(%s)]", self.masterInfo.name, topic, node, nodeuri)
-      lm = rosgraph.masterapi.Master(node)
-      lm.registerSubscriber(topic, type, nodeuri)
       # Horrible hack: the response from registerSubscriber() can contain a
       # list of current publishers.  But we don't have a way of injecting them
       # into rospy here.  Now, if we get a publisherUpdate() from the master,
@@ -304,40 +631,13 @@ class SyncThread(threading.Thread):
       # way.
 
       # We create publisher locally as a hack, to get callback set up properly for already registered local publishers
-      topics = lm.getPublishedTopics('')
-      for (t, type) in topics:
+      published = dict(self.__callLocalMaster('getPublishedTopics', rospy.get_name(), ''))
+      for topic in set(topics):
         # create the publisher only if one already exists
-        if t == topic:
-          topicPub = rospy.Publisher(topic, roslib.message.get_message_class(type))
+        if topic in published:
+          topicPub = rospy.Publisher(topic, roslib.message.get_message_class(published[topic]))
           topicPub.unregister()
           del topicPub
     except:
       import traceback
       rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
-
-  def __unregisterSubscriber(self, topic, node, nodeuri):
-    try:
-      rospy.loginfo("SendThread[%s] unregister subscriber topic: %s [%s]", self.masterInfo.name, topic, nodeuri)
-      lm = rosgraph.masterapi.Master(node)
-      lm.unregisterSubscriber(topic, nodeuri)
-    except Exception:
-      import traceback
-      rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
-
-  def __registerService(self, service, serviceuri, node, nodeuri):
-    try:
-      rospy.loginfo("SendThread[%s] register service: %s [%s, %s(%s)]", self.masterInfo.name, service, serviceuri, node, nodeuri)
-      lm = rosgraph.masterapi.Master(node)
-      lm.registerService(service, serviceuri, nodeuri)
-    except Exception:
-      import traceback
-      rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
-
-  def __unregisterService(self, service, serviceuri, node):
-    try:
-      rospy.loginfo("SendThread[%s] unregister service: %s [%s]", self.masterInfo.name, service, serviceuri)
-      lm = rosgraph.masterapi.Master(node)
-      lm.unregisterService(service, serviceuri)
-    except Exception:
-      import traceback
-      rospy.logwarn("SyncThread[%s] ERROR: %s", self.masterInfo.name, traceback.format_exc())
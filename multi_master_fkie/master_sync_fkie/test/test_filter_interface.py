@@ -0,0 +1,78 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+PKG = 'master_sync_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import unittest
+
+from master_sync_fkie.filter_interface import FilterInterface
+
+
+class TestFilterInterface(unittest.TestCase):
+  '''
+  Tests the compilation of the filter rules.
+  '''
+
+  def test_glob_rules(self):
+    rules = FilterInterface._compile(['/camera/*', '/scan?', '/velodyne_points'])
+    self.assertTrue(rules.match('/camera/image/compressed'))
+    self.assertTrue(rules.match('/scan1'))
+    self.assertTrue(rules.match('/velodyne_points'))
+    self.assertFalse(rules.match('/scan12'))
+    self.assertFalse(rules.match('/velodyne_points2'))
+
+  def test_regex_rules(self):
+    rules = FilterInterface._compile(['^/robot[0-9]+/'])
+    self.assertTrue(rules.match('/robot12/odom'))
+    self.assertFalse(rules.match('/robotx/odom'))
+
+  def test_invalid_regex_skipped(self):
+    rules = FilterInterface._compile(['^/robot[0-9', '/tf'])
+    self.assertTrue(rules.match('/tf'))
+    self.assertFalse(rules.match('/robot1'))
+    self.assertEqual(None, FilterInterface._compile(['^(/unclosed']))
+
+  def test_accept(self):
+    sync_re = FilterInterface._compile(['/robot/*'])
+    ignore_re = FilterInterface._compile(['/robot/camera/*'])
+    self.assertTrue(FilterInterface._accept('/robot/odom', sync_re, ignore_re))
+    self.assertFalse(FilterInterface._accept('/robot/camera/image', sync_re, ignore_re))
+    self.assertFalse(FilterInterface._accept('/other', sync_re, ignore_re))
+    self.assertTrue(FilterInterface._accept('/other', None, ignore_re))
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_filter_interface', TestFilterInterface)
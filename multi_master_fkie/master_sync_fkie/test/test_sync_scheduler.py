@@ -0,0 +1,175 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+PKG = 'master_sync_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import threading
+import time
+import unittest
+
+from master_sync_fkie.sync_scheduler import RateLimiter, SyncScheduler
+
+
+class TestSyncScheduler(unittest.TestCase):
+  '''
+  Tests the coalescing, the order and the retry of the synchronization jobs 
+  and the limit of the registration rate.
+  '''
+
+  def setUp(self):
+    self.retry_delay = SyncScheduler.RETRY_DELAY
+    self.runs = []
+    self.schedulers = []
+
+  def tearDown(self):
+    for scheduler in self.schedulers:
+      scheduler.shutdown(1.0)
+    SyncScheduler.RETRY_DELAY = self.retry_delay
+
+  def createScheduler(self, max_workers=2):
+    scheduler = SyncScheduler(max_workers, 0)
+    self.schedulers.append(scheduler)
+    return scheduler
+
+  def job(self, name, result=True, event=None):
+    '''
+    @return: a job, which stores its name on execution and waits for the event
+    '''
+    def run():
+      self.runs.append(name)
+      if not event is None:
+        event.wait(5.0)
+      return result
+    return run
+
+  def waitForRuns(self, count, scheduler):
+    deadline = time.time() + 5.0
+    while (len(self.runs) < count or scheduler.pending()) and time.time() < deadline:
+      time.sleep(0.01)
+
+  def test_coalesce_requests(self):
+    scheduler = self.createScheduler()
+    for i in range(5):
+      scheduler.schedule('remote', self.job('sync%d' % i), delay=0.2)
+    # the new requests do not postpone the pending one
+    time.sleep(0.25)
+    self.waitForRuns(1, scheduler)
+    self.assertEqual(['sync4'], self.runs)
+
+  def test_rerun_after_running(self):
+    scheduler = self.createScheduler()
+    event = threading.Event()
+    scheduler.schedule('remote', self.job('first', event=event))
+    while not self.runs:
+      time.sleep(0.01)
+    # the key is not executed concurrently, the requests are coalesced to one further run
+    scheduler.schedule('remote', self.job('second'))
+    scheduler.schedule('remote', self.job('third'))
+    time.sleep(0.1)
+    self.assertEqual(['first'], self.runs)
+    event.set()
+    self.waitForRuns(2, scheduler)
+    self.assertEqual(['first', 'third'], self.runs)
+
+  def test_priority(self):
+    scheduler = self.createScheduler(1)
+    event = threading.Event()
+    scheduler.schedule('busy', self.job('busy', event=event))
+    while not self.runs:
+      time.sleep(0.01)
+    scheduler.schedule('old', self.job('old'))
+    scheduler.schedule('new', self.job('new'), priority=0)
+    scheduler.schedule('later', self.job('later'))
+    event.set()
+    self.waitForRuns(4, scheduler)
+    self.assertEqual(['busy', 'new', 'old', 'later'], self.runs)
+
+  def test_retry_failed(self):
+    SyncScheduler.RETRY_DELAY = 0.1
+    scheduler = self.createScheduler()
+    results = [False, False, True]
+    def run():
+      self.runs.append(time.time())
+      return results.pop(0)
+    scheduler.schedule('remote', run)
+    self.waitForRuns(3, scheduler)
+    self.assertEqual(3, len(self.runs))
+    self.assertTrue(self.runs[2] - self.runs[0] >= 0.2)
+
+  def test_retry_on_exception(self):
+    SyncScheduler.RETRY_DELAY = 0.1
+    scheduler = self.createScheduler()
+    def run():
+      self.runs.append('run')
+      if len(self.runs) == 1:
+        raise Exception('test')
+      return True
+    scheduler.schedule('remote', run)
+    self.waitForRuns(2, scheduler)
+    self.assertEqual(['run', 'run'], self.runs)
+
+  def test_shutdown_discards_delayed(self):
+    scheduler = self.createScheduler()
+    scheduler.schedule('ready', self.job('ready'))
+    scheduler.schedule('delayed', self.job('delayed'), delay=10.)
+    scheduler.shutdown(1.0)
+    self.assertEqual(['ready'], self.runs)
+    self.assertEqual(0, scheduler.pending())
+
+  def test_rate_limiter(self):
+    limiter = RateLimiter(100, burst=10)
+    start = time.time()
+    limiter.acquire(10)
+    self.assertTrue(time.time() - start < 0.05)
+    # the next ten operations wait for the refill of the bucket
+    limiter.acquire(5)
+    limiter.acquire(5)
+    self.assertTrue(time.time() - start >= 0.09)
+    # a count bigger than the burst waits only for the full bucket
+    start = time.time()
+    limiter.acquire(50)
+    duration = time.time() - start
+    self.assertTrue(0.09 <= duration < 0.3)
+
+  def test_rate_limiter_disabled(self):
+    limiter = RateLimiter(0)
+    start = time.time()
+    for i in range(100):
+      limiter.acquire(1000)
+    self.assertTrue(time.time() - start < 0.05)
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_sync_scheduler', TestSyncScheduler)
@@ -0,0 +1,288 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+PKG = 'master_sync_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import os
+import threading
+import unittest
+from SimpleXMLRPCServer import SimpleXMLRPCServer
+
+import rospy
+
+from master_discovery_fkie.master_info import MasterInfo
+from master_sync_fkie.sync_scheduler import RateLimiter
+from master_sync_fkie.sync_thread import SyncThread
+
+
+class Stubs(object):
+  '''
+  Replaces the attributes of modules and classes and restores them.
+  '''
+  def __init__(self):
+    self._saved = []
+
+  def set(self, obj, name, value):
+    self._saved.append((obj, name, getattr(obj, name)))
+    setattr(obj, name, value)
+
+  def restore(self):
+    for (obj, name, value) in reversed(self._saved):
+      setattr(obj, name, value)
+    self._saved = []
+
+
+class SchedulerMock(object):
+  '''
+  Provides the interface of the L{SyncScheduler} without the workers. The 
+  scheduled jobs are executed by L{runJobs()}.
+  '''
+  limiter = RateLimiter(0)
+
+  def __init__(self):
+    self.jobs = dict()
+    self.requests = []
+
+  def schedule(self, key, job, priority=1, delay=0.):
+    self.jobs[key] = job
+    self.requests.append((priority, delay))
+
+  def runJobs(self):
+    jobs = self.jobs.values()
+    self.jobs.clear()
+    return [job() for job in jobs]
+
+
+class XmlRpcServer(object):
+  '''
+  Runs an XML-RPC server with the methods of this object in a thread.
+  '''
+  def __init__(self, methods):
+    self.server = SimpleXMLRPCServer(('127.0.0.1', 0), logRequests=False, allow_none=True)
+    self.server.register_multicall_functions()
+    for name in methods:
+      self.server.register_function(getattr(self, name), name)
+    self.uri = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+    # a short poll interval to shut down the server fast
+    self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def shutdown(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+
+class LocalMaster(XmlRpcServer):
+  '''
+  The local ROS master, which stores the calls of the registration API.
+  '''
+  def __init__(self):
+    self.calls = []
+    XmlRpcServer.__init__(self, ['registerPublisher', 'unregisterPublisher',
+                                 'registerSubscriber', 'unregisterSubscriber',
+                                 'registerService', 'unregisterService',
+                                 'getPublishedTopics'])
+
+  def registerPublisher(self, caller_id, topic, topic_type, caller_api):
+    self.calls.append(('registerPublisher', caller_id, topic, caller_api))
+    return (1, '', [])
+
+  def unregisterPublisher(self, caller_id, topic, caller_api):
+    self.calls.append(('unregisterPublisher', caller_id, topic, caller_api))
+    return (1, '', 1)
+
+  def registerSubscriber(self, caller_id, topic, topic_type, caller_api):
+    self.calls.append(('registerSubscriber', caller_id, topic, caller_api))
+    return (1, '', [])
+
+  def unregisterSubscriber(self, caller_id, topic, caller_api):
+    self.calls.append(('unregisterSubscriber', caller_id, topic, caller_api))
+    return (1, '', 1)
+
+  def registerService(self, caller_id, service, service_api, caller_api):
+    self.calls.append(('registerService', caller_id, service, service_api))
+    return (1, '', 1)
+
+  def unregisterService(self, caller_id, service, service_api):
+    self.calls.append(('unregisterService', caller_id, service, service_api))
+    return (1, '', 1)
+
+  def getPublishedTopics(self, caller_id, subgraph):
+    return (1, '', [])
+
+
+class RemoteMonitor(XmlRpcServer):
+  '''
+  The RPC server of the remote master_discovery node. The states are set by 
+  L{setState()}, the changes since a known version are computed from the 
+  stored states.
+  '''
+  def __init__(self):
+    self.states = []
+    XmlRpcServer.__init__(self, ['masterInfoDelta'])
+
+  def setState(self, publishers={}, subscribers={}, services={}, nodes={}):
+    '''
+    @param publishers: the publishing nodes of the topics C{(topic: [node names])}
+    @param subscribers: the subscribed nodes of the topics C{(topic: [node names])}
+    @param services: the providers of the services C{(service: (node name, service URI))}
+    @param nodes: the URIs of the local nodes C{(node: URI)}, the other nodes are remote nodes
+    '''
+    names = set(n for l in publishers.values() + subscribers.values() for n in l) | set(n for n, _ in services.values())
+    topics = set(publishers.keys()) | set(subscribers.keys())
+    self.states.append((str(len(self.states) + 1.), 'http://remote:11311/', 'remote',
+                        [(t, n) for t, n in publishers.iteritems()],
+                        [(t, n) for t, n in subscribers.iteritems()],
+                        [(s, [n]) for s, (n, _) in services.iteritems()],
+                        [(t, 'std_msgs/String') for t in topics],
+                        [(n, nodes.get(n, 'http://remote:%d/' % (1000 + i)), None, 'local' if n in nodes else 'remote') for i, n in enumerate(sorted(names))],
+                        [(s, uri, 'std_srvs/Empty', 'local' if n in nodes else 'remote') for s, (n, uri) in services.iteritems()]))
+
+  def masterInfoDelta(self, epoch, since_version):
+    version = len(self.states) - 1
+    if epoch == 'epoch' and 0 <= since_version <= version:
+      return ('epoch', version, False, MasterInfo.listedDelta(self.states[since_version], self.states[version]))
+    return ('epoch', version, True, self.states[version])
+
+
+class TestSyncThread(unittest.TestCase):
+  '''
+  Tests the synchronization passes and the execution of the registrations on 
+  the local ROS master.
+  '''
+
+  def setUp(self):
+    self.local_master = LocalMaster()
+    self.remote_monitor = RemoteMonitor()
+    self.masteruri = os.environ.get('ROS_MASTER_URI', None)
+    os.environ['ROS_MASTER_URI'] = self.local_master.uri
+    self.stubs = Stubs()
+    self.stubs.set(rospy, 'get_name', lambda: '/master_sync')
+    self.stubs.set(rospy, 'has_param', lambda name: False)
+    self.stubs.set(rospy, 'get_param', lambda name, default=None: default)
+    self.scheduler = SchedulerMock()
+    self.sync = SyncThread('remote', 'http://remote:11311/', '/master_discovery', self.remote_monitor.uri, 0., self.scheduler)
+
+  def tearDown(self):
+    self.stubs.restore()
+    if self.masteruri is None:
+      del os.environ['ROS_MASTER_URI']
+    else:
+      os.environ['ROS_MASTER_URI'] = self.masteruri
+    self.local_master.shutdown()
+    self.remote_monitor.shutdown()
+
+  def _sync(self, **state):
+    '''
+    Sets the state of the remote ROS master, executes the scheduled 
+    synchronization pass and returns the calls of the local ROS master.
+    '''
+    self.remote_monitor.setState(**state)
+    self.sync.update('remote', 'http://remote:11311/', '/master_discovery', self.remote_monitor.uri, len(self.remote_monitor.states))
+    self.assertEqual([True], self.scheduler.runJobs())
+    calls = sorted(self.local_master.calls)
+    del self.local_master.calls[:]
+    return calls
+
+  def _call(self, topic, node='/node', nodeuri='http://remote:1234/'):
+    return ('registerPublisher', node, (topic, 'std_msgs/String', nodeuri), None)
+
+  def test_sync_registrations(self):
+    nodes = {'/talker': 'http://remote:1/', '/listener': 'http://remote:2/'}
+    self.assertEqual([('registerPublisher', '/talker', '/chatter', 'http://remote:1/'),
+                      ('registerService', '/talker', '/talker/get_loggers', 'rosrpc://remote:3'),
+                      ('registerSubscriber', '/listener', '/chatter', 'http://remote:2/')],
+                     self._sync(publishers={'/chatter': ['/talker']}, subscribers={'/chatter': ['/listener']},
+                                services={'/talker/get_loggers': ('/talker', 'rosrpc://remote:3')}, nodes=nodes))
+    # only the differences are registered
+    self.assertEqual([('registerPublisher', '/talker', '/news', 'http://remote:1/'),
+                      ('unregisterService', '/talker', '/talker/get_loggers', 'rosrpc://remote:3'),
+                      ('unregisterSubscriber', '/listener', '/chatter', 'http://remote:2/')],
+                     self._sync(publishers={'/chatter': ['/talker'], '/news': ['/talker']}, nodes=nodes))
+    self.assertEqual([], self._sync(publishers={'/chatter': ['/talker'], '/news': ['/talker']}, nodes=nodes))
+    # the registrations of a restarted node are replaced
+    self.assertEqual([('registerPublisher', '/talker', '/chatter', 'http://remote:4/'),
+                      ('registerPublisher', '/talker', '/news', 'http://remote:4/'),
+                      ('unregisterPublisher', '/talker', '/chatter', 'http://remote:1/'),
+                      ('unregisterPublisher', '/talker', '/news', 'http://remote:1/')],
+                     self._sync(publishers={'/chatter': ['/talker'], '/news': ['/talker']}, nodes={'/talker': 'http://remote:4/'}))
+
+  def test_sync_ignores_remote_nodes(self):
+    # the nodes without URI are running on other hosts, which are synchronized itself
+    self.assertEqual([('registerPublisher', '/talker', '/chatter', 'http://remote:1/')],
+                     self._sync(publishers={'/chatter': ['/talker', '/other']}, subscribers={'/chatter': ['/other']},
+                                services={'/other/srv': ('/other', 'rosrpc://other:1')}, nodes={'/talker': 'http://remote:1/'}))
+    # the ignored nodes are not synchronized
+    self.assertEqual([('unregisterPublisher', '/talker', '/chatter', 'http://remote:1/')],
+                     self._sync(publishers={'/chatter': ['/talker'], '/rosout_agg': ['/rosout']},
+                                nodes={'/rosout': 'http://remote:2/'}))
+
+  def test_update_requests(self):
+    # the first synchronization is preferred
+    self.assertEqual([(0, 0.)], self.scheduler.requests)
+    # the requests are delayed and coalesced to one pass
+    self.remote_monitor.setState()
+    self.sync.update('remote', 'http://remote:11311/', '/master_discovery', self.remote_monitor.uri, 0.)
+    self.sync.update('remote', 'http://remote:11311/', '/master_discovery', self.remote_monitor.uri, 1.)
+    self.sync.update('remote', 'http://remote:11311/', '/master_discovery', self.remote_monitor.uri, 1.)
+    self.assertEqual([(0, 0.), (0, SyncThread.SYNC_DEBOUNCE)], self.scheduler.requests)
+    self.assertEqual([True], self.scheduler.runJobs())
+    # the next pass follows after the minimal interval
+    del self.scheduler.requests[:]
+    self.sync.update('remote', 'http://remote:11311/', '/master_discovery', self.remote_monitor.uri, 2.)
+    [(priority, delay)] = self.scheduler.requests
+    self.assertEqual(1, priority)
+    self.assertTrue(SyncThread.MIN_SYNC_INTERVAL - 0.5 < delay <= SyncThread.MIN_SYNC_INTERVAL)
+
+  def test_all_calls_succeed(self):
+    calls = [self._call('/t%d' % i) for i in range(5)]
+    self.assertEqual([True] * 5, self.sync._executeCalls(calls))
+    self.assertEqual(['/t%d' % i for i in range(5)], [c[2] for c in self.local_master.calls])
+
+  def test_invalid_argument_skipped(self):
+    calls = [self._call('/t1'), self._call('/t2', nodeuri=None), self._call('/t3', node=None)]
+    self.assertEqual([True, None, None], self.sync._executeCalls(calls))
+    self.assertEqual(['/t1'], [c[2] for c in self.local_master.calls])
+
+  def test_chunk_with_one_bad_call(self):
+    # the integer can not be marshalled, so the whole request fails
+    calls = [self._call('/t1'), ('registerPublisher', '/node', ('/t2', 'std_msgs/String', 2**40), None), self._call('/t3')]
+    self.assertEqual([True, False, True], self.sync._executeCalls(calls))
+    self.assertEqual(['/t1', '/t3'], [c[2] for c in self.local_master.calls])
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_sync_thread', TestSyncThread)
@@ -231,7 +231,7 @@ class OwnMasterMonitoring(QtCore.QObject):
           cputimes = os.times()
           cputime_init = cputimes[0] + cputimes[1]
           if self._master_monitor.checkState():
-            mon_state = self._master_monitor.getState()
+            mon_state = self._master_monitor.master_state
             # publish the new state
             state = MasterState(MasterState.STATE_CHANGED, 
                                 ROSMaster(str(self._local_addr), 
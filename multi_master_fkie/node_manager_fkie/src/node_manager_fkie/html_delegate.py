@@ -37,12 +37,23 @@ class HTMLDelegate(QtGui.QStyledItemDelegate):
   '''
   A class to display the HTML text in QTreeView.
   '''
+
+  def __init__(self, on_paint=None, parent=None):
+    '''
+    @param on_paint: the method called with the index of each painted cell, 
+    e.g. to resolve the data of the visible rows in background
+    @type on_paint: C{<method>(L{PySide.QtCore.QModelIndex})}
+    '''
+    QtGui.QStyledItemDelegate.__init__(self, parent)
+    self._on_paint = on_paint
   
   def paint(self, painter, option, index):
     '''
     Use the QTextDokument to represent the HTML text.
     @see: U{http://www.pyside.org/docs/pyside/PySide/QtGui/QAbstractItemDelegate.html#PySide.QtGui.QAbstractItemDelegate}
     '''
+    if not self._on_paint is None:
+      self._on_paint(index)
     options = QtGui.QStyleOptionViewItemV4(option)
     self.initStyleOption(options, index)
 
@@ -151,6 +151,7 @@ class MainWindow(QtGui.QMainWindow):
   def finish(self):
     self.state_topic.stop()
     self.stats_topic.stop()
+    self._update_handler.stop()
 
   def getMasteruri(self):
     '''
@@ -173,6 +174,7 @@ class MainWindow(QtGui.QMainWindow):
     '''
     if self.masters.has_key(masteruri):
       self.currentMaster = None
+      self._update_handler.setPriorityMaster(None)
       self.stackedLayout.setCurrentIndex(0)
       self.ui.masterInfoFrame.setEnabled(False)
       self.on_master_timecheck()
@@ -312,29 +314,40 @@ class MainWindow(QtGui.QMainWindow):
     '''
     rospy.loginfo("MASTERINFO from %s received", minfo.mastername)
     if self.masters.has_key(minfo.masteruri):
+      # the master views process the master info in a separate thread, so the 
+      # state of the received master is taken from the master info
+      has_master_sync = not minfo.getNodeEndsWith('master_sync') is None
+      is_local = False
+      try:
+        is_local = nm.is_local(nm.nameres().getHostname(minfo.masteruri))
+      except Exception, e:
+        rospy.logwarn("Error while process received master info from %s: %s", minfo.masteruri, str(e))
+      has_discovery_service = None
       for uri, master in self.masters.items():
         try:
           # check for running discovery service
-          if nm.is_local(nm.nameres().getHostname(minfo.masteruri)) and (master.master_info is None or master.master_info.timestamp < minfo.timestamp):
-            has_discovery_service = self.hasDiscoveryService(minfo)
+          if is_local and (master.master_info is None or master.master_info.timestamp < minfo.timestamp):
+            if has_discovery_service is None:
+              has_discovery_service = self.hasDiscoveryService(minfo)
             if not self.own_master_monitor.isPaused() and has_discovery_service:
               self._setLocalMonitoring(False)
               self._subscribe()
             elif not has_discovery_service:
               self._setLocalMonitoring(True)
               self.currentMaster = master
+              self._update_handler.setPriorityMaster(master.masteruri)
               self.stackedLayout.setCurrentWidget(master)
               self.ui.masterInfoFrame.setEnabled(True)
               self.on_master_timecheck()
           master.master_info = minfo
-          if not master.master_info is None and master.master_info.masteruri == minfo.masteruri:
-            self.master_model.setChecked(master.master_state.name, not minfo.getNodeEndsWith('master_sync') is None)
+          if master.masteruri == minfo.masteruri:
+            self.master_model.setChecked(master.master_state.name, has_master_sync)
         except Exception, e:
           rospy.logwarn("Error while process received master info from %s: %s", minfo.masteruri, str(e))
           
-      if not self.currentMaster is None and not self.currentMaster.master_info is None:
+      if not self.currentMaster is None and self.currentMaster.masteruri == minfo.masteruri:
         self.ui.syncButton.setEnabled(True)
-        self.ui.syncButton.setChecked(not self.currentMaster.master_info.getNodeEndsWith('master_sync') is None)
+        self.ui.syncButton.setChecked(has_master_sync)
 
   def on_conn_stats_updated(self, stats):
     '''
@@ -468,6 +481,7 @@ class MainWindow(QtGui.QMainWindow):
           self.ui.masterInfoFrame.setEnabled(True)
           self.ui.masternameLabel.setEnabled(True)
           self.currentMaster = self.getMaster(item.master.uri)
+          self._update_handler.setPriorityMaster(self.currentMaster.masteruri)
           self.stackedLayout.setCurrentWidget(self.currentMaster)
           self.on_master_timecheck()
           if not self.currentMaster.master_info is None:
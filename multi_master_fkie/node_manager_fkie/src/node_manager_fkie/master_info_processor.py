@@ -0,0 +1,225 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+from PySide import QtCore
+
+import rospy
+
+import node_manager_fkie as nm
+from node_tree_model import ExtendedNodeInfo
+
+
+class MasterInfoChanges(object):
+  '''
+  The changes of the views caused by a received master info. The changes are 
+  computed by L{MasterInfoProcessor} outside of the GUI thread, so that the 
+  views only apply them.
+  '''
+
+  def __init__(self, master_info):
+    self.master_info = master_info
+    '''@ivar: the current master info, the PIDs of the remote nodes are only set in L{nodes_updated}'''
+    self.nodes_removed = []
+    '''@ivar: the names of the not more registered nodes'''
+    self.nodes_updated = dict()
+    '''@ivar: the new nodes and the nodes with changed URI, PID or relations as C{dict(node name : L{ExtendedNodeInfo})}'''
+    self.topics = ([], dict(), dict())
+    '''@ivar: the removed names, the changed and the new topics as C{([str], dict(name : TopicInfo), dict(name : TopicInfo))}'''
+    self.services = ([], dict(), dict())
+    '''@ivar: the removed names, the changed and the new services as C{([str], dict(name : ServiceInfo), dict(name : ServiceInfo))}'''
+    self.hosts2update = []
+    '''@ivar: the hosts of new remote nodes, their PIDs are requested from the masters of these hosts'''
+    self.default_cfgs = []
+    '''@ivar: the available default configurations as C{[(service name, service uri)]}'''
+    self.dyncfg_services = []
+    '''@ivar: the names of the nodes with a dynamic reconfigure service'''
+
+
+class MasterInfoProcessor(QtCore.QObject):
+  '''
+  Computes the changes of the views of a ROS master in a separate thread. The 
+  received master info objects of this ROS master replace the current state, 
+  the master info objects of the other ROS masters provide the PIDs of the 
+  nodes running on their hosts. Requests received while processing are 
+  coalesced, only the last master info of each ROS master is processed.
+  The received master info objects are shared with the other views, so the 
+  PIDs of the remote nodes are kept by the processor and only set on the 
+  L{ExtendedNodeInfo} objects of the changed nodes.
+  '''
+  changes_signal = QtCore.Signal(MasterInfoChanges)
+  '''@ivar: the signal is emitted with the L{MasterInfoChanges} to apply.'''
+
+  def __init__(self, masteruri):
+    '''
+    @param masteruri: the URI of the ROS master
+    @type masteruri: C{str}
+    '''
+    QtCore.QObject.__init__(self)
+    self.masteruri = masteruri
+    self.__master_info = None
+    self.__pids = dict()
+    self.__default_cfgs = []
+    self.__dyncfg_services = []
+    self.__pending = None
+    self.__pending_others = dict()
+    self.__worker = None
+    self._lock = threading.RLock()
+
+  def process(self, master_info):
+    '''
+    Queues the master info and starts the processing thread, if it is not 
+    already running. This method is thread safe.
+    @param master_info: the master information object
+    @type master_info: L{master_discovery_fkie.MasterInfo}
+    '''
+    self._lock.acquire(True)
+    try:
+      if master_info.masteruri == self.masteruri:
+        self.__pending = master_info
+      else:
+        self.__pending_others[master_info.masteruri] = master_info
+      if self.__worker is None:
+        self.__worker = threading.Thread(target=self._run)
+        self.__worker.setDaemon(True)
+        self.__worker.start()
+    finally:
+      self._lock.release()
+
+  def _run(self):
+    while True:
+      self._lock.acquire(True)
+      try:
+        if not self.__pending is None:
+          master_info = self.__pending
+          self.__pending = None
+        elif self.__pending_others:
+          (uri, master_info) = self.__pending_others.popitem()
+        else:
+          self.__worker = None
+          return
+      finally:
+        self._lock.release()
+      try:
+        if master_info.masteruri == self.masteruri:
+          changes = self._updateState(master_info)
+        else:
+          changes = self._updatePids(master_info)
+        if not changes is None:
+          self.changes_signal.emit(changes)
+      except:
+        import traceback
+        rospy.logwarn("Error while process received master info from %s: %s", master_info.masteruri, traceback.format_exc().splitlines()[-1])
+
+  def _updateState(self, master_info):
+    '''
+    Replaces the current master info and computes the changes compared to the
+    previous one. The PIDs of the remote nodes are not discovered, they are 
+    kept by this processor as long as the URI of the node does not change.
+    '''
+    ((nodes_added, nodes_removed, nodes_changed), 
+     (topics_added, topics_removed, topics_changed), 
+     (services_added, services_removed, services_changed)) = master_info.diff(self.__master_info)
+    self.__master_info = master_info
+    for nodename in nodes_removed:
+      self.__pids.pop(nodename, None)
+    changes = self._nodeChanges(set(nodes_added) | set(nodes_changed))
+    changes.nodes_removed = nodes_removed
+    topics = master_info.topics
+    changes.topics = (topics_removed, 
+                      dict((name, topics[name]) for name in topics_changed), 
+                      dict((name, topics[name]) for name in topics_added))
+    services = master_info.services
+    changes.services = (services_removed, 
+                        dict((name, services[name]) for name in services_changed), 
+                        dict((name, services[name]) for name in services_added))
+    # request master info updates for new remote nodes or remote nodes with a new URI
+    hosts2update = set()
+    for nodename, node in changes.nodes_updated.iteritems():
+      if node.pid is None and not master_info.getNode(nodename).isLocal:
+        hosts2update.add(nm.nameres().getHostname(node.uri))
+    changes.hosts2update = [host for host in hosts2update if not host is None]
+    if services_added or services_removed or services_changed:
+      self.__default_cfgs = [(name, services[name].uri) for name in master_info.service_names if name.endswith('list_nodes')]
+      self.__dyncfg_services = [name[:-len('/set_parameters')] for name in services.iterkeys() if name.endswith('/set_parameters')]
+    changes.default_cfgs = self.__default_cfgs
+    changes.dyncfg_services = self.__dyncfg_services
+    return changes
+
+  def _updatePids(self, master_info):
+    '''
+    Takes the PIDs of the nodes running on the host of the other ROS master. 
+    Only the nodes with a changed PID are passed to the views.
+    @return: the changes or C{None}, if no master info of this ROS master was 
+    received yet or no PID was changed
+    '''
+    if self.__master_info is None:
+      return None
+    names = set()
+    for nodename, node in master_info.nodes.iteritems():
+      if node.isLocal:
+        n = self.__master_info.getNode(nodename)
+        if not n is None and n.pid is None and n.uri == node.uri and self._pid(n) != node.pid:
+          self.__pids[nodename] = (node.uri, node.pid)
+          names.add(nodename)
+    if not names:
+      return None
+    changes = self._nodeChanges(names)
+    changes.default_cfgs = self.__default_cfgs
+    changes.dyncfg_services = self.__dyncfg_services
+    return changes
+
+  def _pid(self, node):
+    '''
+    @return: the discovered PID of the node or the PID taken from the ROS master
+    running on the host of the node, if the URI of the node was not changed
+    '''
+    if not node.pid is None:
+      return node.pid
+    (uri, pid) = self.__pids.get(node.name, (None, None))
+    if uri == node.uri:
+      return pid
+    return None
+
+  def _nodeChanges(self, names):
+    '''
+    Creates the changes with the extended info of the given nodes.
+    '''
+    master_info = self.__master_info
+    changes = MasterInfoChanges(master_info)
+    mastername = str(master_info.mastername)
+    masteruri = str(master_info.masteruri)
+    for name in names:
+      node = master_info.getNode(name)
+      if not node is None:
+        changes.nodes_updated[name] = ExtendedNodeInfo(node.name, mastername, masteruri, node.uri, self._pid(node), node.publishedTopics, node.subscribedTopics, node.services)
+    return changes
@@ -50,6 +50,7 @@ from node_tree_model import NodeTreeModel, ExtendedNodeInfo
 from service_list_model import ServiceModel, ServiceItem
 from parameter_list_model import ParameterModel, ParameterItem
 from default_cfg_handler import DefaultConfigHandler
+from master_info_processor import MasterInfoProcessor
 from launch_config import LaunchConfig, LaunchConfigException
 
 
@@ -76,6 +77,7 @@ class MasterViewProxy(QtGui.QWidget):
     self.__master_info = None
     self.__launchfiles = dict()
     self.__default_configs = dict() # [(service name, service uri)] = nodes
+    self.__dyncfg_services = [] # the names of the nodes with dynamic reconfigure service
     self.rosconfigs = dict() # [launch file path] = LaunchConfig()
     self.__in_question = []
     self._stop_ignores = ['/rosout', rospy.get_name(), '/master_discovery', '/master_sync', '/default_cfg']
@@ -88,6 +90,9 @@ class MasterViewProxy(QtGui.QWidget):
     self.default_cfg_handler.node_list_signal.connect(self.on_default_cfg_nodes_retrieved)
     self.default_cfg_handler.description_signal.connect(self.on_default_cfg_descr_retrieved)
     self.default_cfg_handler.err_signal.connect(self.on_default_cfg_err)
+
+    self.master_info_processor = MasterInfoProcessor(masteruri)
+    self.master_info_processor.changes_signal.connect(self.on_master_info_changes)
     
     loader = QtUiTools.QUiLoader()
     self.masterTab = loader.load(":/forms/MasterTab.ui")
@@ -119,7 +124,9 @@ class MasterViewProxy(QtGui.QWidget):
     for i, (name, width) in enumerate(TopicModel.header):
       self.masterTab.topicsView.setColumnWidth(i, width)
     self.topicNameDelegate = HTMLDelegate()
+    self.topicTypeDelegate = HTMLDelegate(self._prefetchTopic)
     self.masterTab.topicsView.setItemDelegateForColumn(0, self.topicNameDelegate)
+    self.masterTab.topicsView.setItemDelegateForColumn(3, self.topicTypeDelegate)
     self.masterTab.topicsView.selectionModel().selectionChanged.connect(self.on_topic_selection_changed)
     self.masterTab.topicsView.activated.connect(self.on_topic_activated)
     self.masterTab.topicsView.setSortingEnabled(True)
@@ -134,7 +141,7 @@ class MasterViewProxy(QtGui.QWidget):
     for i, (name, width) in enumerate(ServiceModel.header):
       self.masterTab.servicesView.setColumnWidth(i, width)
     self.serviceNameDelegate = HTMLDelegate()
-    self.serviceTypeDelegate = HTMLDelegate()
+    self.serviceTypeDelegate = HTMLDelegate(self._prefetchService)
     self.masterTab.servicesView.setItemDelegateForColumn(0, self.serviceNameDelegate)
     self.masterTab.servicesView.setItemDelegateForColumn(1, self.serviceTypeDelegate)
     self.masterTab.servicesView.selectionModel().selectionChanged.connect(self.on_service_selection_changed)
@@ -225,39 +232,29 @@ class MasterViewProxy(QtGui.QWidget):
     PID and his URI are needed. The PID of remote nodes (host of the ROS master 
     and the node are different) will be not determine by discovering. Thus this
     information must be obtain from other MasterInfo object and stored while
-    updating.
+    updating. The changes of the views are computed by L{MasterInfoProcessor} 
+    in a separate thread and applied by L{on_master_info_changes()}.
     @param master_info: the mater information object
     @type master_info: L{master_discovery_fkie.msg.MasterInfo}
     '''
-    if (master_info.masteruri == self.masteruri):
-      # store process pid's of remote nodes
-      nodepids = []
-      if not self.__master_info is None:
-        nodepids = [(n.name, n.pid, n.uri) for nodename, n in self.__master_info.nodes.items() if not n.isLocal]
-      self.__master_info = master_info
-      # restore process pid's of remote nodes
-      if not self.__master_info is None:
-        for nodename, pid, uri in nodepids:
-          node = self.__master_info.getNode(nodename)
-          if not node is None:
-            node.pid = pid
-      # request master info updates for new remote nodes
-      nodepids2 = [(n.name, n.pid, n.uri) for nodename, n in self.__master_info.nodes.items() if not n.isLocal]
-      node2update = list(set(nodepids2)-set(nodepids))
-      hosts2update = list(set([nm.nameres().getHostname(uri) for nodename, pid, uri in node2update]))
-      for host in hosts2update:
-        self.updateHostRequest.emit(host)
-    else:
-      if not (self.__master_info is None or master_info is None):
-        for nodename, node in master_info.nodes.items():
-          if node.isLocal:
-            n = self.__master_info.getNode(nodename)
-            if not n is None:
-              n.pid = node.pid
-    self.updateRunningNodesInModel(self.__master_info)
-    self.updateTopicsListModel(self.__master_info)
-    self.updateServiceListModel(self.__master_info)
-    self.updateDefaultConfigs(self.__master_info)
+    self.master_info_processor.process(master_info)
+
+  def on_master_info_changes(self, changes):
+    '''
+    Applies the changes computed for a received master information.
+    @param changes: the changes of the views
+    @type changes: L{master_info_processor.MasterInfoChanges}
+    '''
+    self.__master_info = changes.master_info
+    self.__dyncfg_services = changes.dyncfg_services
+    # request master info updates for new remote nodes
+    for host in changes.hosts2update:
+      self.updateHostRequest.emit(host)
+    self.node_tree_model.applyChanges(changes.nodes_removed, changes.nodes_updated, nm.nameres().getHostname(self.masteruri))
+    self.updateButtons()
+    self.topic_model.applyChanges(*changes.topics)
+    self.service_model.applyChanges(*changes.services)
+    self.updateDefaultConfigs(self.__master_info, changes.default_cfgs)
   
   def show_ros_names(self, value):
     '''
@@ -266,23 +263,6 @@ class MasterViewProxy(QtGui.QWidget):
     '''
     self.node_tree_model.show_ros_names(value)
   
-  def updateRunningNodesInModel(self, master_info):
-    '''
-    Creates the dictionary with ExtendedNodeInfo objects and updates the nodes view.
-    @param master_info: the mater information object
-    @type master_info: L{master_discovery_fkie.msg.MasterInfo}
-    '''
-    if not master_info is None:
-      nodes_extended = dict()
-      for n in master_info.node_names:
-        node = master_info.getNode(n)
-        if not node is None:
-          nodes_extended[node.name] = ExtendedNodeInfo(node.name, str(master_info.mastername), str(master_info.masteruri), node.uri, node.pid, node.publishedTopics, node.subscribedTopics, node.services)
-        else:
-          nodes_extended[n] = ExtendedNodeInfo(n, str(master_info.mastername), str(master_info.masteruri))
-      self.node_tree_model.updateModelData(nodes_extended, nm.nameres().getHostname(self.masteruri))
-      self.updateButtons()
-
   def updateButtons(self):
     '''
     Updates the enable state of the buttons depending of the selection and 
@@ -303,8 +283,7 @@ class MasterViewProxy(QtGui.QWidget):
     self.masterTab.logDeleteButton.setEnabled(has_running or has_stopped)
     # test for available dynamic reconfigure services
     if not self.master_info is None:
-      dyncfgServices = [s[:-len('/set_parameters')] for s in self.master_info.services.keys() if (s.endswith('/set_parameters'))]
-      dyncfgNodes = [s for n in selectedNodes for s in dyncfgServices if s.startswith((n.name))]
+      dyncfgNodes = [s for n in selectedNodes for s in self.__dyncfg_services if s.startswith((n.name))]
       self.masterTab.dynamicConfigButton.setEnabled(len(dyncfgNodes))
     # the configuration is only available, if only one node is selected
     cfg_enable = False
@@ -312,24 +291,6 @@ class MasterViewProxy(QtGui.QWidget):
       cfg_enable = len(selectedNodes[0].cfgs) > 0
     self.masterTab.editConfigButton.setEnabled(cfg_enable)
 
-  def updateTopicsListModel(self, master_info):
-    '''
-    Updates the topic view based on the current master information.
-    @param master_info: the mater information object
-    @type master_info: L{master_discovery_fkie.msg.MasterInfo}
-    '''
-    if not master_info is None:
-      self.topic_model.updateModelData(master_info.topics)
-
-  def updateServiceListModel(self, master_info):
-    '''
-    Updates the service view based on the current master information.
-    @param master_info: the mater information object
-    @type master_info: L{master_discovery_fkie.msg.MasterInfo}
-    '''
-    if not master_info is None:
-      self.service_model.updateModelData(master_info.services)
-
   def hasLaunchfile(self, path):
     '''
     @param path: the launch file
@@ -482,19 +443,23 @@ class MasterViewProxy(QtGui.QWidget):
     self.node_tree_model.removeConfigNodes(nodes_extended)
     self.updateButtons()
 
-  def updateDefaultConfigs(self, master_info):
+  def updateDefaultConfigs(self, master_info, default_cfgs=None):
     '''
     Updates the default configuration view based on the current master information.
     @param master_info: the mater information object
     @type master_info: L{master_discovery_fkie.msg.MasterInfo}
+    @param default_cfgs: the already determined default configurations, 
+    otherwise they are searched in the master information.
+    @type default_cfgs: C{[(service name, service uri)]} or C{None}
     '''
     if self.__master_info is None:
       return
-    default_cfgs = []
-    for name in self.__master_info.service_names:
-      if name.endswith('list_nodes'):
-        srv = self.__master_info.getService(name)
-        default_cfgs.append((name, srv.uri))
+    if default_cfgs is None:
+      default_cfgs = []
+      for name in self.__master_info.service_names:
+        if name.endswith('list_nodes'):
+          srv = self.__master_info.getService(name)
+          default_cfgs.append((name, srv.uri))
     # remove the node contained in default configuration form the view
     removed = list(set(self.__default_configs.keys()) - set(default_cfgs))
     if removed:
@@ -694,6 +659,24 @@ class MasterViewProxy(QtGui.QWidget):
         result.append(item.service)
     return result
 
+  def _prefetchTopic(self, index):
+    '''
+    Called by the delegate for the painted type cells of the topic view, so
+    that only the types of the visible rows are resolved in background.
+    '''
+    item = self.topic_model.itemFromIndex(self.topic_proxyModel.mapToSource(index))
+    if not item is None:
+      item.prefetch()
+
+  def _prefetchService(self, index):
+    '''
+    Called by the delegate for the painted type cells of the service view, so
+    that only the service classes of the visible rows are resolved in background.
+    '''
+    item = self.service_model.itemFromIndex(self.service_proxyModel.mapToSource(index))
+    if not item is None:
+      item.prefetch()
+
   def parameterFromIndexes(self, indexes):
     result = []
     for index in indexes:
@@ -30,6 +30,7 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import bisect
 from urlparse import urlparse
 
 from PySide import QtCore
@@ -122,12 +123,16 @@ class ExtendedNodeInfo(object):
     The name, mastername, masteruri and launch configurations are not changed.
     @param other: the other instance of the L{ExtendedNodeInfo}
     @type other: L{ExtendedNodeInfo}
+    @return: C{True}, if the URI or the PID of the node is changed
+    @rtype: C{bool}
     '''
+    changed = (self.uri != other.uri or self.pid != other.pid)
     self.uri = other.uri
     self.pid = other.pid
     self.published = other.published
     self.subscribed = other.subscribed
     self.services = other.services
+    return changed
 
 
   def updateDispayedName(self, item, show_ros_names):
@@ -264,7 +269,48 @@ class HostItem(QtGui.QStandardItem):
       else:
         self.setIcon(QtGui.QIcon(':/icons/remote.png'))
     self.descr_type = self.descr_name = self.descr = ''
+    # the sorted lower case names of the node rows, used to find a row by bisection
+    self.__node_keys = []
   
+  def nodeRow(self, name):
+    '''
+    Searches for the row of the node with given name.
+    @param name: the name of the node
+    @type name: C{str}
+    @return: the row of the node or C{-1}, if the node is not a child of this host
+    @rtype: C{int}
+    '''
+    key = name.lower()
+    i = bisect.bisect_left(self.__node_keys, key)
+    if i < len(self.__node_keys) and self.__node_keys[i] == key:
+      return i
+    return -1
+
+  def insertNode(self, ext_node, show_ros_names):
+    '''
+    Inserts a new row for the given node in sorted order.
+    @param ext_node: the node data
+    @type ext_node: L{ExtendedNodeInfo}
+    @param show_ros_names: show the as ROS names or as their description.
+    @type show_ros_names: C{bool}
+    @return: the inserted item
+    @rtype: L{NodeItem}
+    '''
+    key = ext_node.name.lower()
+    i = bisect.bisect_left(self.__node_keys, key)
+    self.__node_keys.insert(i, key)
+    self.insertRow(i, NodeItem.getItemList(ext_node, show_ros_names))
+    return self.child(i)
+
+  def removeNodeRow(self, row):
+    '''
+    Removes the row of a node.
+    @param row: the row to remove
+    @type row: C{int}
+    '''
+    del self.__node_keys[row]
+    self.removeRow(row)
+
   def updateTooltip(self):
     '''
     Creates a tooltip description based on text set by L{updateDescription()} 
@@ -528,45 +574,83 @@ class NodeTreeModel(QtGui.QStandardItemModel):
     @type onhost: C{str}
     '''
     #remove old nodes from the list
-    nodes = nodes_extended.keys()
     for i in reversed(range(self.invisibleRootItem().rowCount())):
       host = self.invisibleRootItem().child(i)
       if not host is None: # should not occur
         for j in reversed(range(host.rowCount())):
           nodeItem = host.child(j)
-          if not nodeItem.node.name in nodes:
-            nodeItem.node.updateRunState(ExtendedNodeInfo(nodeItem.node.name, None, None, None, None))
+          node = nodes_extended.get(nodeItem.node.name, None)
+          if node is None:
+            changed = nodeItem.node.updateRunState(ExtendedNodeInfo(nodeItem.node.name, None, None, None, None))
             if self.canBeremoved(nodeItem.node):
-              host.removeRow(j)
-            else:
+              host.removeNodeRow(j)
+            elif changed:
               nodeItem.updateNodeView(host, self.show_rosnames)
-          elif nodes_extended[nodeItem.node.name].uri != nodeItem.node.uri and not nodeItem.node.cfgs and not nodeItem.node.default_cfgs:
+          elif node.uri != nodeItem.node.uri and not nodeItem.node.cfgs and not nodeItem.node.default_cfgs:
             # if the node was started on the other host, remove the current existing
-            host.removeRow(j)
+            host.removeNodeRow(j)
       else:
         return
       if host.rowCount() == 0:
         self.invisibleRootItem().removeRow(i)
+    self.__updateNodes(nodes_extended, onhost)
+
+  def applyChanges(self, removed, updated, onhost):
+    '''
+    Applies the changes of the running nodes computed outside of the GUI thread.
+    In contrast to L{updateModelData()} only the rows of the given nodes are 
+    searched.
+    @param removed: the names of the not more registered nodes
+    @type removed: C{[str, ...]}
+    @param updated: a dictionary with name and extended info of the new nodes 
+    and of the nodes with changed URI, PID or relations.
+    @type updated: C{dict(node name : L{ExtendedNodeInfo}, ...)}
+    @param onhost: the displayed host
+    @type onhost: C{str}
+    '''
+    root = self.invisibleRootItem()
+    for i in reversed(range(root.rowCount())):
+      host = root.child(i)
+      for name in removed:
+        row = host.nodeRow(name)
+        if row >= 0:
+          nodeItem = host.child(row)
+          changed = nodeItem.node.updateRunState(ExtendedNodeInfo(nodeItem.node.name, None, None, None, None))
+          if self.canBeremoved(nodeItem.node):
+            host.removeNodeRow(row)
+          elif changed:
+            nodeItem.updateNodeView(host, self.show_rosnames)
+      for (name, node) in updated.items():
+        row = host.nodeRow(name)
+        if row >= 0:
+          nodeItem = host.child(row)
+          if node.uri != nodeItem.node.uri and not nodeItem.node.cfgs and not nodeItem.node.default_cfgs:
+            # if the node was started on the other host, remove the current existing
+            host.removeNodeRow(row)
+      if host.rowCount() == 0:
+        root.removeRow(i)
+    self.__updateNodes(updated, onhost)
+
+  def __updateNodes(self, nodes_extended, onhost):
+    '''
+    Updates the existing and inserts the new nodes into the items of their hosts.
+    '''
+    hostItems = dict()
     for (name, node) in nodes_extended.items():
       # create parent items for different hosts
       host = nm.nameres().getHostname(node.uri if not node.uri is None else node.masteruri)
       if not host is None:
-        hostItem = self.getHostItem(host, node.masteruri, onhost)
-        doAddItem = True
-        for i in range(hostItem.rowCount()):
-          nodeItem = hostItem.child(i)
-          if (nodeItem == node.name):
-            # update item
-            nodeItem.node.updateRunState(node)
-            nodeItem.updateNodeView(hostItem, self.show_rosnames)
-            doAddItem = False
-            break
-          elif (hostItem.child(i) > node.name):
-            hostItem.insertRow(i, NodeItem.getItemList(node, self.show_rosnames))
-            doAddItem = False
-            break
-        if doAddItem:
-          hostItem.appendRow(NodeItem.getItemList(node, self.show_rosnames))
+        if not host in hostItems:
+          hostItems[host] = self.getHostItem(host, node.masteruri, onhost)
+        hostItem = hostItems[host]
+        row = hostItem.nodeRow(node.name)
+        if row >= 0:
+          # update item
+          nodeItem = hostItem.child(row)
+          nodeItem.node.updateRunState(node)
+          nodeItem.updateNodeView(hostItem, self.show_rosnames)
+        else:
+          hostItem.insertNode(node, self.show_rosnames)
       else: # should not happen!
         print "node IGNORED", name, " - no host detected, uri:", node.uri, ", masteruri:", node.masteruri
 
@@ -580,21 +664,13 @@ class NodeTreeModel(QtGui.QStandardItemModel):
     for (name, node) in nodes_extended.items():
       # create parent items for different hosts
       hostItem = self.getHostItem(node.mastername, node.masteruri, onhost)
-      doAddItem = True
-      for i in range(hostItem.rowCount()):
-        nodeItem = hostItem.child(i)
-        if (hostItem.child(i) == node.name):
-          # update item
-          hostItem.child(i).node.addConfig(node.cfgs)
-          hostItem.child(i).updateNodeView(hostItem, self.show_rosnames)
-          doAddItem = False
-          break
-        elif (hostItem.child(i) > node.name):
-          hostItem.insertRow(i, NodeItem.getItemList(node, self.show_rosnames))
-          doAddItem = False
-          break
-      if doAddItem:
-        hostItem.appendRow(NodeItem.getItemList(node, self.show_rosnames))
+      row = hostItem.nodeRow(node.name)
+      if row >= 0:
+        # update item
+        hostItem.child(row).node.addConfig(node.cfgs)
+        hostItem.child(row).updateNodeView(hostItem, self.show_rosnames)
+      else:
+        hostItem.insertNode(node, self.show_rosnames)
 
   def removeConfigNodes(self, nodes_extended):
     '''
@@ -604,16 +680,16 @@ class NodeTreeModel(QtGui.QStandardItemModel):
     @param nodes_extended: a dictionary with nodes and his names
     @type nodes_extended: C{dict(node name : L{ExtendedNodeInfo}, ...)} 
     '''
-    nodenames= nodes_extended.keys()
     for i in reversed(range(self.invisibleRootItem().rowCount())):
       host = self.invisibleRootItem().child(i)
       if not host is None:
-        for j in reversed(range(host.rowCount())):
-          nodeItem = host.child(j)
-          if nodeItem.node.name in nodenames:
-            nodeItem.node.remConfig(nodes_extended[nodeItem.node.name].cfgs)
+        for (name, node) in nodes_extended.items():
+          j = host.nodeRow(name)
+          if j >= 0:
+            nodeItem = host.child(j)
+            nodeItem.node.remConfig(node.cfgs)
             if self.canBeremoved(nodeItem.node):
-              host.removeRow(j)
+              host.removeNodeRow(j)
             else:
               nodeItem.updateNodeView(host, self.show_rosnames)
         if host.rowCount() == 0:
@@ -629,21 +705,13 @@ class NodeTreeModel(QtGui.QStandardItemModel):
     for (name, node) in nodes_extended.items():
       # create parent items for different hosts
       hostItem = self.getHostItem(node.mastername, node.masteruri, onhost)
-      doAddItem = True
-      for i in range(hostItem.rowCount()):
-        nodeItem = hostItem.child(i)
-        if (hostItem.child(i) == node.name):
-          # update item
-          hostItem.child(i).node.addDefaultConfig(node.default_cfgs)
-          hostItem.child(i).updateNodeView(hostItem, self.show_rosnames)
-          doAddItem = False
-          break
-        elif (hostItem.child(i) > node.name):
-          hostItem.insertRow(i, NodeItem.getItemList(node, self.show_rosnames))
-          doAddItem = False
-          break
-      if doAddItem:
-        hostItem.appendRow(NodeItem.getItemList(node, self.show_rosnames))
+      row = hostItem.nodeRow(node.name)
+      if row >= 0:
+        # update item
+        hostItem.child(row).node.addDefaultConfig(node.default_cfgs)
+        hostItem.child(row).updateNodeView(hostItem, self.show_rosnames)
+      else:
+        hostItem.insertNode(node, self.show_rosnames)
 
   def removeDefaultConfigNodes(self, nodes_extended):
     '''
@@ -653,16 +721,16 @@ class NodeTreeModel(QtGui.QStandardItemModel):
     @param nodes_extended: a dictionary with nodes and his names
     @type nodes_extended: C{dict(node name : L{ExtendedNodeInfo}, ...)} 
     '''
-    nodenames= nodes_extended.keys()
     for i in reversed(range(self.invisibleRootItem().rowCount())):
       host = self.invisibleRootItem().child(i)
       if not host is None:
-        for j in reversed(range(host.rowCount())):
-          nodeItem = host.child(j)
-          if nodeItem.node.name in nodenames:
-            nodeItem.node.remDefaultConfig(nodes_extended[nodeItem.node.name].default_cfgs)
+        for (name, node) in nodes_extended.items():
+          j = host.nodeRow(name)
+          if j >= 0:
+            nodeItem = host.child(j)
+            nodeItem.node.remDefaultConfig(node.default_cfgs)
             if self.canBeremoved(nodeItem.node):
-              host.removeRow(j)
+              host.removeNodeRow(j)
             else:
               nodeItem.updateNodeView(host, self.show_rosnames)
         if host.rowCount() == 0:
@@ -704,11 +772,11 @@ class NodeTreeModel(QtGui.QStandardItemModel):
           if (intern(item.id) == intern(ROBOT_ID)):
             host.updateDescription(item.type, item.name, item.description)
           else:
-            for j in range(host.rowCount()):
+            j = host.nodeRow(item.ros_name)
+            if j >= 0:
               nodeItem = host.child(j)
-              if nodeItem.node.name == item.ros_name:
-                nodeItem.node.setDescription(item.type, item.name, item.description)
-                nodeItem.updateNodeView(host, self.show_rosnames)
+              nodeItem.node.setDescription(item.type, item.name, item.description)
+              nodeItem.updateNodeView(host, self.show_rosnames)
         return host.updateTooltip()
     return ''
 
@@ -727,11 +795,11 @@ class NodeTreeModel(QtGui.QStandardItemModel):
       if root.child(i) == onhost:
         host = root.child(i)
         for node, d in nodes.items():
-          for j in range(host.rowCount()):
+          j = host.nodeRow(node)
+          if j >= 0:
             nodeItem = host.child(j)
-            if nodeItem.node.name == node:
-              nodeItem.node.setDescription(d['sensor_type'], d['sensor_name'], d['sensor_descr'])
-              nodeItem.updateNodeView(host, self.show_rosnames)
+            nodeItem.node.setDescription(d['sensor_type'], d['sensor_name'], d['sensor_descr'])
+            nodeItem.updateNodeView(host, self.show_rosnames)
         return host.updateTooltip()
     return ''
 
@@ -31,20 +31,20 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from PySide import QtCore
-from PySide import QtGui
 
 import roslib
 
-class ParameterItem(QtGui.QStandardItem):
+from sorted_table_model import SortedTableModel
+
+class ParameterItem(object):
   '''
   The parameter item is stored in the parameter model. This class stores the name 
-  and value of a parameter of ROS parameter server. The name of the parameter is 
+  and value of a parameter of ROS parameter server. The representation of the 
+  parameter is created on request of the view, the name of the parameter is 
   represented in HTML.
   '''
 
-  ITEM_TYPE = QtGui.QStandardItem.UserType + 38
-
-  def __init__(self, key, value, parent=None):
+  def __init__(self, key, value):
     '''
     Initialize the item object.
     @param key: the name of the parameter
@@ -52,26 +52,41 @@ class ParameterItem(QtGui.QStandardItem):
     @param value: the value of the parameter
     @type value: C{str}
     '''
-    QtGui.QStandardItem.__init__(self, self.toHTML(key))
+    self.name = key
+    self.sort_key = SortedTableModel.sortKey(key)
     self.key = key
     '''@ivar: the name of parameter '''
     self.value = value
     '''@ivar: the value of the parameter '''
+    self.__html = None
 
-  def updateParameterView(self, parent):
+  def update(self, value):
     '''
-    Updates the view of the parameter on changes.
-    @param parent: the item containing this item
-    @type parent: L{PySide.QtGui.QStandardItem}
+    Replaces the value of the parameter.
+    @param value: the value of the parameter
+    @return: C{True}, if the value is changed
+    @rtype: C{bool}
     '''
-    if not parent is None:
-      # update type view
-      child = parent.child(self.row(), 1)
-      if not child is None:
-        self.updateValueView(self.value, child)
+    changed = (self.value != value)
+    self.value = value
+    return changed
 
-  def type(self):
-    return TopicItem.ITEM_TYPE
+  def data(self, column, role):
+    '''
+    Creates the displayed data of the given column.
+    @param column: the column (Parameter, Value)
+    @type column: C{int}
+    @param role: the requested role, only C{DisplayRole} is supported
+    @type role: L{PySide.QtCore.Qt.ItemDataRole}
+    '''
+    if role == QtCore.Qt.DisplayRole:
+      if column == 0:
+        if self.__html is None:
+          self.__html = self.toHTML(self.key)
+        return self.__html
+      elif column == 1:
+        return str(self.value)
+    return None
 
   @classmethod
   def toHTML(cls, key):
@@ -90,59 +105,8 @@ class ParameterItem(QtGui.QStandardItem):
       result = name
     return result
 
-  @classmethod
-  def getItemList(self, key, value):
-    '''
-    Creates the list of the items. This list is used for the 
-    visualization of the parameter as a table row.
-    @param key: the parameter name
-    @type key: C{str}
-    @param value: the value of the parameter
-    @type value: each value, that can be converted to C{str} using L{str()}
-    @return: the list for the representation as a row
-    @rtype: C{[L{ParameterItem}, ...]}
-    '''
-    items = []
-    item = ParameterItem(key, value)
-    items.append(item)
-    typeItem = QtGui.QStandardItem(key)
-    ParameterItem.updateValueView(value, typeItem)
-    items.append(typeItem)
-    return items
 
-  @classmethod
-  def updateValueView(cls, value, item):
-    '''
-    Updates the representation of the column contains the value of the parameter.
-    @param value: the value of the parameter
-    @type value: each value, that can be converted to C{str} using L{str()}
-    @param item: corresponding item in the model
-    @type item ServiceItem
-    '''
-    item.setText(str(value))
-
-  def __eq__(self, item):
-    '''
-    Compares the name of parameter.
-    '''
-    if isinstance(item, str) or isinstance(item, unicode):
-      return self.key.lower() == item.lower()
-    elif not (item is None):
-      return self.key.lower() == item.key.lower()
-    return False
-
-  def __gt__(self, item):
-    '''
-    Compares the name of parameter.
-    '''
-    if isinstance(item, str) or isinstance(item, unicode):
-      return self.key.lower() > item.lower()
-    elif not (item is None):
-      return self.key.lower() > item.key.lower()
-    return False
-
-
-class ParameterModel(QtGui.QStandardItemModel):
+class ParameterModel(SortedTableModel):
   '''
   The model to manage the list with parameter in ROS network.
   '''
@@ -154,21 +118,7 @@ class ParameterModel(QtGui.QStandardItemModel):
     '''
     Creates a new list model.
     '''
-    QtGui.QStandardItemModel.__init__(self)
-    self.setColumnCount(len(ParameterModel.header))
-    self.setHorizontalHeaderLabels([label for label, width in ParameterModel.header])
-
-  def flags(self, index):
-    '''
-    @param index: parent of the list
-    @type index: L{PySide.QtCore.QModelIndex}
-    @return: Flag or the requestet item
-    @rtype: L{PySide.QtCore.Qt.ItemFlag}
-    @see: U{http://www.pyside.org/docs/pyside-1.0.1/PySide/QtCore/Qt.html}
-    '''
-    if not index.isValid():
-      return QtCore.Qt.NoItemFlags
-    return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+    SortedTableModel.__init__(self, ParameterItem)
 
   def updateModelData(self, parameters):
     '''
@@ -177,27 +127,4 @@ class ParameterModel(QtGui.QStandardItemModel):
     @param parameters: The dictionary with parameter 
     @type parameters: C{dict(parameter name : value)}
     '''
-    parameter_names = parameters.keys()
-    root = self.invisibleRootItem()
-    # remove not available items
-    for i in reversed(range(root.rowCount())):
-      parameterItem = root.child(i)
-      if not parameterItem.key in parameter_names:
-        root.removeRow(i)
-    # add new items
-    for (name, value) in parameters.items():
-      doAddItem = True
-      for i in range(root.rowCount()):
-        parameterItem = root.child(i)
-        if (parameterItem == name):
-          # update item
-          parameterItem.value = value
-          parameterItem.updateParameterView(root)
-          doAddItem = False
-          break
-        elif (parameterItem > name):
-          root.insertRow(i, ParameterItem.getItemList(name, value))
-          doAddItem = False
-          break
-      if doAddItem:
-        root.appendRow(ParameterItem.getItemList(name, value))
+    self.updateItems(parameters)
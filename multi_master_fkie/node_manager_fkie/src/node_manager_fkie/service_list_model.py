@@ -31,42 +31,73 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from PySide import QtCore
-from PySide import QtGui
 
 import roslib
 
-class ServiceItem(QtGui.QStandardItem):
+from sorted_table_model import SortedTableModel
+from type_cache import serviceTypes, serviceTypeKey
+
+class ServiceItem(object):
   '''
   The service item stored in the service model. This class stores the service as
-  L{master_discovery_fkie.ServiceInfo}. The name of the service is represented in HTML.
+  L{master_discovery_fkie.ServiceInfo}. The representation of the service is 
+  created on request of the view, the name of the service is represented in HTML.
   '''
 
-  ITEM_TYPE = QtGui.QStandardItem.UserType + 37
-
-  def __init__(self, service, parent=None):
+  def __init__(self, service):
     '''
     Initialize the service item.
     @param service: the service object to view
     @type service: L{master_discovery_fkie.ServiceInfo}
     '''
-    QtGui.QStandardItem.__init__(self, self.toHTML(service.name))
+    self.name = service.name
+    self.sort_key = SortedTableModel.sortKey(service.name)
     self.service = service
     '''@ivar: service info as L{master_discovery_fkie.ServiceInfo}.'''
+    self.__html = None
 
-  def updateServiceView(self, parent):
+  def update(self, service):
     '''
-    Updates the view of the service on changes.
-    @param parent: the item containing this item
-    @type parent: L{PySide.QtGui.QStandardItem}
+    Replaces the service info.
+    @param service: the service data
+    @type service: L{master_discovery_fkie.ServiceInfo}
+    @return: C{True}, if the displayed data is changed
+    @rtype: C{bool}
     '''
-    if not parent is None:
-      # update type view
-      child = parent.child(self.row(), 1)
-      if not child is None:
-        self.updateTypeView(self.service, child)
-
-  def type(self):
-    return TopicItem.ITEM_TYPE
+    changed = (self.service.fingerprint != service.fingerprint)
+    self.service = service
+    return changed
+
+  def data(self, column, role):
+    '''
+    Creates the displayed data of the given column.
+    @param column: the column (Name, Type)
+    @type column: C{int}
+    @param role: the requested role, only C{DisplayRole} and C{ToolTipRole} are supported
+    @type role: L{PySide.QtCore.Qt.ItemDataRole}
+    '''
+    if role == QtCore.Qt.DisplayRole:
+      if column == 0:
+        if self.__html is None:
+          self.__html = self.toHTML(self.name)
+        return self.__html
+      elif column == 1:
+        return self.typeText(self.service)
+    elif role == QtCore.Qt.ToolTipRole:
+      if column == 0:
+        return ''.join(['<html><body><h4>', self.name, '</h4><dl><dt>', str(self.service.uri),'</dt></dl></body></html>'])
+      elif column == 1:
+        return self.typeToolTip(self.service)
+    return None
+
+  def prefetch(self):
+    '''
+    Resolves the service class for the type and the tooltip in background. It 
+    is called by the view for the visible rows only.
+    '''
+    key = serviceTypeKey(self.service)
+    if serviceTypes().peek(key) is None:
+      serviceTypes().prefetch(key, self.service)
 
   @classmethod
   def toHTML(cls, service_name):
@@ -86,80 +117,43 @@ class ServiceItem(QtGui.QStandardItem):
     return result
 
   @classmethod
-  def getItemList(self, service):
+  def typeText(cls, service):
     '''
-    Creates the list of the items from service. This list is used for the 
-    visualization of service data as a table row.
+    Creates the representation of the column contains the type of the service. 
+    The type of the services without a known type is shown after the service 
+    class was resolved by L{prefetch()}.
     @param service: the service data
     @type service: L{master_discovery_fkie.ServiceInfo}
-    @return: the list for the representation as a row
-    @rtype: C{[L{ServiceItem} or L{PySide.QtGui.QStandardItem}, ...]}
-    '''
-    items = []
-    item = ServiceItem(service)
-    item.setToolTip(''.join(['<html><body><h4>', service.name, '</h4><dl><dt>', service.uri,'</dt></dl></body></html>']))
-    items.append(item)
-    typeItem = QtGui.QStandardItem()
-    ServiceItem.updateTypeView(service, typeItem)
-    items.append(typeItem)
-    return items
+    @return: the HTML representation of the service type
+    @rtype: C{str}
+    '''
+    entry = serviceTypes().peek(serviceTypeKey(service))
+    if service.type:
+      return cls.toHTML(service.type)
+    elif not entry is None and not entry[0] is None:
+      return cls.toHTML(entry[0]._type)
+    return ''
 
   @classmethod
-  def updateTypeView(cls, service, item):
+  def typeToolTip(cls, service):
     '''
-    Updates the representation of the column contains the type of the service.
+    Creates the tooltip of the column contains the type of the service. Only
+    the resolved service classes are cached, the tooltip for a not available
+    class depends on the service.
     @param service: the service data
     @type service: L{master_discovery_fkie.ServiceInfo}
-    @param item: corresponding item in the model
-    @type item: L{ServiceItem}
+    @return: the tooltip with the request and response of the service
+    @rtype: C{str}
     '''
-    try:
-      service_class = service.get_service_class(service.isLocal)
-      item.setText(cls.toHTML(service_class._type))
+    (service_class, tooltip) = serviceTypes().get(serviceTypeKey(service), service)
+    if service_class is None and not service.isLocal:
       tooltip = ''.join(['<html><body>'])
-      tooltip = ''.join([tooltip, '<h4>', service_class._type, '</h4>'])
-      tooltip = ''.join([tooltip, '<h4>', 'Request', ':</h4><dl>'])
-      tooltip = ''.join([tooltip, '<dt>', str(service_class._request_class.__slots__), '</dt>'])
-      tooltip = ''.join([tooltip, '</dl>'])
-
-      tooltip = ''.join([tooltip, '<h4>', 'Response', ':</h4><dl>'])
-      tooltip = ''.join([tooltip, '<dt>', str(service_class._response_class.__slots__), '</dt>'])
-      tooltip = ''.join([tooltip, '</dl>'])
-
+      tooltip = ''.join([tooltip, '<h4>', 'Service type is not available due to he running on another host.', '</h4>'])
       tooltip = ''.join([tooltip, '</body></html>'])
-      item.setToolTip(tooltip)
-    except:
-#      import traceback
-#      print traceback.format_exc()
-      if not service.isLocal:
-        tooltip = ''.join(['<html><body>'])
-        tooltip = ''.join([tooltip, '<h4>', 'Service type is not available due to he running on another host.', '</h4>'])
-        tooltip = ''.join([tooltip, '</body></html>'])
-        item.setToolTip(tooltip)
-
-
-  def __eq__(self, item):
-    '''
-    Compares the name of service.
-    '''
-    if isinstance(item, str) or isinstance(item, unicode):
-      return self.service.name.lower() == item.lower()
-    elif not (item is None):
-      return self.service.name.lower() == item.service.name.lower()
-    return False
-
-  def __gt__(self, item):
-    '''
-    Compares the name of service.
-    '''
-    if isinstance(item, str) or isinstance(item, unicode):
-      return self.service.name.lower() > item.lower()
-    elif not (item is None):
-      return self.service.name.lower() > item.service.name.lower()
-    return False
+    return tooltip
 
 
-class ServiceModel(QtGui.QStandardItemModel):
+class ServiceModel(SortedTableModel):
   '''
   The model to manage the list with services in ROS network.
   '''
@@ -171,21 +165,14 @@ class ServiceModel(QtGui.QStandardItemModel):
     '''
     Creates a new list model.
     '''
-    QtGui.QStandardItemModel.__init__(self)
-    self.setColumnCount(len(ServiceModel.header))
-    self.setHorizontalHeaderLabels([label for label, width in ServiceModel.header])
+    SortedTableModel.__init__(self, lambda name, service: ServiceItem(service))
+    serviceTypes().resolved_signal.connect(self._on_type_resolved)
 
-  def flags(self, index):
-    '''
-    @param index: parent of the list
-    @type index: L{PySide.QtCore.QModelIndex}
-    @return: Flag or the requestet item
-    @rtype: L{PySide.QtCore.Qt.ItemFlag}
-    @see: U{http://www.pyside.org/docs/pyside-1.0.1/PySide/QtCore/Qt.html}
-    '''
-    if not index.isValid():
-      return QtCore.Qt.NoItemFlags
-    return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+  def _on_type_resolved(self, key):
+    # only the services without a known type show the resolved type, these are
+    # identified by 'name@uri'
+    if self._items and '@' in key:
+      self.dataChanged.emit(self.index(0, 1), self.index(len(self._items) - 1, 1))
 
   def updateModelData(self, services):
     '''
@@ -194,26 +181,4 @@ class ServiceModel(QtGui.QStandardItemModel):
     @param services: The dictionary with services 
     @type services: C{dict(service name : L{master_discovery_fkie.ServiceInfo})}
     '''
-    service_names = services.keys()
-    root = self.invisibleRootItem()
-    for i in reversed(range(root.rowCount())):
-      serviceItem = root.child(i)
-      if not serviceItem.service.name in service_names:
-        root.removeRow(i)
-    for (name, service) in services.items():
-      if not service is None:
-        doAddItem = True
-        for i in range(root.rowCount()):
-          serviceItem = root.child(i)
-          if (serviceItem == service.name):
-            # update item
-            serviceItem.service = service
-            serviceItem.updateServiceView(root)
-            doAddItem = False
-            break
-          elif (serviceItem > service.name):
-            root.insertRow(i, ServiceItem.getItemList(service))
-            doAddItem = False
-            break
-        if doAddItem:
-          root.appendRow(ServiceItem.getItemList(service))
+    self.updateItems(dict((name, service) for (name, service) in services.iteritems() if not service is None))
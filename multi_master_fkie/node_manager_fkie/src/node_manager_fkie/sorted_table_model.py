@@ -0,0 +1,250 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from PySide import QtCore
+
+
+class SortedTableModel(QtCore.QAbstractTableModel):
+  '''
+  The base of the table models, which store their rows as a list of 
+  lightweight items sorted by the lower case name. The items are created by 
+  the item factory given to the constructor and must provide:
+
+    - C{name} and C{sort_key}, the key to sort the items
+    - C{update(value)}, returns C{True} if the displayed data is changed
+    - C{data(column, role)}, creates the displayed data on request
+
+  The updates are applied by merging the sorted names, so that only the 
+  inserted, removed and changed rows are reported to the views.
+  '''
+  header = []
+  '''@ivar: the list with columns C{[(name, width), ...]}'''
+  MAX_INSERT_RANGES = 100
+  '''@ivar: the count of separate inserted ranges, above which the model is reset instead'''
+
+  def __init__(self, item_factory, parent=None):
+    '''
+    Creates a new empty model.
+    @param item_factory: creates the item of a new row from the name and the value
+    @type item_factory: C{<method>(name, value) -> item}
+    '''
+    QtCore.QAbstractTableModel.__init__(self, parent)
+    self._item_factory = item_factory
+    self._items = []
+
+  def rowCount(self, parent=QtCore.QModelIndex()):
+    if parent.isValid():
+      return 0
+    return len(self._items)
+
+  def columnCount(self, parent=QtCore.QModelIndex()):
+    if parent.isValid():
+      return 0
+    return len(self.header)
+
+  def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+    if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole and 0 <= section < len(self.header):
+      return self.header[section][0]
+    return None
+
+  def flags(self, index):
+    '''
+    @param index: parent of the list
+    @type index: L{PySide.QtCore.QModelIndex}
+    @return: Flag or the requested item
+    @rtype: L{PySide.QtCore.Qt.ItemFlag}
+    @see: U{http://www.pyside.org/docs/pyside-1.0.1/PySide/QtCore/Qt.html}
+    '''
+    if not index.isValid():
+      return QtCore.Qt.NoItemFlags
+    return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+  def data(self, index, role=QtCore.Qt.DisplayRole):
+    item = self.itemFromIndex(index)
+    if item is None:
+      return None
+    return item.data(index.column(), role)
+
+  def itemFromIndex(self, index):
+    '''
+    @param index: the index of the model
+    @type index: L{PySide.QtCore.QModelIndex}
+    @return: the item of the row or C{None}
+    '''
+    if index.isValid() and 0 <= index.row() < len(self._items):
+      return self._items[index.row()]
+    return None
+
+  def updateItems(self, values):
+    '''
+    Updates the model. The not available items are removed, the existing are 
+    updated and the new items are inserted in sorting order.
+    @param values: the dictionary with the data of all rows
+    @type values: C{dict(name : value)}
+    '''
+    root = QtCore.QModelIndex()
+    # remove the not available items by ranges
+    row = len(self._items) - 1
+    while row >= 0:
+      if self._items[row].name in values:
+        row -= 1
+        continue
+      last = row
+      while row >= 0 and not self._items[row].name in values:
+        row -= 1
+      self.beginRemoveRows(root, row + 1, last)
+      del self._items[row + 1:last + 1]
+      self.endRemoveRows()
+    # update the existing items and report the changed ranges
+    existing = set()
+    first = None
+    for row, item in enumerate(self._items):
+      existing.add(item.name)
+      if item.update(values[item.name]):
+        if first is None:
+          first = row
+      elif not first is None:
+        self.dataChanged.emit(self.index(first, 0), self.index(row - 1, self.columnCount() - 1))
+        first = None
+    if not first is None:
+      self.dataChanged.emit(self.index(first, 0), self.index(len(self._items) - 1, self.columnCount() - 1))
+    # merge the new items into the sorted list
+    self._insertItems([self._item_factory(name, value) for (name, value) in values.iteritems() if not name in existing])
+
+  def applyChanges(self, removed, updated, added):
+    '''
+    Applies the changes computed outside of the GUI thread. In contrast to 
+    L{updateItems()} only the affected rows are searched.
+    @param removed: the names of the removed items
+    @type removed: C{[str, ...]}
+    @param updated: the new data of the changed items
+    @type updated: C{dict(name : value)}
+    @param added: the data of the new items
+    @type added: C{dict(name : value)}
+    '''
+    root = QtCore.QModelIndex()
+    rows = sorted([row for row in (self.findRow(name) for name in removed) if row >= 0])
+    for (first, last) in reversed(self._ranges(rows)):
+      self.beginRemoveRows(root, first, last)
+      del self._items[first:last + 1]
+      self.endRemoveRows()
+    changed = []
+    new_items = []
+    for values in [updated, added]:
+      for (name, value) in values.iteritems():
+        row = self.findRow(name)
+        if row < 0:
+          new_items.append(self._item_factory(name, value))
+        elif self._items[row].update(value):
+          changed.append(row)
+    changed.sort()
+    for (first, last) in self._ranges(changed):
+      self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+    self._insertItems(new_items)
+
+  def findRow(self, name):
+    '''
+    Searches for the row of the item with given name.
+    @param name: the name of the item
+    @type name: C{str}
+    @return: the row of the item or C{-1}
+    @rtype: C{int}
+    '''
+    row = self._lowerRow(self.sortKey(name))
+    if row < len(self._items) and self._items[row].name == name:
+      return row
+    return -1
+
+  @classmethod
+  def sortKey(cls, name):
+    '''
+    @return: the key to sort the items by the lower case name, used by the items as C{sort_key}
+    @rtype: C{(str, str)}
+    '''
+    return (name.lower(), name)
+
+  def _lowerRow(self, sort_key):
+    # the first row with an item not less than given key (bisect_left)
+    lo, hi = 0, len(self._items)
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self._items[mid].sort_key < sort_key:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo
+
+  @classmethod
+  def _ranges(cls, rows):
+    # groups the sorted rows into the ranges of consecutive rows [(first, last)]
+    result = []
+    for row in rows:
+      if result and result[-1][1] == row - 1:
+        result[-1] = (result[-1][0], row)
+      else:
+        result.append((row, row))
+    return result
+
+  def _insertItems(self, new_items):
+    '''
+    Inserts the new items in sorting order. The rows are inserted by ranges or,
+    above L{MAX_INSERT_RANGES}, by reset of the model.
+    '''
+    if not new_items:
+      return
+    root = QtCore.QModelIndex()
+    new_items.sort(key=lambda item: item.sort_key)
+    ranges = [] # (row, [items])
+    for item in new_items:
+      row = self._lowerRow(item.sort_key)
+      if ranges and ranges[-1][0] == row:
+        ranges[-1][1].append(item)
+      else:
+        ranges.append((row, [item]))
+    if len(ranges) > self.MAX_INSERT_RANGES:
+      items = []
+      last = 0
+      for (row, inserted) in ranges:
+        items.extend(self._items[last:row])
+        items.extend(inserted)
+        last = row
+      items.extend(self._items[last:])
+      self.beginResetModel()
+      self._items = items
+      self.endResetModel()
+    else:
+      offset = 0
+      for (row, inserted) in ranges:
+        self.beginInsertRows(root, row + offset, row + offset + len(inserted) - 1)
+        self._items[row + offset:row + offset] = inserted
+        self.endInsertRows()
+        offset += len(inserted)
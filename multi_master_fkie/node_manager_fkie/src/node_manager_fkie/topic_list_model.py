@@ -31,122 +31,94 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from PySide import QtCore
-from PySide import QtGui
 
-import roslib
-import roslib.message
-import roslib.msgs
+from sorted_table_model import SortedTableModel
+from type_cache import messageTypes
 
-class TopicItem(QtGui.QStandardItem):
+class TopicItem(object):
   '''
   The topic item stored in the topic model. This class stores the topic as
-  L{master_discovery_fkie.TopicInfo}. The name of the topic represented in HTML.
+  L{master_discovery_fkie.TopicInfo}. The representation of the topic is 
+  created on request of the view, the name of the topic is represented in HTML.
   '''
-  
-  ITEM_TYPE = QtGui.QStandardItem.UserType + 36
 
-  def __init__(self, topic, parent=None):
+  def __init__(self, topic):
     '''
     Initialize the topic item.
     @param topic: the topic object to view
     @type topic: L{master_discovery_fkie.TopicInfo}
     '''
-    QtGui.QStandardItem.__init__(self, self.toHTML(topic.name))
+    self.name = topic.name
+    self.sort_key = SortedTableModel.sortKey(topic.name)
     self.topic = topic
-    '''@ivar: service info as L{master_discovery_fkie.ServiceInfo}.'''
+    '''@ivar: topic info as L{master_discovery_fkie.TopicInfo}.'''
+    self.__html = None
 
-  def updateTopicView(self, parent):
-    '''
-    This method is called after the self.topic is changed to update the 
-    representation of the topic. The name will not be changed, but all other 
-    data.
-    @param parent: Item which contains this topic item. This is needed to update 
-    other columns of this topic.
-    @type parent: L{PySide.QtGui.QStandardItem}
-    '''
-    if not parent is None:
-      #update the topic publishers
-      child = parent.child(self.row(), 1)
-      if not child is None:
-        self.updatePublisherView(self.topic, child)
-      #update the topic subscriber
-      child = parent.child(self.row(), 2)
-      if not child is None:
-        self.updateSubscriberView(self.topic, child)
-      #update the topic type
-      child = parent.child(self.row(), 3)
-      if not child is None:
-        self.updateTypeView(self.topic, child)
-
-  @classmethod
-  def updatePublisherView(cls, topic, item):
+  def update(self, topic):
     '''
-    Updates the representation of the column contains the publisher state.
+    Replaces the topic info.
     @param topic: the topic data
     @type topic: L{master_discovery_fkie.TopicInfo}
-    @param item: corresponding item in the model
-    @type item: L{TopicItem}
+    @return: C{True}, if the displayed data is changed
+    @rtype: C{bool}
     '''
-    item.setText(str(len(topic.publisherNodes)))
-    tooltip = ''.join(['<html><body><h4>', 'Publisher [', topic.name, ']:</h4><dl>'])
-    for p in topic.publisherNodes:
-      tooltip = ''.join([tooltip, '<dt>', p, '</dt>'])
-    tooltip = ''.join([tooltip, '</dl></body></html>'])
-    if len(topic.publisherNodes) > 0:
-      item.setToolTip(tooltip)
+    changed = (self.topic.fingerprint != topic.fingerprint)
+    self.topic = topic
+    return changed
+
+  def data(self, column, role):
+    '''
+    Creates the displayed data of the given column.
+    @param column: the column (Name, Publisher, Subscriber, Type)
+    @type column: C{int}
+    @param role: the requested role, only C{DisplayRole} and C{ToolTipRole} are supported
+    @type role: L{PySide.QtCore.Qt.ItemDataRole}
+    '''
+    if role == QtCore.Qt.DisplayRole:
+      if column == 0:
+        if self.__html is None:
+          self.__html = self.toHTML(self.name)
+        return self.__html
+      elif column == 1:
+        return str(len(self.topic.publisherNodes))
+      elif column == 2:
+        return str(len(self.topic.subscriberNodes))
+      elif column == 3:
+        return str(self.topic.type)
+    elif role == QtCore.Qt.ToolTipRole:
+      if column == 1 and len(self.topic.publisherNodes) > 0:
+        return self.nodesTooltip('Publisher', self.name, self.topic.publisherNodes)
+      elif column == 2 and len(self.topic.subscriberNodes) > 0:
+        return self.nodesTooltip('Subscriber', self.name, self.topic.subscriberNodes)
+      elif column == 3 and not self.topic.type is None:
+        return messageTypes().get(self.topic.type, self.topic.type)[1]
+    return None
+
+  def prefetch(self):
+    '''
+    Resolves the message type for the tooltip in background. It is called by 
+    the view for the visible rows only.
+    '''
+    if not self.topic.type is None:
+      messageTypes().prefetch(self.topic.type, self.topic.type)
 
   @classmethod
-  def updateSubscriberView(cls, topic, item):
+  def nodesTooltip(cls, title, topic_name, nodes):
     '''
-    Updates the representation of the column contains the subscriber state.
-    @param topic: the topic data
-    @type topic: L{master_discovery_fkie.TopicInfo}
-    @param item: corresponding item in the model
-    @type item: L{TopicItem}
+    Creates the tooltip of the column contains the publisher or subscriber.
+    @param title: the title of the tooltip
+    @type title: C{str}
+    @param topic_name: the name of the topic
+    @type topic_name: C{str}
+    @param nodes: the list with node names
+    @type nodes: C{[str, ...]}
+    @rtype: C{str}
     '''
-    item.setText(str(len(topic.subscriberNodes)))
-    tooltip = ''.join(['<html><body><h4>', 'Subscriber [', topic.name, ']:</h4><dl>'])
-    for p in topic.subscriberNodes:
+    tooltip = ''.join(['<html><body><h4>', title, ' [', topic_name, ']:</h4><dl>'])
+    for p in nodes:
       tooltip = ''.join([tooltip, '<dt>', p, '</dt>'])
-    tooltip = ''.join([tooltip, '</dl></body></html>'])
-    if len(topic.subscriberNodes) > 0:
-      item.setToolTip(tooltip)
+    return ''.join([tooltip, '</dl></body></html>'])
 
-  @classmethod
-  def updateTypeView(cls, topic, item):
-    '''
-    Updates the representation of the column contains the type of the topic.
-    @param topic: the topic data
-    @type topic: L{master_discovery_fkie.TopicInfo}
-    @param item: corresponding item in the model
-    @type item: L{TopicItem}
-    '''
-    item.setText(str(topic.type))
-    if not topic.type is None:
-      tooltip = ''
-      try:
-        mclass = roslib.message.get_message_class(topic.type)
-        tooltip = str(mclass)
-        if not mclass is None:
-          tooltip = str(mclass.__slots__)
-          for f in mclass.__slots__:
-            idx = mclass.__slots__.index(f)
-            idtype = mclass._slot_types[idx]
-            base_type = roslib.msgs.base_msg_type(idtype)
-            primitive = "unknown"
-            if base_type in roslib.msgs.PRIMITIVE_TYPES:
-              primitive = "primitive"
-            else:
-              try:
-                list_msg_class =roslib.message.get_message_class(base_type)
-                primitive = "class", list_msg_class.__slots__
-              except ValueError:
-                pass
-            tooltip = ''.join([tooltip, '\n\t', str(f), ': ', str(idtype), ' (', str(primitive),')'])
-      except ValueError:
-        pass
-      item.setToolTip(tooltip)
-  
   @classmethod
   def toHTML(cls, topic_name):
     '''
@@ -164,57 +136,8 @@ class TopicItem(QtGui.QStandardItem):
       result = name
     return result
 
-  def type(self):
-    return TopicItem.ITEM_TYPE
-
-  @classmethod
-  def getItemList(self, topic):
-    '''
-    Creates the list of the items from topic. This list is used for the 
-    visualization of topic data as a table row.
-    @param topic: the topic data
-    @type topic: L{master_discovery_fkie.TopicInfo}
-    @return: the list for the representation as a row
-    @rtype: C{[L{TopicItem} or L{PySide.QtGui.QStandardItem}, ...]}
-    '''
-    items = []
-    item = TopicItem(topic)
-    items.append(item)
-    pubItem = QtGui.QStandardItem()
-    TopicItem.updatePublisherView(topic, pubItem)
-    items.append(pubItem)
-    subItem = QtGui.QStandardItem()
-    TopicItem.updateSubscriberView(topic, subItem)
-    items.append(subItem)
-    typeItem = QtGui.QStandardItem()
-    TopicItem.updateTypeView(topic, typeItem)
-    items.append(typeItem)
-    return items
-
-
-
-  def __eq__(self, item):
-    '''
-    Compares the name of topic.
-    '''
-    if isinstance(item, str) or isinstance(item, unicode):
-      return self.topic.name.lower() == item.lower()
-    elif not (item is None):
-      return self.topic.name.lower() == item.topic.name.lower()
-    return False
-
-  def __gt__(self, item):
-    '''
-    Compares the name of topic.
-    '''
-    if isinstance(item, str) or isinstance(item, unicode):
-      return self.topic.name.lower() > item.lower()
-    elif not (item is None):
-      return self.topic.name.lower() > item.topic.name.lower()
-    return False
-
 
-class TopicModel(QtGui.QStandardItemModel):
+class TopicModel(SortedTableModel):
   '''
   The model to manage the list with topics in ROS network.
   '''
@@ -228,21 +151,7 @@ class TopicModel(QtGui.QStandardItemModel):
     '''
     Creates a new list model.
     '''
-    QtGui.QStandardItemModel.__init__(self)
-    self.setColumnCount(len(TopicModel.header))
-    self.setHorizontalHeaderLabels([label for label, width in TopicModel.header])
-
-  def flags(self, index):
-    '''
-    @param index: parent of the list
-    @type index: L{PySide.QtCore.QModelIndex}
-    @return: Flag or the requested item
-    @rtype: L{PySide.QtCore.Qt.ItemFlag}
-    @see: U{http://www.pyside.org/docs/pyside-1.0.1/PySide/QtCore/Qt.html}
-    '''
-    if not index.isValid():
-      return QtCore.Qt.NoItemFlags
-    return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+    SortedTableModel.__init__(self, lambda name, topic: TopicItem(topic))
 
   def updateModelData(self, topics):
     '''
@@ -251,26 +160,4 @@ class TopicModel(QtGui.QStandardItemModel):
     @param topics: The dictionary with topics 
     @type topics: C{dict(topic name : L{master_discovery_fkie.TopicInfo}, ...)}
     '''
-    topic_names = topics.keys()
-    root = self.invisibleRootItem()
-    for i in reversed(range(root.rowCount())):
-      topicItem = root.child(i)
-      if not topicItem.topic.name in topic_names:
-        root.removeRow(i)
-    for (name, topic) in topics.items():
-      doAddItem = True
-      for i in range(root.rowCount()):
-        topicItem = root.child(i)
-        if (topicItem == topic.name):
-          # update item
-          topicItem.topic = topic
-          topicItem.updateTopicView(root)
-          doAddItem = False
-          break
-        elif (topicItem > topic.name):
-          root.insertRow(i, TopicItem.getItemList(topic))
-          doAddItem = False
-          break
-      if doAddItem:
-        root.appendRow(TopicItem.getItemList(topic))
-
+    self.updateItems(topics)
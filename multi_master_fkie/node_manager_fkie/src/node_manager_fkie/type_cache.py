@@ -0,0 +1,294 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+from collections import OrderedDict, deque
+from PySide import QtCore
+
+import roslib
+import roslib.message
+import roslib.msgs
+import rospy
+
+
+class TypeCache(QtCore.QObject):
+  '''
+  A least recently used cache for the resolved message and service types. 
+  Resolving a type loads and possibly generates the class, so the entries are 
+  created on the first request and shared by all views. The types of the 
+  visible rows can be prefetched in a background thread, so that the tooltips 
+  are already available while hovering. Only the successful resolutions are 
+  cached, the failed keys are remembered to avoid repeated lookups.
+  '''
+  resolved_signal = QtCore.Signal(str)
+  '''@ivar: the signal is emitted with the key of a type resolved in background.'''
+  MAX_SIZE = 256
+  '''@ivar: the count of the cached types'''
+
+  def __init__(self, resolver, size=None):
+    '''
+    Creates a new cache.
+    @param resolver: the method to resolve a type, called with the arguments 
+    passed to L{get()} or L{prefetch()}
+    @type resolver: C{method(*args) -> (class, tooltip)}
+    @param size: the maximal count of the cached types
+    @type size: C{int}
+    '''
+    QtCore.QObject.__init__(self)
+    self._resolver = resolver
+    self._size = size if not size is None else self.MAX_SIZE
+    self._entries = OrderedDict()
+    self._failed = OrderedDict()
+    self._queue = deque()
+    self._queued = dict()
+    self._worker = None
+    self._lock = threading.RLock()
+
+  def get(self, key, *args):
+    '''
+    Returns the cached entry of the type or resolves it in the current thread.
+    The types failed before are not resolved again.
+    @param key: the key of the type
+    @type key: C{str}
+    @return: the class and the tooltip of the type, both are C{None} if the 
+    type can not be resolved
+    @rtype: C{(class, str)}
+    '''
+    entry = self.peek(key)
+    if entry is None:
+      if self.failed(key):
+        return (None, None)
+      entry = self._resolve(key, args)
+    return entry
+
+  def peek(self, key):
+    '''
+    @param key: the key of the type
+    @type key: C{str}
+    @return: the cached entry of the type or C{None}, if it is not resolved yet
+    @rtype: C{(class, str)} or C{None}
+    '''
+    self._lock.acquire(True)
+    try:
+      entry = self._entries.pop(key, None)
+      if not entry is None:
+        self._entries[key] = entry
+      return entry
+    finally:
+      self._lock.release()
+
+  def failed(self, key):
+    '''
+    @param key: the key of the type
+    @type key: C{str}
+    @return: C{True}, if the resolution of the type failed
+    @rtype: C{bool}
+    '''
+    self._lock.acquire(True)
+    try:
+      return key in self._failed
+    finally:
+      self._lock.release()
+
+  def prefetch(self, key, *args):
+    '''
+    Queues the type to resolve it in the background thread, if it is not 
+    already cached. The last requested types are resolved first.
+    @param key: the key of the type
+    @type key: C{str}
+    '''
+    self._lock.acquire(True)
+    try:
+      if key in self._entries or key in self._queued or key in self._failed:
+        return
+      if len(self._queue) >= self._size:
+        self._queued.pop(self._queue.popleft(), None)
+      self._queue.append(key)
+      self._queued[key] = args
+      if self._worker is None:
+        self._worker = threading.Thread(target=self._run)
+        self._worker.setDaemon(True)
+        self._worker.start()
+    finally:
+      self._lock.release()
+
+  def clear(self):
+    '''
+    Removes all cached, failed and queued types.
+    '''
+    self._lock.acquire(True)
+    try:
+      self._entries.clear()
+      self._failed.clear()
+      self._queue.clear()
+      self._queued.clear()
+    finally:
+      self._lock.release()
+
+  def _resolve(self, key, args):
+    try:
+      entry = self._resolver(*args)
+    except:
+      import traceback
+      rospy.logwarn("Error while resolve the type %s: %s", str(key), traceback.format_exc().splitlines()[-1])
+      entry = (None, None)
+    self._lock.acquire(True)
+    try:
+      if entry[0] is None:
+        self._failed[key] = True
+        while len(self._failed) > self._size:
+          self._failed.popitem(last=False)
+      else:
+        # the entries are stored by the type name, also if requested by another key
+        key = getattr(entry[0], '_type', None) or key
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        while len(self._entries) > self._size:
+          self._entries.popitem(last=False)
+    finally:
+      self._lock.release()
+    return entry
+
+  def _run(self):
+    while True:
+      self._lock.acquire(True)
+      try:
+        if not self._queue:
+          self._worker = None
+          return
+        key = self._queue.pop()
+        args = self._queued.pop(key)
+      finally:
+        self._lock.release()
+      if self.peek(key) is None and not self._resolve(key, args)[0] is None:
+        self.resolved_signal.emit(key)
+
+
+def messageType(topic_type):
+  '''
+  Resolves the message class and creates the tooltip with the fields of the 
+  message.
+  @param topic_type: the type of the message
+  @type topic_type: C{str}
+  @return: the message class and the tooltip
+  @rtype: C{(class, str)}
+  '''
+  mclass = None
+  tooltip = ''
+  try:
+    mclass = roslib.message.get_message_class(topic_type)
+    tooltip = str(mclass)
+    if not mclass is None:
+      tooltip = str(mclass.__slots__)
+      for f in mclass.__slots__:
+        idx = mclass.__slots__.index(f)
+        idtype = mclass._slot_types[idx]
+        base_type = roslib.msgs.base_msg_type(idtype)
+        primitive = "unknown"
+        if base_type in roslib.msgs.PRIMITIVE_TYPES:
+          primitive = "primitive"
+        else:
+          try:
+            list_msg_class =roslib.message.get_message_class(base_type)
+            primitive = "class", list_msg_class.__slots__
+          except ValueError:
+            pass
+        tooltip = ''.join([tooltip, '\n\t', str(f), ': ', str(idtype), ' (', str(primitive),')'])
+  except ValueError:
+    pass
+  return (mclass, tooltip)
+
+def serviceType(service):
+  '''
+  Resolves the service class and creates the tooltip with the request and 
+  response of the service.
+  @param service: the service data
+  @type service: L{master_discovery_fkie.ServiceInfo}
+  @return: the service class and the tooltip, both are C{None} if the class 
+  is not available
+  @rtype: C{(class, str)}
+  '''
+  try:
+    service_class = service.get_service_class(service.isLocal)
+    tooltip = ''.join(['<html><body>'])
+    tooltip = ''.join([tooltip, '<h4>', service_class._type, '</h4>'])
+    tooltip = ''.join([tooltip, '<h4>', 'Request', ':</h4><dl>'])
+    tooltip = ''.join([tooltip, '<dt>', str(service_class._request_class.__slots__), '</dt>'])
+    tooltip = ''.join([tooltip, '</dl>'])
+
+    tooltip = ''.join([tooltip, '<h4>', 'Response', ':</h4><dl>'])
+    tooltip = ''.join([tooltip, '<dt>', str(service_class._response_class.__slots__), '</dt>'])
+    tooltip = ''.join([tooltip, '</dl>'])
+
+    tooltip = ''.join([tooltip, '</body></html>'])
+    return (service_class, tooltip)
+  except:
+    return (None, None)
+
+def serviceTypeKey(service):
+  '''
+  @return: the key of the service type in the cache. The services without a 
+  known type are identified by the type of the class resolved for this 
+  service, or by their URI until the class is resolved.
+  @rtype: C{str}
+  '''
+  if service.type:
+    return service.type
+  try:
+    # returns the class already resolved for this service without a request
+    return service.get_service_class(False)._type
+  except:
+    return ''.join([service.name, '@', str(service.uri)])
+
+
+_message_types = None
+_service_types = None
+
+def messageTypes():
+  '''
+  @return: the process wide cache of the message types, resolved by L{messageType()}
+  @rtype: L{TypeCache}
+  '''
+  global _message_types
+  if _message_types is None:
+    _message_types = TypeCache(messageType)
+  return _message_types
+
+def serviceTypes():
+  '''
+  @return: the process wide cache of the service types, resolved by L{serviceType()}
+  @rtype: L{TypeCache}
+  '''
+  global _service_types
+  if _service_types is None:
+    _service_types = TypeCache(serviceType)
+  return _service_types
@@ -30,6 +30,7 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import time
 import threading
 from PySide import QtCore
 
@@ -39,29 +40,42 @@ from update_thread import UpdateThread
 class UpdateHandler(QtCore.QObject):
   '''
   A class to retrieve the state about ROS master from remote discovery node and 
-  publish it be sending a QT signal. To retrieve the state a new thread will be
-  created.
+  publish it be sending a QT signal. The states are retrieved by a fixed count
+  of L{UpdateThread}s, which process the requested updates. For each ROS master
+  only one update is running and only one requested update is stored, the
+  updates of the same ROS master are started with a minimal interval. The 
+  requests of the currently displayed ROS master are preferred.
   '''
   master_info_signal = QtCore.Signal(MasterInfo)
   '''
   @ivar: master_info_signal is a signal, which is emitted, if a new 
   L{aster_discovery_fkie.MasterInfo} is retrieved.
   '''
+  MAX_WORKERS = 4
+  '''@ivar: the count of threads retrieving the master states'''
+  MIN_UPDATE_INTERVAL = 1.0
+  '''@ivar: the minimal time in seconds between the starts of two updates of the same ROS master'''
 
   def __init__(self):
     QtCore.QObject.__init__(self)
-    self.__updateThreads = {}
-    self.__requestedUpdates = {}
+    self.__updateThreads = []
+    self.__requestedUpdates = {} # masteruri : (monitoruri, time of the request)
+    self.__runningUpdates = set()
+    self.__lastUpdates = {} # masteruri : start time of the last update
+    self.__priorityMaster = None
+    self.__stopped = False
     self._lock = threading.RLock()
+    self._cond = threading.Condition(self._lock)
 
   def requestMasterInfo(self, masteruri, monitoruri):
     '''
-    This method starts a thread to get the informations about the ROS master by
+    This method stores a request to get the informations about the ROS master by
     the given RCP uri of the master_discovery node. If all informations are
-    retrieved, a C{master_info_signal} of this class will be emitted. If for given
-    masteruri a thread is already running, it will be inserted to the requested
-    updates. For the same masteruri only one requested update can be stored. 
-    On update error the requested update will be ignored.
+    retrieved, a C{master_info_signal} of this class will be emitted. For the 
+    same masteruri only one requested update can be stored, further requests are
+    coalesced. The update is started by one of the L{UpdateThread}s not before
+    L{MIN_UPDATE_INTERVAL} since the last update of this ROS master.
+    A failed update does not block the further updates of this ROS master.
     This method is thread safe. 
     
     @param masteruri: the URI of the remote ROS master
@@ -70,30 +84,95 @@ class UpdateHandler(QtCore.QObject):
     @type monitoruri: C{str}
     '''
     self._lock.acquire(True)
-    if (self.__updateThreads.has_key(masteruri)):
-      self.__requestedUpdates[masteruri] = monitoruri
-    else:
-      upthread = UpdateThread(monitoruri)
-      upthread.update_signal.connect(self._on_master_info)
-      self.__updateThreads[masteruri] = upthread
-      from urlparse import urlparse
-      om = urlparse(masteruri)
-      upthread.start()
-    self._lock.release()
+    try:
+      if self.__requestedUpdates.has_key(masteruri):
+        self.__requestedUpdates[masteruri] = (monitoruri, self.__requestedUpdates[masteruri][1])
+      else:
+        self.__requestedUpdates[masteruri] = (monitoruri, time.time())
+      # start the threads on demand
+      if len(self.__updateThreads) < self.MAX_WORKERS and len(self.__updateThreads) < len(self.__requestedUpdates) + len(self.__runningUpdates):
+        upthread = UpdateThread(self)
+        upthread.update_signal.connect(self._on_master_info)
+        self.__updateThreads.append(upthread)
+        upthread.start()
+      self._cond.notify()
+    finally:
+      self._lock.release()
 
-  def _on_master_info(self, minfo):
-    self.master_info_signal.emit(minfo)
+  def setPriorityMaster(self, masteruri):
+    '''
+    Sets the ROS master, which requested updates are preferred to the updates of
+    other ROS masters, e.g. the currently displayed one.
+    @param masteruri: the URI of the ROS master or C{None}
+    @type masteruri: C{str}
+    '''
     self._lock.acquire(True)
     try:
-      thread = self.__updateThreads.pop(minfo.masteruri)
-      del thread
-      monitoruri = self.__requestedUpdates.pop(minfo.masteruri)
-    except KeyError:
-      pass
-    else:
-      upthread = UpdateThread(monitoruri)
-      upthread.update_signal.connect(self._on_master_info)
-      self.__updateThreads[minfo.masteruri] = upthread
-      upthread.start()
-    self._lock.release()
-      
\ No newline at end of file
+      self.__priorityMaster = masteruri
+    finally:
+      self._lock.release()
+
+  def stop(self):
+    '''
+    Stops the L{UpdateThread}s. The running updates are not interrupted.
+    '''
+    self._lock.acquire(True)
+    try:
+      self.__stopped = True
+      self.__requestedUpdates.clear()
+      self._cond.notifyAll()
+    finally:
+      self._lock.release()
+
+  def nextRequest(self):
+    '''
+    Waits for the next requested update, which can be started. Called by the 
+    L{UpdateThread}s. The requests of the priority ROS master are returned 
+    first, the other in order of their request time.
+    @return: the URI of the ROS master and the URI of the master_discovery 
+    node or C{None}, if the handler is stopped
+    @rtype: C{(str, str)}
+    '''
+    self._lock.acquire(True)
+    try:
+      while not self.__stopped:
+        now = time.time()
+        next_due = None
+        selected = None
+        for masteruri, (monitoruri, ts) in self.__requestedUpdates.iteritems():
+          if masteruri in self.__runningUpdates:
+            continue
+          due = self.__lastUpdates.get(masteruri, 0) + self.MIN_UPDATE_INTERVAL
+          if due > now:
+            next_due = due if next_due is None else min(next_due, due)
+            continue
+          rank = (masteruri != self.__priorityMaster, ts)
+          if selected is None or rank < selected[0]:
+            selected = (rank, masteruri, monitoruri)
+        if not selected is None:
+          (rank, masteruri, monitoruri) = selected
+          del self.__requestedUpdates[masteruri]
+          self.__runningUpdates.add(masteruri)
+          self.__lastUpdates[masteruri] = now
+          return (masteruri, monitoruri)
+        self._cond.wait(None if next_due is None else next_due - now)
+      return None
+    finally:
+      self._lock.release()
+
+  def finishRequest(self, masteruri):
+    '''
+    Marks the update of the given ROS master as finished. Called by the 
+    L{UpdateThread}s after success or error.
+    @param masteruri: the URI of the ROS master
+    @type masteruri: C{str}
+    '''
+    self._lock.acquire(True)
+    try:
+      self.__runningUpdates.discard(masteruri)
+      self._cond.notify()
+    finally:
+      self._lock.release()
+
+  def _on_master_info(self, minfo):
+    self.master_info_signal.emit(minfo)
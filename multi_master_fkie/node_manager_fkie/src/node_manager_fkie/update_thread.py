@@ -39,35 +39,68 @@ from PySide import QtCore
 import rospy
 
 from master_discovery_fkie.master_info import MasterInfo
+import master_discovery_fkie.xmlrpc_pool as xmlrpc_pool
 
 class UpdateThread(QtCore.QObject, threading.Thread):
   '''
   A thread to retrieve the state about ROS master from remote discovery node and 
-  publish it be sending a QT signal.
+  publish it be sending a QT signal. The thread processes the updates 
+  requested by the L{UpdateHandler} until the handler is stopped.
   '''
   update_signal = QtCore.Signal(MasterInfo)
   '''
   @ivar: update_signal is a signal, which is emitted, if a new 
   L{aster_discovery_fkie.MasterInfo} is retrieved.
   '''
+  _packed_unsupported = set()
+  '''@ivar: the URIs of the master_discovery nodes without support of the packed master state'''
 
-  def __init__(self, monitoruri, parent=None):
+  def __init__(self, handler, parent=None):
+    '''
+    @param handler: the handler providing the requested updates
+    @type handler: L{update_handler.UpdateHandler}
+    '''
     QtCore.QObject.__init__(self)
     threading.Thread.__init__(self)
-    self._monitoruri = monitoruri
+    self._handler = handler
     self.setDaemon(True)
 
   def run(self):
     '''
     '''
-    try:
-      remote_monitor = xmlrpclib.ServerProxy(self._monitoruri)
+    while True:
+      request = self._handler.nextRequest()
+      if request is None:
+        return
+      (masteruri, monitoruri) = request
+      try:
+        master_info = self.retrieve(monitoruri)
+        self.update_signal.emit(master_info)
+      except:
+        import traceback
+#        print traceback.print_exc()
+        formatted_lines = traceback.format_exc().splitlines()
+        rospy.logwarn("Connection to %s failed:\n\t%s", str(monitoruri), formatted_lines[-1])
+      finally:
+        self._handler.finishRequest(masteruri)
+
+  @classmethod
+  def retrieve(cls, monitoruri):
+    '''
+    Retrieves the state of the ROS master from the master_discovery node.
+    @param monitoruri: the URI of the monitor RPC interface of the master_discovery node
+    @type monitoruri: C{str}
+    @rtype: L{master_discovery_fkie.MasterInfo}
+    '''
+    remote_monitor = xmlrpc_pool.serverProxy(monitoruri)
+    master_info = None
+    if not monitoruri in cls._packed_unsupported:
+      try:
+        master_info = MasterInfo.from_packed(remote_monitor.masterInfoPacked().data)
+      except xmlrpclib.Fault:
+        cls._packed_unsupported.add(monitoruri)
+    if master_info is None:
       remote_info = remote_monitor.masterInfo()
       master_info = MasterInfo.from_list(remote_info)
-      master_info.check_ts = time.time()
-      self.update_signal.emit(master_info)
-    except:
-      import traceback
-#      print traceback.print_exc()
-      formatted_lines = traceback.format_exc().splitlines()
-      rospy.logwarn("Connection to %s failed:\n\t%s", str(self._monitoruri), formatted_lines[-1])
\ No newline at end of file
+    master_info.check_ts = time.time()
+    return master_info
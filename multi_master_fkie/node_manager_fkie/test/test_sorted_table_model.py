@@ -0,0 +1,133 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2012, Fraunhofer FKIE/US, Alexander Tiderko
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of I Heart Engineering nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+PKG = 'node_manager_fkie'
+import roslib; roslib.load_manifest(PKG)
+
+import unittest
+
+from PySide import QtCore
+
+from node_manager_fkie.sorted_table_model import SortedTableModel
+
+
+class Item(object):
+  '''
+  The item with a value displayed in the second column.
+  '''
+
+  def __init__(self, name, value):
+    self.name = name
+    self.sort_key = SortedTableModel.sortKey(name)
+    self.value = value
+
+  def update(self, value):
+    if self.value == value:
+      return False
+    self.value = value
+    return True
+
+  def data(self, column, role):
+    if role == QtCore.Qt.DisplayRole:
+      return self.name if column == 0 else self.value
+    return None
+
+
+class Model(SortedTableModel):
+  '''
+  Records the row ranges reported to the views.
+  '''
+  header = [('Name', 300), ('Value', 100)]
+
+  def __init__(self):
+    SortedTableModel.__init__(self, Item)
+    self.events = []
+    self.rowsInserted.connect(lambda parent, first, last: self.events.append(('inserted', first, last)))
+    self.rowsRemoved.connect(lambda parent, first, last: self.events.append(('removed', first, last)))
+    self.dataChanged.connect(lambda first, last: self.events.append(('changed', first.row(), last.row())))
+    self.modelReset.connect(lambda: self.events.append(('reset',)))
+
+  def names(self):
+    return [self.data(self.index(row, 0)) for row in range(self.rowCount())]
+
+
+class TestSortedTableModel(unittest.TestCase):
+  '''
+  Tests the row ranges reported by L{SortedTableModel} while applying changes.
+  '''
+
+  def setUp(self):
+    self.model = Model()
+    self.model.applyChanges([], {}, dict((name, 0) for name in ['/f', '/E', '/d', '/c', '/B', '/a']))
+    self.assertEqual([('inserted', 0, 5)], self.model.events)
+    self.assertEqual(['/a', '/B', '/c', '/d', '/E', '/f'], self.model.names())
+    del self.model.events[:]
+
+  def test_apply_changes(self):
+    self.model.applyChanges(['/B', '/c', '/f', '/unknown'], {'/a': 0, '/d': 1}, {'/b1': 0, '/C': 0, '/g': 0})
+    # the rows are removed from the end, so that the reported rows are valid
+    self.assertEqual([('removed', 5, 5), ('removed', 1, 2), ('changed', 1, 1), ('inserted', 1, 2), ('inserted', 5, 5)],
+                     self.model.events)
+    self.assertEqual(['/a', '/b1', '/C', '/d', '/E', '/g'], self.model.names())
+    self.assertEqual(1, self.model.data(self.model.index(3, 1)))
+
+  def test_apply_changes_ranges(self):
+    # the consecutive rows are reported as one range
+    self.model.applyChanges([], {'/a': 1, '/B': 1, '/d': 1, '/E': 1, '/f': 1}, {})
+    self.assertEqual([('changed', 0, 1), ('changed', 3, 5)], self.model.events)
+    del self.model.events[:]
+    self.model.applyChanges(['/a', '/c', '/d', '/f'], {}, {})
+    self.assertEqual([('removed', 5, 5), ('removed', 2, 3), ('removed', 0, 0)], self.model.events)
+    self.assertEqual(['/B', '/E'], self.model.names())
+
+  def test_updated_new_items(self):
+    # the updated items which are not in the model are inserted
+    self.model.applyChanges([], {'/e1': 0}, {'/0': 0, '/z': 0})
+    self.assertEqual([('inserted', 0, 0), ('inserted', 6, 6), ('inserted', 8, 8)], self.model.events)
+    self.assertEqual(['/0', '/a', '/B', '/c', '/d', '/E', '/e1', '/f', '/z'], self.model.names())
+
+  def test_insert_ranges_reset(self):
+    self.model.MAX_INSERT_RANGES = 2
+    self.model.applyChanges([], {}, {'/a0': 0, '/a1': 0, '/b0': 0})
+    self.assertEqual([('inserted', 1, 2), ('inserted', 4, 4)], self.model.events)
+    del self.model.events[:]
+    # above the maximal count of ranges the model is reset
+    self.model.applyChanges([], {}, {'/0': 0, '/c0': 0, '/g': 0})
+    self.assertEqual([('reset',)], self.model.events)
+    self.assertEqual(['/0', '/a', '/a0', '/a1', '/B', '/b0', '/c', '/c0', '/d', '/E', '/f', '/g'], self.model.names())
+
+
+if __name__ == '__main__':
+  import rosunit
+  rosunit.unitrun(PKG, 'test_sorted_table_model', TestSortedTableModel)